@@ -0,0 +1,122 @@
+"""File size and load time of the crawl output and merge output: CSV vs Parquet.
+
+    python benchmarks/bench_columnar_io.py                         # 1M pages
+    python benchmarks/bench_columnar_io.py --pages 200000 --chunk-size 20000
+
+Generates a synthetic crawl output (one row per page, 1-6 emails each,
+spread over a few thousand university domains) and stores it as the plain
+CSV that emails_merge.py reads today, as a gzip CSV result sink part and as
+a Parquet part (`emails` as list<string>). For each file reported:
+
+- size on disk and write time;
+- parse: the chunks of the file as DataFrames (pandas CSV parser vs
+  memory-mapped Arrow batches of only the url and emails columns);
+- load: emails_merge.read_email_chunks + explode_emails, i.e. the merge
+  input stage with base-domain extraction, one row per email.
+
+Then the exploded rows, with removal reason and mask columns, are written
+as invalid_data through ChunkWriter (TSV) and ParquetChunkWriter. Every
+format must load the same rows.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'postprocess'))
+
+import emails_merge
+from columnar import emails_writer, is_parquet, iter_parquet_batches
+
+PATHS = ['/', '/contact', '/staff', '/people/staff', '/research/', '/faculty/', '/news/item', '/department/physics']
+USERS = ['info', 'admissions', 'john.doe', 'jane.smith', 'dean', 'research', 'library', 'office', 'x.y', 'prof']
+
+
+def synthetic_rows(rng, pages, domains):
+    domain = rng.integers(0, domains, pages)
+    path = rng.integers(0, len(PATHS), pages)
+    counts = rng.integers(1, 7, pages)
+    users = rng.integers(0, len(USERS), counts.sum())
+    offset = 0
+    for page in range(pages):
+        host = f"uni{domain[page]}.edu"
+        emails = [f"{USERS[user]}{page % 97}@{host}" for user in users[offset:offset + counts[page]]]
+        offset += counts[page]
+        yield f"https://www.{host}{PATHS[path[page]]}?p={page}", emails
+
+
+def parse_chunks(path, chunk_size):
+    if is_parquet(path):
+        return (batch.to_pandas() for batch in iter_parquet_batches(path, ['url', 'emails'], chunk_size))
+    return pd.read_csv(path, chunksize=chunk_size, dtype=str)
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=1_000_000)
+    parser.add_argument('--domains', type=int, default=5000)
+    parser.add_argument('--chunk-size', type=int, default=emails_merge.CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench-columnar-')
+    rows = list(synthetic_rows(np.random.default_rng(args.seed), args.pages, args.domains))
+    print(f"Input: {args.pages} pages, {sum(len(emails) for _, emails in rows)} emails, {args.domains} domains")
+
+    results = {}
+    exploded = None
+    for name in ('emails.csv', 'part.csv.gz', 'part.parquet'):
+        path = os.path.join(work_dir, name)
+
+        def write():
+            writer = emails_writer(path)
+            for url, emails in rows:
+                writer.write(url, emails)
+            writer.close()
+
+        write_time, _ = timed(write)
+        parse_time, parsed = timed(lambda: sum(len(chunk) for chunk in parse_chunks(path, args.chunk_size)))
+        load_time, frames = timed(lambda: [emails_merge.explode_emails(chunk)
+                                           for chunk in emails_merge.read_email_chunks(path, args.chunk_size)])
+        loaded = pd.concat(frames, ignore_index=True)
+        results[name] = (os.path.getsize(path), parse_time, load_time, loaded)
+        exploded = loaded if exploded is None else exploded
+        print(f"{name:<12} {os.path.getsize(path) / 2 ** 20:>8.1f} MB   write {write_time:>6.2f} s   "
+              f"parse {parse_time:>6.2f} s ({parsed} rows)   load {load_time:>6.2f} s ({len(loaded)} email rows)")
+
+    # === Merge output: invalid_data with the typed reason columns ===
+    invalid_df = exploded.rename(columns={'domain': 'university_url'}).assign(
+        country_code='US', university_name='University', removal_reason='source_url',
+        removal_mask=np.uint64(emails_merge.row_filters.bits['source_url']))
+    for name in ('invalid_data.csv', 'invalid_data.parquet'):
+        path = os.path.join(work_dir, name)
+
+        def write():
+            writer = emails_merge.chunk_writer(path, emails_merge.INVALID_COLUMNS)
+            for start in range(0, len(invalid_df), args.chunk_size):
+                writer.write(invalid_df.iloc[start:start + args.chunk_size])
+            writer.close()
+
+        write_time, _ = timed(write)
+        print(f"{name:<20} {os.path.getsize(path) / 2 ** 20:>8.1f} MB   write {write_time:>6.2f} s")
+
+    csv_size, csv_parse, csv_load, csv_rows = results['emails.csv']
+    pq_size, pq_parse, pq_load, pq_rows = results['part.parquet']
+    same = all(rows[3].equals(csv_rows) for rows in results.values())
+    print(f"Parquet vs CSV: {csv_size / pq_size:.1f}x smaller, parse {csv_parse / pq_parse:.1f}x faster, "
+          f"load {csv_load / pq_load:.1f}x faster   same rows: {'yes' if same else 'NO'}")
+    print(f"Files: {work_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Pages/sec of the Scrapy engine vs the asyncio/httpx engine on synthetic university sites.
+
+    python benchmarks/bench_crawl_engines.py                       # 2000 sites x 8 pages
+    python benchmarks/bench_crawl_engines.py --sites 500 --latency 50
+    python benchmarks/bench_crawl_engines.py --engines async -s CONCURRENT_REQUESTS=128
+
+Starts a local aiohttp server that hosts every site on its own loopback
+address (http://127.0.x.y:PORT/, so each one is a separate host and domain
+without DNS). A site's home page links to its other pages; every page has
+two personal emails, the site's shared contact address, an off-site link
+and a PDF link. Each engine then crawls the whole input through
+parser/crawl.py with the same settings and a local result sink. Reported:
+pages served, wall time (process start to exit) and unique emails stored.
+"""
+import os
+import sys
+import csv
+import glob
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'parser'))
+
+from columnar import read_email_rows
+from result_sink import PART_SUFFIXES
+
+CRAWL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'parser', 'crawl.py')
+PAGE_NAMES = ['contact', 'staff', 'people', 'about', 'research', 'admissions', 'news', 'library',
+              'faculty', 'events', 'departments', 'alumni']
+
+
+# === Fixture server ===
+def site_host(site):
+    # Last octet 1..254, so no site lands on a .0 or .255 address
+    return f"127.{site // (254 * 256) % 256}.{site // 254 % 256}.{site % 254 + 1}"
+
+
+def site_number(host):
+    _, a, b, c = (int(part) for part in host.split(':')[0].split('.'))
+    return (a * 256 + b) * 254 + c - 1
+
+
+def page_paths(pages):
+    return ['/'] + [f"/{PAGE_NAMES[k % len(PAGE_NAMES)]}/{k}" for k in range(1, pages)]
+
+
+def page_html(site, page, paths, filler=60):
+    links = ''.join(f'<li><a href="{path}?utm_source=nav">{path}</a></li>' for path in paths)
+    emails = f"person{page}a@site{site}.edu, person{page}b@site{site}.edu, info@site{site}.edu"
+    return (f"<html><head><title>University {site}</title></head><body><ul>{links}</ul>"
+            f"<p>Contact: {emails}</p><a href=\"https://www.example.org/ranking\">Ranking</a>"
+            f"<a href=\"/files/prospectus.pdf\">Prospectus</a>{'<p>lorem ipsum dolor sit amet</p>' * filler}"
+            f"</body></html>")
+
+
+def serve(port, pages, latency, hits, filler=60):
+    paths = page_paths(pages)
+    index = {path: number for number, path in enumerate(paths)}
+
+    async def handler(request):
+        if latency:
+            await asyncio.sleep(latency)
+        page = index.get(request.path)
+        if page is None:
+            return web.Response(status=404)
+        with hits.get_lock():
+            hits.value += 1
+        html = page_html(site_number(request.host), page, paths if page == 0 else paths[:3], filler)
+        return web.Response(text=html, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_route('GET', '/{tail:.*}', handler)
+    web.run_app(app, host='0.0.0.0', port=port, print=None, access_log=None)
+
+
+# === Engines ===
+def run_engine(engine, input_path, sink_dir, settings):
+    env = {**os.environ, 'RESULT_SINK_BACKEND': 'local', 'RESULT_SINK_DIR': sink_dir,
+           'AWS_DEFAULT_REGION': os.getenv('AWS_DEFAULT_REGION', 'us-east-1')}
+    cmd = [sys.executable, CRAWL_FILE, '--engine', engine, '-a', f'input_path={input_path}']
+    for setting in settings:
+        cmd += ['-s', setting]
+    log_path = os.path.join(sink_dir, f'{engine}.log')
+    os.makedirs(sink_dir, exist_ok=True)
+    start = time.perf_counter()
+    with open(log_path, 'w') as log:
+        returncode = subprocess.call(cmd, env=env, stdout=log, stderr=subprocess.STDOUT)
+    elapsed = time.perf_counter() - start
+    if returncode != 0:
+        raise SystemExit(f"❌ {engine} engine exited with code {returncode}, see {log_path}")
+    return elapsed
+
+
+def stored_emails(sink_dir):
+    emails = set()
+    for suffix in PART_SUFFIXES.values():
+        for part in glob.glob(os.path.join(sink_dir, '**', f'*{suffix}'), recursive=True):
+            for _, found in read_email_rows(part):
+                emails.update(found)
+    return emails
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=2000)
+    parser.add_argument('--pages', type=int, default=8, help='pages per site')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds the server waits per response')
+    parser.add_argument('--port', type=int, default=8790)
+    parser.add_argument('--engines', nargs='+', choices=['scrapy', 'async'], default=['scrapy', 'async'])
+    parser.add_argument('-s', dest='settings', action='append', default=[], metavar='NAME=VALUE',
+                        help='extra setting for both engines')
+    args = parser.parse_args()
+
+    # Same settings for both engines: no politeness delay, so the engine itself is measured
+    settings = ['CONCURRENT_REQUESTS=64', 'CONCURRENT_REQUESTS_PER_DOMAIN=8', 'DOWNLOAD_DELAY=0',
+                'AUTOTHROTTLE_ENABLED=0', 'LOG_LEVEL=INFO', *args.settings]
+    work_dir = tempfile.mkdtemp(prefix='bench-crawl-')
+    input_path = os.path.join(work_dir, 'input_urls.csv')
+    with open(input_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['url'])
+        for site in range(args.sites):
+            writer.writerow([f"http://{site_host(site)}:{args.port}/"])
+
+    hits = multiprocessing.Value('q', 0)
+    server = multiprocessing.Process(target=serve, args=(args.port, args.pages, args.latency, hits), daemon=True)
+    server.start()
+    time.sleep(1)
+    expected_emails = args.sites * (2 * args.pages + 1)
+    print(f"Fixture: {args.sites} sites x {args.pages} pages, {args.latency * 1000:.0f} ms latency, "
+          f"{expected_emails} distinct emails")
+
+    results = {}
+    try:
+        for engine in args.engines:
+            with hits.get_lock():
+                hits.value = 0
+            sink_dir = os.path.join(work_dir, engine)
+            elapsed = run_engine(engine, input_path, sink_dir, settings)
+            pages = hits.value
+            emails = len(stored_emails(sink_dir))
+            results[engine] = (elapsed, pages, emails)
+            print(f"{engine:<8} {pages / elapsed:>10,.1f} pages/s   {elapsed:>7.1f} s   {pages} pages, {emails} emails")
+    finally:
+        server.terminate()
+
+    if len(results) == 2:
+        (old_elapsed, old_pages, old_emails), (new_elapsed, new_pages, new_emails) = results['scrapy'], results['async']
+        speedup = (new_pages / new_elapsed) / (old_pages / old_elapsed)
+        print(f"Speedup: {speedup:.1f}x   same pages and emails: {'yes' if (old_pages, old_emails) == (new_pages, new_emails) else 'NO'}")
+    print(f"Logs and result parts: {work_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""Crawl benchmark suite: EmailSpider end to end against the fixture server, with stored results.
+
+    python benchmarks/bench_crawl_suite.py                         # every scenario of crawl_scenarios.yaml
+    python benchmarks/bench_crawl_suite.py baseline flaky --repeat 3
+    python benchmarks/bench_crawl_suite.py baseline -s CONCURRENT_REQUESTS=48 --tag concurrency-48
+    python benchmarks/bench_crawl_suite.py --history baseline
+
+For each scenario (benchmarks/crawl_scenarios.yaml) a fixture server
+(benchmarks/fixture_server.py) serves the scenario's sites, and
+parser/crawl.py crawls all of them with a local result sink, so no S3
+is involved. Reported per run:
+- pages/s: pages served with 200 per second of wall time;
+- emails/s: unique emails stored per second;
+- coverage: stored emails out of those on reachable pages;
+- peak RSS of the largest crawl process and its CPU time;
+- server status counts and the crawl's own error counts (crawl_metrics.json).
+
+Every run is appended as one JSON line to --results (default
+benchmarks/results/crawl_suite.jsonl), with the git commit, host and the
+full scenario config. A run is compared with the median of the last
+--baseline-runs stored runs of the same scenario, config and host. A
+pages/s drop above --threshold percent is flagged as a regression
+(exit code 1 with --fail-on-regression).
+"""
+import os
+import sys
+import csv
+import json
+import time
+import socket
+import hashlib
+import argparse
+import platform
+import statistics
+import subprocess
+import multiprocessing
+from urllib.request import urlopen
+
+import yaml
+
+from bench_crawl_engines import CRAWL_FILE, stored_emails
+from fixture_server import FIXTURE_DEFAULTS, build_corpus, serve
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS_FILE = os.path.join(BENCH_DIR, 'crawl_scenarios.yaml')
+RESULTS_FILE = os.path.join(BENCH_DIR, 'results', 'crawl_suite.jsonl')
+
+
+# === Scenarios ===
+def load_scenarios(path=SCENARIOS_FILE):
+    """name -> {engine, fixture, settings}, each scenario merged over the file's defaults."""
+    with open(path, encoding='utf-8') as f:
+        spec = yaml.safe_load(f)
+    defaults = spec.get('defaults', {})
+    scenarios = {}
+    for name, scenario in spec['scenarios'].items():
+        scenario = scenario or {}
+        scenarios[name] = {
+            'engine': scenario.get('engine', defaults.get('engine', 'scrapy')),
+            'fixture': {**FIXTURE_DEFAULTS, **defaults.get('fixture', {}), **scenario.get('fixture', {})},
+            'settings': {**defaults.get('settings', {}), **scenario.get('settings', {})},
+        }
+    return scenarios
+
+
+def config_hash(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def git_commit():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                             cwd=BENCH_DIR, text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, dirty
+
+
+def host_info():
+    return {'name': socket.gethostname(), 'cpus': os.cpu_count(), 'python': platform.python_version(),
+            'platform': platform.platform()}
+
+
+# === Runs ===
+def fixture_stats(port, action='stats'):
+    with urlopen(f"http://127.0.0.1:{port}/__fixture/{action}", timeout=10) as response:
+        return json.load(response)
+
+
+def run_crawl(engine, input_path, run_dir, settings):
+    """(wall seconds, peak RSS in MB, CPU seconds) of one crawl.py run, child processes included."""
+    env = {**os.environ, 'RESULT_SINK_BACKEND': 'local', 'RESULT_SINK_DIR': os.path.join(run_dir, 'results'),
+           'METRICS_FILE': os.path.join(run_dir, 'crawl_metrics.json'),
+           'AWS_DEFAULT_REGION': os.getenv('AWS_DEFAULT_REGION', 'us-east-1')}
+    cmd = [sys.executable, CRAWL_FILE, '--engine', engine, '-a', f'input_path={input_path}']
+    for name, value in settings.items():
+        cmd += ['-s', f'{name}={value}']
+    log_path = os.path.join(run_dir, 'crawl.log')
+    with open(log_path, 'w') as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(cmd, env=env, stdout=log, stderr=subprocess.STDOUT, cwd=run_dir)
+        # wait4's usage covers the crawl and every descendant it waited for (scrapy runspider, parse workers)
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise SystemExit(f"❌ Crawl exited with code {process.returncode}, see {log_path}")
+    return elapsed, usage.ru_maxrss / 1024, usage.ru_utime + usage.ru_stime
+
+
+def run_scenario(name, scenario, port, work_dir, repeat):
+    """Measured results of `repeat` runs of one scenario against a fresh fixture server."""
+    fixture = scenario['fixture']
+    root_urls = build_corpus(fixture, port).root_urls(port)
+    scenario_dir = os.path.join(work_dir, name)
+    os.makedirs(scenario_dir, exist_ok=True)
+    input_path = os.path.join(scenario_dir, 'input_urls.csv')
+    with open(input_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['url'])
+        writer.writerows([url] for url in root_urls)
+
+    server = multiprocessing.Process(target=serve, args=(fixture, port), daemon=True)
+    server.start()
+    for _ in range(100):
+        try:
+            fixture_stats(port)
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    runs = []
+    try:
+        for attempt in range(repeat):
+            run_dir = os.path.join(scenario_dir, f'run-{attempt}')
+            os.makedirs(run_dir, exist_ok=True)
+            fixture_stats(port, 'reset')
+            elapsed, peak_rss_mb, cpu_seconds = run_crawl(scenario['engine'], input_path, run_dir,
+                                                          scenario['settings'])
+            served = fixture_stats(port)
+            emails = len(stored_emails(os.path.join(run_dir, 'results')))
+            with open(os.path.join(run_dir, 'crawl_metrics.json'), encoding='utf-8') as f:
+                crawl_errors = json.load(f)['totals'].get('errors', 0)
+            runs.append({
+                'wall_seconds': round(elapsed, 3),
+                'pages': served.get('pages', 0),
+                'pages_per_sec': round(served.get('pages', 0) / elapsed, 2),
+                'emails': emails,
+                'emails_per_sec': round(emails / elapsed, 2),
+                'coverage': round(emails / max(served['emails_total'], 1), 4),
+                'peak_rss_mb': round(peak_rss_mb, 1),
+                'cpu_seconds': round(cpu_seconds, 2),
+                'cpu_percent': round(100 * cpu_seconds / elapsed, 1),
+                'requests': served.get('requests', 0),
+                'statuses': {key[len('status_'):]: value for key, value in served.items() if key.startswith('status_')},
+                'crawl_errors': crawl_errors,
+                'log': os.path.join(run_dir, 'crawl.log'),
+            })
+    finally:
+        server.terminate()
+        server.join()
+    return runs
+
+
+# === Stored results ===
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_results(path, records):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+def same_kind(record, scenario_name, digest, host_name):
+    return (record['scenario'] == scenario_name and record['config_hash'] == digest
+            and record['host']['name'] == host_name)
+
+
+def print_history(records, scenario_name):
+    print(f"{'time':<20} {'commit':<10} {'tag':<16} {'pages/s':>9} {'emails/s':>9} {'RSS MB':>8} {'CPU %':>7}  config")
+    for record in records:
+        if record['scenario'] != scenario_name:
+            continue
+        result = record['result']
+        commit = (record['commit'] or '?') + ('+' if record['dirty'] else '')
+        print(f"{record['time']:<20} {commit:<10} {record.get('tag') or '':<16} {result['pages_per_sec']:>9.1f} "
+              f"{result['emails_per_sec']:>9.1f} {result['peak_rss_mb']:>8.1f} {result['cpu_percent']:>7.1f}  "
+              f"{record['config_hash']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenarios', nargs='*', help='scenario names (default: all)')
+    parser.add_argument('--scenarios-file', default=SCENARIOS_FILE)
+    parser.add_argument('--results', default=RESULTS_FILE, help='JSON lines file the runs are appended to')
+    parser.add_argument('--no-save', action='store_true', help='do not store this run')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per scenario')
+    parser.add_argument('--tag', default=None, help='label stored with the runs (e.g. what was tuned)')
+    parser.add_argument('--port', type=int, default=8795)
+    parser.add_argument('--threshold', type=float, default=10.0, help='pages/s drop (%%) flagged as a regression')
+    parser.add_argument('--baseline-runs', type=int, default=5, help='stored runs the median baseline is taken from')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--history', metavar='SCENARIO', help='print the stored runs of a scenario and exit')
+    parser.add_argument('-s', dest='settings', action='append', default=[], metavar='NAME=VALUE',
+                        help='extra crawl setting for every scenario (part of the config)')
+    args = parser.parse_args()
+
+    history = load_results(args.results)
+    if args.history:
+        print_history(history, args.history)
+        return 0
+
+    scenarios = load_scenarios(args.scenarios_file)
+    unknown = [name for name in args.scenarios if name not in scenarios]
+    if unknown:
+        parser.error(f"unknown scenario(s) {unknown}; known: {sorted(scenarios)}")
+    extra_settings = dict(setting.split('=', 1) for setting in args.settings)
+
+    commit, dirty = git_commit()
+    host = host_info()
+    work_dir = os.path.join('/tmp', f"bench-suite-{time.strftime('%Y%m%d-%H%M%S')}")
+    print(f"Commit {commit}{' (dirty)' if dirty else ''} on {host['name']} ({host['cpus']} CPUs); runs in {work_dir}")
+    print(f"{'scenario':<14} {'pages/s':>9} {'emails/s':>9} {'coverage':>9} {'RSS MB':>8} {'CPU %':>7} "
+          f"{'wall s':>8}  statuses / crawl errors")
+
+    regressions = []
+    for name in args.scenarios or scenarios:
+        scenario = scenarios[name]
+        scenario['settings'] = {**scenario['settings'], **extra_settings}
+        digest = config_hash(scenario)
+        runs = run_scenario(name, scenario, args.port, work_dir, args.repeat)
+
+        records = []
+        for result in runs:
+            statuses = ' '.join(f"{status}:{count}" for status, count in sorted(result['statuses'].items()))
+            print(f"{name:<14} {result['pages_per_sec']:>9.1f} {result['emails_per_sec']:>9.1f} "
+                  f"{result['coverage']:>9.1%} {result['peak_rss_mb']:>8.1f} {result['cpu_percent']:>7.1f} "
+                  f"{result['wall_seconds']:>8.1f}  {statuses} / {result['crawl_errors']}")
+            records.append({'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit, 'dirty': dirty,
+                            'tag': args.tag, 'host': host, 'scenario': name, 'config_hash': digest,
+                            'config': scenario, 'result': result})
+
+        previous = [record['result']['pages_per_sec'] for record in history
+                    if same_kind(record, name, digest, host['name'])][-args.baseline_runs:]
+        if previous:
+            baseline = statistics.median(previous)
+            current = statistics.median(result['pages_per_sec'] for result in runs)
+            change = 100 * (current - baseline) / baseline
+            flag = '  ⚠️ REGRESSION' if change < -args.threshold else ''
+            print(f"{'':<14} vs median of {len(previous)} stored run(s): {baseline:.1f} pages/s, {change:+.1f}%{flag}")
+            if flag:
+                regressions.append(name)
+        if not args.no_save:
+            save_results(args.results, records)
+
+    if not args.no_save:
+        print(f"Results appended to {args.results}")
+    if regressions:
+        print(f"❌ Regressions: {', '.join(regressions)}")
+        return 1 if args.fail_on_regression else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Emails per 1k requests with and without the per-domain crawl budget (parser/domain_budget.py).
+
+    python benchmarks/bench_domain_budget.py                       # 8 sites, 400 news pages each
+    python benchmarks/bench_domain_budget.py --sites 50 --max-pages 100 --engine async
+
+Each synthetic site has a home page linking to a 400-page news tree (each
+news page links to 20 more, no new emails) and to 5 staff pages that hold
+most of the emails. The home page lists the news links first, so a crawl
+without contact-page priority reaches the staff pages late.
+
+The crawl runs twice: with DOMAIN_BUDGET_ENABLED=0, then with the budget
+on, the given DOMAIN_MAX_PAGES and the low-yield stop (DOMAIN_MIN_YIELD
+over DOMAIN_YIELD_WINDOW pages, after DOMAIN_MIN_PAGES). Reported per
+run: requests served, emails stored and emails per 1k requests.
+"""
+import os
+import csv
+import time
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+
+from aiohttp import web
+
+from bench_crawl_engines import site_host, site_number, run_engine, stored_emails
+
+STAFF_PAGES = 5
+STAFF_EMAILS = 10
+HOME_EMAILS = 2
+NEWS_FANOUT = 20  # keeps the whole news tree within DEPTH_LIMIT
+
+
+# === Fixture server ===
+def site_pages(site, news_pages):
+    """path -> (links, emails) of one site."""
+    staff = [f'/staff/{k}' for k in range(STAFF_PAGES)]
+    pages = {'/': (['/news/0'] + staff, [f'office{n}@site{site}.edu' for n in range(HOME_EMAILS)])}
+    for k in range(news_pages):
+        first = NEWS_FANOUT * k + 1
+        children = [f'/news/{child}' for child in range(first, first + NEWS_FANOUT) if child < news_pages]
+        pages[f'/news/{k}'] = (['/'] + children, [f'office0@site{site}.edu'])
+    for k, path in enumerate(staff):
+        pages[path] = (['/'], [f'staff{k}.{n}@site{site}.edu' for n in range(STAFF_EMAILS)])
+    return pages
+
+
+def serve(port, latency, news_pages, hits):
+    async def handler(request):
+        if latency:
+            await asyncio.sleep(latency)
+        with hits.get_lock():
+            hits.value += 1
+        site = site_number(request.host)
+        pages = site_pages(site, news_pages)
+        if request.path not in pages:
+            return web.Response(status=404)
+        links, emails = pages[request.path]
+        html = (f"<html><body><h1>Site {site}</h1>{''.join(f'<a href={link!r}>{link}</a>' for link in links)}"
+                f"<p>{', '.join(emails)}</p>{'<p>lorem ipsum dolor sit amet</p>' * 40}</body></html>")
+        return web.Response(text=html, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_route('GET', '/{tail:.*}', handler)
+    web.run_app(app, host='0.0.0.0', port=port, print=None, access_log=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=8)
+    parser.add_argument('--news-pages', type=int, default=400)
+    parser.add_argument('--max-pages', type=int, default=500, help='DOMAIN_MAX_PAGES of the budgeted run')
+    parser.add_argument('--min-yield', type=float, default=0.02, help='DOMAIN_MIN_YIELD of the budgeted run')
+    parser.add_argument('--yield-window', type=int, default=40, help='DOMAIN_YIELD_WINDOW and DOMAIN_MIN_PAGES')
+    parser.add_argument('--engine', choices=['scrapy', 'async'], default='scrapy')
+    parser.add_argument('--latency', type=float, default=0.005, help='seconds the server waits per response')
+    parser.add_argument('--port', type=int, default=8796)
+    args = parser.parse_args()
+
+    settings = ['CONCURRENT_REQUESTS=32', 'CONCURRENT_REQUESTS_PER_DOMAIN=4', 'DOWNLOAD_DELAY=0',
+                'AUTOTHROTTLE_ENABLED=0', 'ROBOTSTXT_OBEY=0', 'LOG_LEVEL=INFO']
+    budget = ['DOMAIN_BUDGET_ENABLED=1', f'DOMAIN_MAX_PAGES={args.max_pages}', f'DOMAIN_MIN_YIELD={args.min_yield}',
+              f'DOMAIN_YIELD_WINDOW={args.yield_window}', f'DOMAIN_MIN_PAGES={args.yield_window}']
+    work_dir = tempfile.mkdtemp(prefix='bench-domain-budget-')
+    input_path = os.path.join(work_dir, 'input_urls.csv')
+    with open(input_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['url'])
+        for site in range(args.sites):
+            writer.writerow([f"http://{site_host(site)}:{args.port}/"])
+
+    hits = multiprocessing.Value('q', 0)
+    server = multiprocessing.Process(target=serve, args=(args.port, args.latency, args.news_pages, hits), daemon=True)
+    server.start()
+    time.sleep(1)
+    total_emails = args.sites * (HOME_EMAILS + STAFF_PAGES * STAFF_EMAILS)
+    print(f"Fixture: {args.sites} sites, {len(site_pages(0, args.news_pages))} pages and {total_emails // args.sites} "
+          f"emails each; {args.engine} engine")
+
+    results = {}
+    try:
+        for name, run_settings in (('no budget', ['DOMAIN_BUDGET_ENABLED=0']), ('budget', budget)):
+            with hits.get_lock():
+                hits.value = 0
+            sink_dir = os.path.join(work_dir, name.replace(' ', '-'))
+            elapsed = run_engine(args.engine, input_path, sink_dir, [*settings, *run_settings])
+            emails = len(stored_emails(sink_dir))
+            results[name] = 1000 * emails / max(hits.value, 1)
+            print(f"{name:<10} {hits.value:>7} requests   {emails:>5} of {total_emails} emails   "
+                  f"{results[name]:>6.0f} emails per 1k requests   {elapsed:.1f} s")
+    finally:
+        server.terminate()
+
+    print(f"Budget: {' '.join(budget)}")
+    print(f"Emails per 1k requests: {results['budget'] / max(results['no budget'], 1e-9):.1f}x with the budget")
+    print(f"Logs and result parts: {work_dir}")
+
+
+if __name__ == '__main__':
+    main()
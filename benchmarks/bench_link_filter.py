@@ -0,0 +1,127 @@
+"""Pages/sec of the spider's link handling: old per-href loop vs parser/link_filter.py.
+
+    python benchmarks/bench_link_filter.py
+    python benchmarks/bench_link_filter.py --pages 300 --links 5000
+
+Generates pages of one university site with thousands of <a href> each:
+a shared navigation menu, repeated links, tracking parameters, fragments,
+documents and links to other sites. Both variants start from the hrefs of
+each page and end with the scrapy.Request objects that survive dedup
+(the old loop through Scrapy's RFPDupeFilter, like the scheduler does).
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from urllib.parse import urlparse
+
+import scrapy
+from scrapy.dupefilters import RFPDupeFilter
+from scrapy.http import HtmlResponse
+from scrapy.utils.response import get_base_url
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'parser'))
+
+from link_filter import LinkFilter
+
+SITE = 'https://www.uni.edu'
+ALLOWED = {'uni.edu'}
+
+
+# === Old spider code ===
+def old_domain_from_url(url):
+    parts = urlparse(url).netloc.lower().split('.')
+    return '.'.join(parts[-2:])
+
+
+def old_is_unwanted_url(url):
+    unwanted_patterns = [
+        'mailto:', 'javascript:', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp',
+        '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.zip', '.rar', '.exe', '.tar', '.gz'
+    ]
+    return any(pattern in url.lower() for pattern in unwanted_patterns)
+
+
+def old_is_login_page(url):
+    login_patterns = ['/login', '/signin', '/register', '/auth', '/account']
+    return any(pattern in url.lower() for pattern in login_patterns)
+
+
+def old_links(response, hrefs, dupefilter):
+    requests = []
+    for link in hrefs:
+        next_url = response.urljoin(link)
+        if old_domain_from_url(next_url) not in ALLOWED:
+            continue
+        if old_is_unwanted_url(next_url) or old_is_login_page(next_url):
+            continue
+        request = scrapy.Request(url=next_url, dont_filter=False)
+        if not dupefilter.request_seen(request):
+            requests.append(request)
+    return requests
+
+
+def new_links(response, hrefs, link_filter):
+    links = [(url, domain) for url, domain in link_filter.links(get_base_url(response), hrefs) if domain in ALLOWED]
+    return [scrapy.Request(url=url, dont_filter=False) for url, _ in link_filter.unseen(links)]
+
+
+# === Corpus ===
+def synthetic_page(rng, index, links):
+    nav = [f"/{section}/" for section in ('about', 'research', 'faculty', 'students', 'news', 'contact')]
+    hrefs = nav * 20
+    for _ in range(links - len(hrefs)):
+        kind = rng.random()
+        page = rng.randint(0, 20000)
+        if kind < 0.45:
+            hrefs.append(f"/news/{page}.html")
+        elif kind < 0.6:
+            hrefs.append(f"/news/{page}.html?utm_source=feed&utm_medium=rss#top")
+        elif kind < 0.7:
+            hrefs.append(f"{SITE}/staff/{page}?b=2&a=1")
+        elif kind < 0.8:
+            hrefs.append(f"/files/report-{page}.pdf")
+        elif kind < 0.88:
+            hrefs.append(f"https://www.other{page % 50}.org/page{page}")
+        elif kind < 0.93:
+            hrefs.append(f"mailto:person{page}@uni.edu")
+        elif kind < 0.96:
+            hrefs.append(f"#section{page % 10}")
+        else:
+            hrefs.append(f"/search?q=pdf+{page}&page={page % 7}")
+    url = f"{SITE}/news/page{index}.html"
+    return HtmlResponse(url=url, body=b'<html><body></body></html>', encoding='utf-8'), hrefs
+
+
+def bench(name, func, corpus, make_state, repeat):
+    best = float('inf')
+    scheduled = 0
+    for _ in range(repeat):
+        state = make_state()
+        start = time.perf_counter()
+        scheduled = sum(len(func(response, hrefs, state)) for response, hrefs in corpus)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<12} {len(corpus) / best:>10.1f} pages/s   {scheduled:>7} requests scheduled")
+    return len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--links', type=int, default=3000, help='hrefs per page')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [synthetic_page(rng, index, args.links) for index in range(args.pages)]
+    print(f"Corpus: {len(corpus)} pages, {args.links} hrefs per page")
+
+    old = bench('old loop', old_links, corpus, RFPDupeFilter, args.repeat)
+    new = bench('LinkFilter', new_links, corpus, lambda: LinkFilter(old_domain_from_url), args.repeat)
+    print(f"Speedup: {new / old:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
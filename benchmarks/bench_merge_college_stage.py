@@ -0,0 +1,206 @@
+"""Rows/sec of emails_merge.py's academic flags and college stage: old per-row code vs per-university flags.
+
+    python benchmarks/bench_merge_college_stage.py                # 2M rows, 20k universities
+    python benchmarks/bench_merge_college_stage.py --rows 200000 --universities 5000
+
+Generates a university table (US community and technical colleges with and
+without academic keywords in their URL, whitelisted colleges, universities
+sharing a name across countries) and joined email rows over it, and runs
+both passes of the college rule chunk by chunk:
+
+- old: the original code, chunk by chunk: a row-wise
+  `apply(has_academic_indicator)`, a `groupby`, the college name regex and
+  `check_college_flags` per row;
+- new: emails_merge.add_university_flags once on the university table,
+  the flag columns taken along with each row (the merge's domain join),
+  keyword matches per distinct source URL and set lookups of names.
+
+Both variants must keep and remove exactly the same rows with the same
+columns. The script exits with status 1 when they differ, so it doubles as
+the regression check for this stage.
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'postprocess'))
+
+import emails_merge
+
+row_filters = emails_merge.row_filters
+
+
+# === Old emails_merge.py code (verbatim, see tests/fixtures/emails_merge_baseline.py) ===
+academic_keywords = [
+    "faculty", "research", "academics", "department", "program", "school-of", "stem"
+]
+
+def has_academic_indicator(row):
+    urls_to_check = [str(row['source_url']).lower(), str(row['university_url']).lower()]
+    return any(keyword in url for url in urls_to_check for keyword in academic_keywords)
+
+white_domains = {
+    "pomona.edu", "wellesley.edu", "amherst.edu", "swarthmore.edu",
+    "barnard.edu", "harvey.mudd.edu", "colby.edu", "brynmawr.edu",
+    "middlebury.edu", "carleton.edu", "davidson.edu", "grinnell.edu",
+    "haverford.edu", "macalester.edu", "vassar.edu", "bates.edu",
+    "oberlin.edu", "reed.edu", "union.edu", "connecticutcollege.edu",
+    "lafayette.edu", "scrippscollege.edu", "rhodes.edu", "whitman.edu",
+    "beloit.edu", "trinity.edu", "hamilton.edu", "kenyon.edu", "skidmore.edu"
+}
+
+white_names = {
+    "Pomona College", "Wellesley College", "Amherst College", "Swarthmore College",
+    "Barnard College", "Harvey Mudd College", "Colby College", "Bryn Mawr College",
+    "Middlebury College", "Carleton College", "Davidson College", "Grinnell College",
+    "Haverford College", "Macalester College", "Vassar College", "Bates College",
+    "Oberlin College", "Reed College", "Union College", "Connecticut College",
+    "Lafayette College", "Scripps College", "Rhodes College", "Whitman College",
+    "Beloit College", "Trinity College", "Hamilton College", "Kenyon College", "Skidmore College"
+}
+
+def extract_domain(email):
+    try: return email.split("@")[1].lower()
+    except: return ""
+
+def check_college_flags(email, university_name):
+    domain = extract_domain(email)
+    username_flag = "college" in domain
+    name_flag = isinstance(university_name, str) and "college" in university_name.lower()
+    whitelisted = domain in white_domains or university_name in white_names
+    match_reason = "both" if username_flag and name_flag else (
+        "email_domain" if username_flag else "university_name" if name_flag else ""
+    )
+    needs_manual = "yes" if (username_flag or name_flag) and not whitelisted else "no"
+    return pd.Series([needs_manual, match_reason, "yes" if whitelisted else "no"])
+
+
+def joined_chunk(unis_df, rows, columns):
+    """The rows of one chunk as the merge's domain join yields them."""
+    university, source_url, email = rows
+    return unis_df.iloc[university].reset_index(drop=True).assign(source_url=source_url, email=email)[columns]
+
+
+def old_stage(unis_df, row_chunks):
+    spooled, academic_presence = [], {}
+    for rows in row_chunks:
+        final_df = joined_chunk(unis_df, rows, emails_merge.BASE_COLUMNS)
+        final_df['has_academic_url'] = final_df.apply(has_academic_indicator, axis=1)
+        for name, present in final_df.groupby('university_name')['has_academic_url'].any().items():
+            academic_presence[name] = academic_presence.get(name, False) or present
+        spooled.append(final_df)
+
+    colleges_to_remove = {name for name, present in academic_presence.items() if not present}
+    kept_chunks, removed_chunks = [], []
+    for final_df in spooled:
+        college_removal_mask = (
+            (final_df['country_code'] == 'US') &
+            (final_df['university_name'].str.lower().str.contains('community college|technical college')) &
+            (final_df['university_name'].isin(colleges_to_remove))
+        )
+        removed = final_df[college_removal_mask].copy()
+        removed['removal_reason'] = row_filters.labels['college']
+        removed_chunks.append(removed)
+        final_df = final_df[~college_removal_mask].drop(columns=['has_academic_url'])
+        final_df[["needs_manual_check", "match_reason", "is_whitelisted"]] = final_df.apply(
+            lambda row: check_college_flags(row["email"], row["university_name"]), axis=1
+        )
+        kept_chunks.append(final_df)
+    return kept_chunks, removed_chunks
+
+
+# === New emails_merge.py code ===
+def new_stage(unis_df, row_chunks):
+    unis_df = emails_merge.add_university_flags(unis_df)
+    columns = emails_merge.BASE_COLUMNS + emails_merge.UNIVERSITY_FLAG_COLUMNS
+    spooled, academic_names, college_names = [], set(), set()
+    for rows in row_chunks:
+        final_df = joined_chunk(unis_df, rows, columns)
+        has_academic_url = (emails_merge.academic_url_mask(final_df['source_url'])
+                            | final_df['university_academic'].to_numpy())
+        final_df['has_academic_url'] = has_academic_url
+        academic_names.update(final_df['university_name'][has_academic_url].dropna().unique())
+        college_names.update(final_df['university_name'][final_df['college_candidate'].to_numpy()].unique())
+        spooled.append(final_df)
+
+    colleges_to_remove = college_names - academic_names
+    kept_chunks, removed_chunks = [], []
+    for final_df in spooled:
+        college_removal_mask = final_df['college_candidate'] & final_df['university_name'].isin(colleges_to_remove)
+        removed = final_df[college_removal_mask].copy()
+        removed['removal_reason'] = row_filters.labels['college']
+        removed_chunks.append(removed)
+        final_df = final_df[~college_removal_mask].drop(columns=['has_academic_url'])
+        kept_chunks.append(final_df.join(emails_merge.college_flag_columns(final_df)))
+    return kept_chunks, removed_chunks
+
+
+# === Synthetic input ===
+def synthetic_universities(rng, count):
+    kinds = np.array(['Community College', 'Technical College', 'University', 'College', 'Institute'])
+    places = np.array([f'Place{k}' for k in range(count // 3 + 1)])
+    names = places[rng.integers(0, len(places), count)] + ' ' + kinds[rng.integers(0, len(kinds), count)]
+    white = rng.random(count) < 0.02
+    names = np.where(white, np.array(['Pomona College', 'Reed College', 'Wellesley College'])[rng.integers(0, 3, count)],
+                     names)
+    paths = np.array([''] * 12 + ['research/', 'faculty/', 'academics/'])
+    urls = 'https://www.u' + np.arange(count).astype(str) + '.edu/' + paths[rng.integers(0, len(paths), count)]
+    return pd.DataFrame({
+        'country_code': np.where(rng.random(count) < 0.6, 'US', np.array(['DE', 'GB', 'CA'])[rng.integers(0, 3, count)]),
+        'university_name': names,
+        'university_url': urls,
+    })
+
+
+def synthetic_rows(rng, unis_df, rows):
+    """(university row, source URL, email) of each email row."""
+    hosts = np.array(['uni.edu', 'college.edu', 'pomona.edu', 'mail.com', 'cc.edu', 'techcollege.org'])
+    paths = np.array(['contact', 'about/staff', 'news/2024', 'people', 'admissions'] * 8 + ['research/lab', 'department/math'])
+    university = rng.integers(0, len(unis_df), rows)
+    source_url = (unis_df['university_url'].to_numpy()[university].astype(str)
+                  + paths[rng.integers(0, len(paths), rows)] + '/' + rng.integers(0, 10 ** 6, rows).astype(str))
+    email = 'user' + rng.integers(0, 10 ** 7, rows).astype(str) + '@' + hosts[rng.integers(0, len(hosts), rows)]
+    return university, source_url, email
+
+
+def concat(chunks, columns):
+    return pd.concat(chunks, ignore_index=True).reindex(columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--universities', type=int, default=20_000)
+    parser.add_argument('--chunk-size', type=int, default=emails_merge.CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    unis_df = synthetic_universities(rng, args.universities)
+    university, source_url, email = synthetic_rows(rng, unis_df, args.rows)
+    row_chunks = [(university[start:start + args.chunk_size], source_url[start:start + args.chunk_size],
+                   email[start:start + args.chunk_size]) for start in range(0, args.rows, args.chunk_size)]
+    print(f"Input: {args.rows} rows of {args.universities} universities in {len(row_chunks)} chunks")
+
+    results = {}
+    for name, stage in (('old', old_stage), ('per-university', new_stage)):
+        start = time.perf_counter()
+        kept, removed = stage(unis_df, row_chunks)
+        elapsed = time.perf_counter() - start
+        results[name] = (elapsed, concat(kept, emails_merge.FINAL_COLUMNS),
+                         concat(removed, emails_merge.BASE_COLUMNS + ['removal_reason', 'has_academic_url']))
+        print(f"{name:<15} {args.rows / elapsed:>12,.0f} rows/s   {elapsed:>7.1f} s   "
+              f"kept {len(results[name][1])}, removed {len(results[name][2])}")
+
+    old, new = results['old'], results['per-university']
+    same = old[1].equals(new[1]) and old[2].equals(new[2])
+    print(f"Speedup: {old[0] / new[0]:.1f}x   same rows: {'yes' if same else 'NO'}")
+    return 0 if same else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
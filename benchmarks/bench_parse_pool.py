@@ -0,0 +1,78 @@
+"""Pages/sec of EmailSpider by PARSE_PROCESSES (parsing on the reactor thread vs a process pool).
+
+    python benchmarks/bench_parse_pool.py                          # 0, 1, 2, 4 ... up to the core count
+    python benchmarks/bench_parse_pool.py --processes 0 2 8 --sites 500 --filler 4000
+
+Serves the synthetic university sites of bench_crawl_engines.py with
+heavier pages (`--filler` paragraphs each, ~35 bytes per paragraph), so
+parsing rather than the network is the bottleneck, and runs the Scrapy
+engine once per PARSE_PROCESSES value with otherwise identical settings.
+PARSE_PROCESSES=0 is the old inline parse. Every run must store the same
+emails.
+"""
+import os
+import csv
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+from bench_crawl_engines import site_host, serve, run_engine, stored_emails
+
+
+def main():
+    cores = os.cpu_count() or 1
+    default_processes = [0] + [n for n in (1, 2, 4, 8, 16, 32) if n <= max(cores, 2)]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=300)
+    parser.add_argument('--pages', type=int, default=8, help='pages per site')
+    parser.add_argument('--filler', type=int, default=2000, help='filler paragraphs per page')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds the server waits per response')
+    parser.add_argument('--port', type=int, default=8791)
+    parser.add_argument('--processes', type=int, nargs='+', default=default_processes)
+    parser.add_argument('-s', dest='settings', action='append', default=[], metavar='NAME=VALUE',
+                        help='extra setting for every run')
+    args = parser.parse_args()
+
+    settings = ['CONCURRENT_REQUESTS=64', 'CONCURRENT_REQUESTS_PER_DOMAIN=8', 'DOWNLOAD_DELAY=0',
+                'AUTOTHROTTLE_ENABLED=0', 'LOG_LEVEL=INFO', *args.settings]
+    work_dir = tempfile.mkdtemp(prefix='bench-parse-pool-')
+    input_path = os.path.join(work_dir, 'input_urls.csv')
+    with open(input_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['url'])
+        for site in range(args.sites):
+            writer.writerow([f"http://{site_host(site)}:{args.port}/"])
+
+    hits = multiprocessing.Value('q', 0)
+    server = multiprocessing.Process(target=serve, args=(args.port, args.pages, args.latency, hits, args.filler),
+                                     daemon=True)
+    server.start()
+    time.sleep(1)
+    print(f"Fixture: {args.sites} sites x {args.pages} pages of ~{args.filler * 35 // 1024} KB, "
+          f"{args.latency * 1000:.0f} ms latency; {cores} CPU core(s)")
+
+    results = {}
+    try:
+        for processes in args.processes:
+            with hits.get_lock():
+                hits.value = 0
+            sink_dir = os.path.join(work_dir, f'processes-{processes}')
+            elapsed = run_engine('scrapy', input_path, sink_dir, [*settings, f'PARSE_PROCESSES={processes}'])
+            pages = hits.value
+            emails = stored_emails(sink_dir)
+            results[processes] = (pages / elapsed, emails)
+            print(f"PARSE_PROCESSES={processes:<3} {pages / elapsed:>10,.1f} pages/s   {elapsed:>7.1f} s   "
+                  f"{pages} pages, {len(emails)} emails")
+    finally:
+        server.terminate()
+
+    baseline, baseline_emails = results[args.processes[0]]
+    for processes, (rate, emails) in list(results.items())[1:]:
+        print(f"Speedup with {processes} process(es): {rate / baseline:.2f}x   "
+              f"same emails: {'yes' if emails == baseline_emails else 'NO'}")
+    print(f"Logs and result parts: {work_dir}")
+
+
+if __name__ == '__main__':
+    main()
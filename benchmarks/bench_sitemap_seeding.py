@@ -0,0 +1,138 @@
+"""Requests per email with and without sitemap seeding (SITEMAP_SEEDS) under a per-domain page budget.
+
+    python benchmarks/bench_sitemap_seeding.py                     # 300 sites, DOMAIN_MAX_PAGES=10
+    python benchmarks/bench_sitemap_seeding.py --max-pages 0 --engine async
+
+Each synthetic site hides its staff directory three links deep
+(/organisation -> /organisation/units -> /organisation/units/people),
+behind pages with no contact words, next to a home page with 30 linked
+news pages. Its robots.txt points to a sitemap index with a gzipped page
+sitemap listing every page; a quarter of the sites have no Sitemap line
+(the crawler falls back to /sitemap.xml) and a tenth have no sitemap at all.
+Reported per run: page requests, robots/sitemap requests, emails stored and
+requests per email.
+"""
+import os
+import csv
+import gzip
+import time
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+
+from aiohttp import web
+
+from bench_crawl_engines import site_host, site_number, run_engine, stored_emails
+
+NEWS_PAGES = 30
+STAFF = 10
+CHAIN = ['/organisation', '/organisation/units', '/organisation/units/people']
+
+
+# === Fixture server ===
+def site_pages(site):
+    """path -> (links, emails) of one site."""
+    pages = {'/': (CHAIN[:1] + [f'/news/{k}' for k in range(NEWS_PAGES)], [f'info@site{site}.edu'])}
+    for k in range(NEWS_PAGES):
+        pages[f'/news/{k}'] = (['/', f'/news/{(k + 1) % NEWS_PAGES}'], [])
+    pages[CHAIN[0]] = (['/', CHAIN[1]], [])
+    pages[CHAIN[1]] = (['/', CHAIN[2]], [])
+    pages[CHAIN[2]] = (['/'], [f'staff{n}@site{site}.edu' for n in range(STAFF)])
+    return pages
+
+
+def sitemap_xml(base, paths):
+    entries = ''.join(f'<url><loc>{base}{path}</loc></url>' for path in paths)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+
+
+def serve(port, latency, page_hits, sitemap_hits):
+    async def handler(request):
+        if latency:
+            await asyncio.sleep(latency)
+        site = site_number(request.host)
+        base = f'http://{request.host}'
+        pages = site_pages(site)
+        has_sitemap, in_robots = site % 10 != 0, site % 4 != 0
+
+        if request.path in ('/robots.txt', '/sitemap.xml', '/sitemap_index.xml', '/sitemap-pages.xml.gz'):
+            with sitemap_hits.get_lock():
+                sitemap_hits.value += 1
+            if request.path == '/robots.txt':
+                sitemap_line = f'Sitemap: {base}/sitemap_index.xml\n' if has_sitemap and in_robots else ''
+                return web.Response(text=f'User-agent: *\nDisallow: /search\n{sitemap_line}')
+            if not has_sitemap:
+                return web.Response(status=404)
+            if request.path == '/sitemap-pages.xml.gz':
+                return web.Response(body=gzip.compress(sitemap_xml(base, pages).encode()),
+                                    content_type='application/x-gzip')
+            index = (f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                     f'<sitemap><loc>{base}/sitemap-pages.xml.gz</loc></sitemap></sitemapindex>')
+            return web.Response(text=index, content_type='application/xml')
+
+        if request.path not in pages:
+            return web.Response(status=404)
+        with page_hits.get_lock():
+            page_hits.value += 1
+        links, emails = pages[request.path]
+        html = (f"<html><body><h1>Site {site}</h1>{''.join(f'<a href={link!r}>{link}</a>' for link in links)}"
+                f"<p>{', '.join(emails)}</p>{'<p>lorem ipsum dolor sit amet</p>' * 40}</body></html>")
+        return web.Response(text=html, content_type='text/html')
+
+    app = web.Application()
+    app.router.add_route('GET', '/{tail:.*}', handler)
+    web.run_app(app, host='0.0.0.0', port=port, print=None, access_log=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=300)
+    parser.add_argument('--max-pages', type=int, default=10, help='DOMAIN_MAX_PAGES (0: no page budget)')
+    parser.add_argument('--seeds', type=int, default=20, help='SITEMAP_SEEDS of the seeded run')
+    parser.add_argument('--engine', choices=['scrapy', 'async'], default='scrapy')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds the server waits per response')
+    parser.add_argument('--port', type=int, default=8792)
+    args = parser.parse_args()
+
+    settings = ['CONCURRENT_REQUESTS=64', 'CONCURRENT_REQUESTS_PER_DOMAIN=2', 'DOWNLOAD_DELAY=0',
+                'AUTOTHROTTLE_ENABLED=0', 'LOG_LEVEL=INFO', f'DOMAIN_MAX_PAGES={args.max_pages}']
+    work_dir = tempfile.mkdtemp(prefix='bench-sitemap-')
+    input_path = os.path.join(work_dir, 'input_urls.csv')
+    with open(input_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['url'])
+        for site in range(args.sites):
+            writer.writerow([f"http://{site_host(site)}:{args.port}/"])
+
+    page_hits, sitemap_hits = multiprocessing.Value('q', 0), multiprocessing.Value('q', 0)
+    server = multiprocessing.Process(target=serve, args=(args.port, args.latency, page_hits, sitemap_hits), daemon=True)
+    server.start()
+    time.sleep(1)
+    total_emails = args.sites * (STAFF + 1)
+    print(f"Fixture: {args.sites} sites, {len(site_pages(0))} pages and {STAFF + 1} emails each; "
+          f"DOMAIN_MAX_PAGES={args.max_pages}, {args.engine} engine")
+
+    results = {}
+    try:
+        for name, seeds in (('root only', 0), (f'sitemaps={args.seeds}', args.seeds)):
+            for hits in (page_hits, sitemap_hits):
+                with hits.get_lock():
+                    hits.value = 0
+            sink_dir = os.path.join(work_dir, f'seeds-{seeds}')
+            elapsed = run_engine(args.engine, input_path, sink_dir, [*settings, f'SITEMAP_SEEDS={seeds}'])
+            emails = len(stored_emails(sink_dir))
+            requests = page_hits.value + sitemap_hits.value
+            results[name] = requests / max(emails, 1)
+            print(f"{name:<12} {page_hits.value:>7} page + {sitemap_hits.value:>5} sitemap requests   "
+                  f"{emails:>6} of {total_emails} emails   {results[name]:.2f} requests/email   {elapsed:.1f} s")
+    finally:
+        server.terminate()
+
+    baseline, seeded = results.values()
+    print(f"Requests per email: {baseline / seeded:.1f}x fewer with sitemap seeding")
+    print(f"Logs and result parts: {work_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Crawl time with and without the url_triage.py pre-check, on sites that are partly dead or redirected.
+
+    python benchmarks/bench_url_triage.py                          # 60 live, 20 hanging, 20 refused, 20 redirected
+    python benchmarks/bench_url_triage.py --hanging 50 --download-timeout 10 --engine async
+
+The input lists, like full_universities_list.csv:
+- live sites served by the fixture server (benchmarks/fixture_server.py);
+- hanging hosts that accept connections and never answer (timeouts);
+- refused hosts with nothing listening on the port;
+- redirected hosts whose home page is a 301 to a live site on another host.
+
+The crawl runs first on the plain input. Then url_triage.py refreshes the
+status columns and the crawl runs again, skipping refused hosts and
+starting redirected ones from their target. Hanging hosts only time out,
+which url_triage.py does not count as dead, so both crawls wait for them. Reported: the pre-check time, both crawl
+times, the time saved net of the pre-check, and the emails stored.
+"""
+import os
+import sys
+import csv
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench_crawl_engines import site_host, site_number, run_engine, stored_emails
+from fixture_server import FIXTURE_DEFAULTS, build_corpus, serve
+
+TRIAGE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'parser', 'url_triage.py')
+# Site numbers of the hosts that are not fixture sites
+HANGING_BASE, REFUSED_BASE, REDIRECT_BASE = 100_000, 200_000, 300_000
+
+
+def hang(port):
+    """Accept connections on every loopback address and never answer."""
+    server = socket.create_server(('0.0.0.0', port), backlog=1024)
+    held = []
+    while True:
+        held.append(server.accept()[0])
+
+
+def redirect(port, target_port, first_site):
+    """301 from redirect host k to the home page of fixture site first_site + k."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            site = first_site + site_number(self.headers['Host']) - REDIRECT_BASE
+            self.send_response(301)
+            self.send_header('Location', f"http://{site_host(site)}:{target_port}/")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        do_GET = do_HEAD
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--live', type=int, default=60, help='sites answered directly')
+    parser.add_argument('--hanging', type=int, default=20)
+    parser.add_argument('--refused', type=int, default=20)
+    parser.add_argument('--redirected', type=int, default=20)
+    parser.add_argument('--pages', type=int, default=8, help='pages per site')
+    parser.add_argument('--download-timeout', type=int, default=5, help='crawl DOWNLOAD_TIMEOUT (default 30 in the spider)')
+    parser.add_argument('--triage-timeout', type=float, default=3.0)
+    parser.add_argument('--engine', choices=['scrapy', 'async'], default='scrapy')
+    parser.add_argument('--port', type=int, default=8830, help='fixture port; the next three ports are used too')
+    args = parser.parse_args()
+
+    port, hang_port, refused_port, redirect_port = args.port, args.port + 1, args.port + 2, args.port + 3
+    sites = args.live + args.redirected
+    config = {**FIXTURE_DEFAULTS, 'sites': sites, 'pages': args.pages}
+    root_urls = build_corpus(config, port).root_urls(port)
+    servers = [multiprocessing.Process(target=serve, args=(config, port), daemon=True)]
+    threading.Thread(target=hang, args=(hang_port,), daemon=True).start()
+    threading.Thread(target=redirect, args=(redirect_port, port, args.live), daemon=True).start()
+    servers[0].start()
+    time.sleep(1)
+
+    urls = root_urls[:args.live]
+    urls += [f"http://{site_host(HANGING_BASE + k)}:{hang_port}/" for k in range(args.hanging)]
+    urls += [f"http://{site_host(REFUSED_BASE + k)}:{refused_port}/" for k in range(args.refused)]
+    urls += [f"http://{site_host(REDIRECT_BASE + k)}:{redirect_port}/" for k in range(args.redirected)]
+
+    work_dir = os.path.join('/tmp', f"bench-url-triage-{time.strftime('%Y%m%d-%H%M%S')}")
+    os.makedirs(work_dir)
+    input_path = os.path.join(work_dir, 'universities.csv')
+    with open(input_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['country', 'name', 'web_pages'])
+        writer.writerows(['XX', f'University {k}', url] for k, url in enumerate(urls))
+    print(f"Input: {args.live} live, {args.hanging} hanging, {args.refused} refused, {args.redirected} redirected; "
+          f"{args.pages} pages per site, DOWNLOAD_TIMEOUT={args.download_timeout}")
+
+    settings = [f'DOWNLOAD_TIMEOUT={args.download_timeout}', 'LOG_LEVEL=INFO']
+    try:
+        plain_time = run_engine(args.engine, input_path, os.path.join(work_dir, 'plain'), settings)
+        plain_emails = len(stored_emails(os.path.join(work_dir, 'plain')))
+        print(f"Without pre-check: crawl {plain_time:>7.1f} s   {plain_emails} emails")
+
+        triaged_path = os.path.join(work_dir, 'universities-triaged.csv')
+        start = time.perf_counter()
+        subprocess.run([sys.executable, TRIAGE_FILE, input_path, '--output', triaged_path,
+                        '--timeout', str(args.triage_timeout), '--connect-timeout', str(args.triage_timeout)],
+                       check=True, stdout=subprocess.DEVNULL)
+        triage_time = time.perf_counter() - start
+        triaged_time = run_engine(args.engine, triaged_path, os.path.join(work_dir, 'triaged'), settings)
+        triaged_emails = len(stored_emails(os.path.join(work_dir, 'triaged')))
+        print(f"With pre-check:    crawl {triaged_time:>7.1f} s   {triaged_emails} emails   "
+              f"(pre-check {triage_time:.1f} s)")
+    finally:
+        for server in servers:
+            server.terminate()
+
+    saved = plain_time - triaged_time
+    print(f"Saved: {saved:.1f} s of crawl for {triage_time:.1f} s of pre-check, net {saved - triage_time:+.1f} s; "
+          f"emails {plain_emails} -> {triaged_emails}")
+    print(f"Files: {work_dir}")
+
+
+if __name__ == '__main__':
+    main()
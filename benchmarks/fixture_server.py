@@ -0,0 +1,328 @@
+"""Fixture HTTP server replaying university-like sites for crawl benchmarks.
+
+    python benchmarks/fixture_server.py --port 8800 --sites 100 --latency 0.05 --error-rate 0.05
+    python benchmarks/fixture_server.py --port 8800 --corpus corpus.jsonl.gz
+    python benchmarks/fixture_server.py record --input input_urls.csv --pages 20 --output corpus.jsonl.gz
+
+Every site is served on its own loopback address (http://127.x.y.z:PORT/,
+see bench_crawl_engines.site_host), so each one is a separate host and
+domain without DNS. Sites are either synthetic (`--sites` sites of
+`--pages` pages whose links form a `tree`, `random` or `chain` graph) or
+a recorded corpus: JSON lines of {url, status, content_type, body} made
+by the `record` command, with each site's own absolute links rewritten to
+its loopback address.
+
+Faults, all deterministic for a given --seed:
+- `--latency` seconds per response, +- `--jitter` of it;
+- `--error-rate`: share of pages answering 503 to their first
+  `--error-attempts` requests (a crawler with retries recovers them);
+- `--dead-sites`: share of sites answering 500 to everything;
+- `--site-rps`: requests per second a site serves before answering 429
+  with Retry-After: 1.
+
+GET /__fixture/stats on any host returns the server counters and the
+corpus size as JSON; GET /__fixture/reset zeroes the counters.
+"""
+import os
+import sys
+import csv
+import gzip
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from collections import Counter, deque
+from urllib.parse import urljoin, urlsplit
+
+from aiohttp import web
+
+from bench_crawl_engines import PAGE_NAMES, site_host, site_number
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'parser'))
+
+from email_extractor import extract_emails
+from link_filter import canonicalize_url, is_unwanted_path
+from crawl_job import input_url_column
+
+FIXTURE_DEFAULTS = {
+    'sites': 200,
+    'pages': 12,
+    'graph': 'tree',
+    'fanout': 3,
+    'emails_per_page': 2,
+    'filler': 60,
+    'corpus': None,
+    'latency': 0.02,
+    'jitter': 0.0,
+    'error_rate': 0.0,
+    'error_attempts': 1,
+    'dead_sites': 0.0,
+    'site_rps': 0,
+    'seed': 0,
+}
+
+
+def unit(seed, *parts):
+    """Deterministic uniform number in [0, 1) for a seed and any key parts."""
+    digest = hashlib.blake2b('|'.join(map(str, (seed, *parts))).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+# === Corpora ===
+class SyntheticCorpus:
+    """`sites` sites of `pages` pages; page k links to its graph neighbours, the home page and a few decoys."""
+
+    def __init__(self, sites, pages, graph='tree', fanout=3, emails_per_page=2, filler=60, seed=0):
+        if graph not in ('tree', 'random', 'chain'):
+            raise ValueError(f"Unknown graph {graph!r}, expected tree, random or chain")
+        self.sites = sites
+        self.pages = pages
+        self.graph = graph
+        self.fanout = fanout
+        self.emails_per_page = emails_per_page
+        self.filler = filler
+        self.seed = seed
+        self.paths = ['/'] + [f"/{PAGE_NAMES[k % len(PAGE_NAMES)]}/{k}" for k in range(1, pages)]
+        self.index = {path: number for number, path in enumerate(self.paths)}
+
+    def links(self, site, page):
+        if self.graph == 'tree':
+            targets = range(page * self.fanout + 1, min(page * self.fanout + self.fanout + 1, self.pages))
+        elif self.graph == 'chain':
+            targets = [page + 1] if page + 1 < self.pages else []
+        else:
+            rng = random.Random(f"{self.seed}|{site}|{page}")
+            targets = rng.sample(range(1, self.pages), min(self.fanout, self.pages - 1)) if self.pages > 1 else []
+        return [0, *targets] if page else list(targets)
+
+    def reachable(self, site):
+        seen, queue = {0}, deque([0])
+        while queue:
+            for target in self.links(site, queue.popleft()):
+                if target not in seen:
+                    seen.add(target)
+                    queue.append(target)
+        return seen
+
+    def emails(self, site, page):
+        return [f"person{page}{chr(97 + n)}@site{site}.edu" for n in range(self.emails_per_page)] + \
+            [f"info@site{site}.edu"]
+
+    def root_urls(self, port):
+        return [f"http://{site_host(site)}:{port}/" for site in range(self.sites)]
+
+    def emails_total(self, live_sites):
+        """Distinct emails on the pages reachable from the home page of every live site."""
+        return sum(len({email for page in self.reachable(site) for email in self.emails(site, page)})
+                   for site in live_sites)
+
+    def response(self, site, path_qs):
+        """(status, content_type, body) of a page, or None if the site has no such page."""
+        page = self.index.get(path_qs.split('?')[0])
+        if page is None or site >= self.sites:
+            return None
+        links = ''.join(f'<li><a href="{self.paths[target]}?utm_source=nav">{self.paths[target]}</a></li>'
+                        for target in self.links(site, page))
+        html = (f"<html><head><title>University {site}</title></head><body><ul>{links}</ul>"
+                f"<p>Contact: {', '.join(self.emails(site, page))}</p>"
+                f"<a href=\"https://www.example.org/ranking\">Ranking</a>"
+                f"<a href=\"/files/prospectus.pdf\">Prospectus</a>{'<p>lorem ipsum dolor sit amet</p>' * self.filler}"
+                f"</body></html>")
+        return 200, 'text/html', html.encode()
+
+
+class RecordedCorpus:
+    """Pages recorded by `record`, one site per recorded origin, replayed on loopback addresses."""
+
+    def __init__(self, path, port):
+        opener = gzip.open if path.endswith('.gz') else open
+        self.pages = {}  # site -> {path_qs: (status, content_type, body)}
+        self.roots = []
+        origins = {}
+        with opener(path, 'rt', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        for record in records:
+            parts = urlsplit(record['url'])
+            origin = parts.netloc.lower()
+            if origin not in origins:
+                origins[origin] = len(origins)
+                self.roots.append(None)
+            site = origins[origin]
+            path_qs = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+            if self.roots[site] is None or path_qs == '/':
+                self.roots[site] = path_qs
+            self.pages.setdefault(site, {})[path_qs] = (record['url'], record.get('status', 200),
+                                                        record.get('content_type', 'text/html'), record['body'])
+
+        # Own absolute links point at the site's loopback address
+        for origin, site in origins.items():
+            base = f"http://{site_host(site)}:{port}"
+            for path_qs, (url, status, content_type, body) in self.pages[site].items():
+                for scheme in ('https://', 'http://'):
+                    body = body.replace(f"{scheme}{origin}", base)
+                self.pages[site][path_qs] = (status, content_type, body.encode())
+        self.sites = len(origins)
+
+    def root_urls(self, port):
+        return [f"http://{site_host(site)}:{port}{self.roots[site]}" for site in range(self.sites)]
+
+    def emails_total(self, live_sites):
+        return sum(len({email for status, _, body in self.pages[site].values() if status == 200
+                        for email in extract_emails(body)}) for site in live_sites)
+
+    def response(self, site, path_qs):
+        return self.pages.get(site, {}).get(path_qs)
+
+
+# === Server ===
+class FixtureServer:
+    def __init__(self, corpus, latency=0.02, jitter=0.0, error_rate=0.0, error_attempts=1, dead_sites=0.0,
+                 site_rps=0, seed=0):
+        self.corpus = corpus
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_attempts = error_attempts
+        self.dead_sites = dead_sites
+        self.site_rps = site_rps
+        self.seed = seed
+        self.live_sites = [site for site in range(corpus.sites) if not self.is_dead(site)]
+        self.emails_total = corpus.emails_total(self.live_sites)
+        self.reset()
+
+    def reset(self):
+        self.counts = Counter()
+        self.attempts = Counter()  # (site, path) -> requests so far
+        self.windows = {}  # site -> (second, requests in it)
+        self.started = time.monotonic()
+
+    def is_dead(self, site):
+        return unit(self.seed, 'dead', site) < self.dead_sites
+
+    def rate_limited(self, site):
+        second = int(time.monotonic())
+        window_second, count = self.windows.get(site, (second, 0))
+        count = count + 1 if window_second == second else 1
+        self.windows[site] = (second, count)
+        return count > self.site_rps
+
+    def stats(self):
+        return {**self.counts, 'elapsed': round(time.monotonic() - self.started, 3), 'sites': self.corpus.sites,
+                'live_sites': len(self.live_sites), 'emails_total': self.emails_total}
+
+    async def handle(self, request):
+        if request.path.startswith('/__fixture/'):
+            if request.path == '/__fixture/reset':
+                self.reset()
+            return web.json_response(self.stats())
+
+        site = site_number(request.host)
+        key = (site, request.path_qs)
+        self.attempts[key] += 1
+        self.counts['requests'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * (1 + self.jitter * (2 * unit(self.seed, 'latency', *key) - 1)))
+
+        if self.site_rps and self.rate_limited(site):
+            return self.respond(429, headers={'Retry-After': '1'})
+        if self.is_dead(site):
+            return self.respond(500)
+        page = self.corpus.response(site, request.path_qs)
+        if page is None:
+            return self.respond(404)
+        if self.attempts[key] <= self.error_attempts and unit(self.seed, 'error', *key) < self.error_rate:
+            return self.respond(503)
+        status, content_type, body = page
+        self.counts['bytes'] += len(body)
+        if status == 200:
+            self.counts['pages'] += 1
+        return self.respond(status, body, content_type)
+
+    def respond(self, status, body=b'', content_type='text/html', headers=None):
+        self.counts[f'status_{status}'] += 1
+        return web.Response(status=status, body=body, content_type=content_type, headers=headers)
+
+    def run(self, port):
+        app = web.Application()
+        app.router.add_route('GET', '/{tail:.*}', self.handle)
+        web.run_app(app, host='0.0.0.0', port=port, print=None, access_log=None)
+
+
+def build_corpus(config, port):
+    if config['corpus']:
+        return RecordedCorpus(config['corpus'], port)
+    return SyntheticCorpus(config['sites'], config['pages'], config['graph'], config['fanout'],
+                           config['emails_per_page'], config['filler'], config['seed'])
+
+
+def serve(config, port):
+    """Run a fixture server for a FIXTURE_DEFAULTS-style config (blocks; start it in a process)."""
+    FixtureServer(build_corpus(config, port), config['latency'], config['jitter'], config['error_rate'],
+                  config['error_attempts'], config['dead_sites'], config['site_rps'], config['seed']).run(port)
+
+
+# === Recording ===
+def record(input_path, output, pages, timeout=15):
+    """Fetch up to `pages` same-host pages (breadth first) of every input site into a corpus file."""
+    import httpx
+    from parsel import Selector
+
+    with open(input_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        url_column = input_url_column(next(reader))
+        roots = [row[url_column].strip() for row in reader if row]
+
+    opener = gzip.open if output.endswith('.gz') else open
+    with httpx.Client(follow_redirects=True, timeout=timeout, verify=False) as client, \
+            opener(output, 'wt', encoding='utf-8') as out:
+        for root in roots:
+            host = urlsplit(root).netloc.lower()
+            queue, seen, fetched = deque([root]), {root}, 0
+            while queue and fetched < pages:
+                url = queue.popleft()
+                try:
+                    response = client.get(url)
+                except httpx.HTTPError as e:
+                    print(f"⚠️ {url}: {e.__class__.__name__}")
+                    continue
+                fetched += 1
+                content_type = response.headers.get('content-type', 'text/html').split(';')[0]
+                body = response.text if content_type.startswith('text/') else ''
+                out.write(json.dumps({'url': url, 'status': response.status_code,
+                                      'content_type': content_type, 'body': body}) + '\n')
+                if not body:
+                    continue
+                for href in Selector(text=body).css('a::attr(href)').getall():
+                    link = canonicalize_url(urljoin(str(response.url), href.strip()))
+                    if link and urlsplit(link).netloc == host and link not in seen and \
+                            not is_unwanted_path(urlsplit(link).path):
+                        seen.add(link)
+                        queue.append(link)
+            print(f"📦 {root}: {fetched} pages")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    if len(sys.argv) > 1 and sys.argv[1] == 'record':
+        parser.add_argument('command')
+        parser.add_argument('--input', required=True, help='CSV with a url (or web_pages) column')
+        parser.add_argument('--output', required=True, help='corpus file (.jsonl or .jsonl.gz)')
+        parser.add_argument('--pages', type=int, default=20, help='pages per site')
+        args = parser.parse_args()
+        record(args.input, args.output, args.pages)
+        return
+
+    parser.add_argument('--port', type=int, default=8800)
+    for name, default in FIXTURE_DEFAULTS.items():
+        kind = type(default) if default is not None else str
+        parser.add_argument(f"--{name.replace('_', '-')}", type=kind, default=default)
+    args = vars(parser.parse_args())
+    port = args.pop('port')
+    print(f"Serving fixture sites on http://127.0.0.1:{port}/ (stats: /__fixture/stats)")
+    serve(args, port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+import time
+import random
+import asyncio
+import logging
+import itertools
+from collections import deque
+
+import httpx
+from parsel import Selector
+from scrapy.settings import Settings
+from w3lib.html import get_base_url
+
+from crawl_state import FAILED
+from crawl_job import CrawlJob, CRAWL_SETTINGS
+from result_sink import ResultSinkPipeline
+from email_extractor import extract_emails, response_body
+from domain_budget import DomainBudget
+from domain_resolver import url_host
+from sitemap_seeder import SitemapSeeder, SEED_PRIORITY
+
+# Same defaults Scrapy sends with every request
+DEFAULT_REQUEST_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en',
+}
+# Responses whose links are followed; anything else (PDFs, images) is only scanned for emails
+LINK_CONTENT_TYPES = ('text/', 'application/xhtml', 'application/xml')
+
+
+class HostSlot:
+    """Concurrency and politeness state of one host (Scrapy's downloader slot)."""
+
+    def __init__(self):
+        self.active = 0
+        self.deferred = deque()
+        self.next_start = 0.0
+
+
+class AsyncEmailCrawler(CrawlJob):
+    """Email crawl on asyncio and httpx, without the Scrapy/Twisted runtime.
+
+    Runs the same CrawlJob as EmailSpider (input CSV, shards, dedup, domain
+    budget, crawl state) with the same extraction, link filter and result
+    sink, so its output is interchangeable with the Scrapy engine's. Settings
+    are CRAWL_SETTINGS plus `-s` overrides; options are the spider's `-a`
+    arguments.
+
+    CONCURRENT_REQUESTS workers pull from one priority frontier. A worker
+    that picks up a URL of a host already at CONCURRENT_REQUESTS_PER_DOMAIN
+    parks it on the host slot instead of waiting, and the host's next
+    finished request puts it back. DOWNLOAD_DELAY spaces request starts per
+    host; AutoThrottle has no equivalent here.
+    """
+
+    name = 'async_email_crawler'
+
+    def __init__(self, settings=None, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+        self.logger = logging.getLogger(self.name)
+        self.settings = Settings(CRAWL_SETTINGS)
+        self.settings.setdict(settings or {}, priority='cmdline')
+        self.domain_budget = DomainBudget.from_settings(self.settings)
+        self.sitemap_seeder = SitemapSeeder.from_settings(self.settings)
+        self.setup_job()
+
+        self.sink = ResultSinkPipeline.from_settings(self.settings)
+        self.sink.use_reactor_timer = False
+        self.concurrency = self.settings.getint('CONCURRENT_REQUESTS')
+        self.per_host = self.settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN')
+        self.download_delay = self.settings.getfloat('DOWNLOAD_DELAY')
+        self.randomize_delay = self.settings.getbool('RANDOMIZE_DOWNLOAD_DELAY', True)
+        self.retry_times = self.settings.getint('RETRY_TIMES') if self.settings.getbool('RETRY_ENABLED', True) else 0
+        self.retry_codes = {int(code) for code in self.settings.getlist('RETRY_HTTP_CODES')}
+        self.slots = {}
+        self.stats = {'pages': 0, 'bytes': 0, 'items': 0, 'errors': 0, 'retries': 0}
+        self._sequence = itertools.count()
+
+    def run(self):
+        asyncio.run(self.crawl())
+        return self.stats
+
+    async def crawl(self):
+        started = time.monotonic()
+        self.frontier = asyncio.PriorityQueue()
+        for url, domain, depth, resumed in self.start_targets():
+            self.schedule(url, domain, depth, self.domain_budget.priority(url) if resumed else 0)
+            robots_url = self.sitemap_seeder and not resumed and self.sitemap_seeder.start(domain, url)
+            if robots_url:
+                self.schedule(robots_url, domain, 0, SEED_PRIORITY, kind='robots')
+        self.sink.open_spider(self)
+
+        client = httpx.AsyncClient(
+            headers={**DEFAULT_REQUEST_HEADERS, 'User-Agent': self.settings.get('USER_AGENT')},
+            timeout=self.settings.getfloat('DOWNLOAD_TIMEOUT'),
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            follow_redirects=True,
+            verify=False,  # Scrapy does not verify certificates either
+        )
+        async with client:
+            workers = [asyncio.create_task(self.worker(client)) for _ in range(self.concurrency)]
+            flusher = asyncio.create_task(self.flush_results())
+            try:
+                await self.frontier.join()
+            finally:
+                for task in (*workers, flusher):
+                    task.cancel()
+                await asyncio.gather(*workers, flusher, return_exceptions=True)
+
+        self.sink.close_spider(self)
+        self.close_job()
+        elapsed = time.monotonic() - started
+        self.stats['elapsed'] = elapsed
+        self.logger.info(f"Crawled {self.stats['pages']} pages in {elapsed:.1f} s "
+                         f"({self.stats['pages'] / max(elapsed, 1e-9):.1f} pages/s), {self.stats['errors']} errors.")
+
+    def schedule(self, url, domain, depth, priority=0, kind='page'):
+        # Higher priority first (as in Scrapy), then first come first served
+        self.frontier.put_nowait((-priority, next(self._sequence), url, domain, depth, kind))
+
+    async def flush_results(self):
+        if not self.sink.flush_interval:
+            return
+        while True:
+            await asyncio.sleep(min(self.sink.flush_interval, 30))
+            self.sink.check_interval()
+
+    # === Workers ===
+    async def worker(self, client):
+        while True:
+            entry = await self.frontier.get()
+            slot = self.slots.setdefault(url_host(entry[2]), HostSlot())
+            if slot.active >= self.per_host:
+                slot.deferred.append(entry)
+                self.frontier.task_done()
+                continue
+
+            slot.active += 1
+            try:
+                if entry[5] == 'page':
+                    await self.process(client, slot, *entry[2:5])
+                else:
+                    await self.process_sitemap(client, slot, entry[2], entry[3], entry[5])
+            except Exception:
+                self.logger.exception(f"Error processing {entry[2]}")
+            finally:
+                slot.active -= 1
+                if slot.deferred:
+                    self.frontier.put_nowait(slot.deferred.popleft())
+                self.frontier.task_done()
+
+    async def wait_for_slot(self, slot):
+        delay = self.download_delay
+        if delay and self.randomize_delay:
+            delay *= random.uniform(0.5, 1.5)
+        now = time.monotonic()
+        start = max(now, slot.next_start)
+        slot.next_start = start + delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def fetch(self, client, slot, url, domain):
+        """(response, latency) after retries; response is None when every attempt failed to connect."""
+        response = None
+        headers = self.page_cache.validators(url) if self.page_cache else {}
+        for attempt in range(self.retry_times + 1):
+            if attempt:
+                self.stats['retries'] += 1
+            await self.wait_for_slot(slot)
+            started = time.monotonic()
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.HTTPError as e:
+                response = None
+                self.metrics.error(domain, e.__class__.__name__)
+                self.logger.debug(f"Fetch failed ({e.__class__.__name__}: {e}) for {url}")
+                continue
+            self.metrics.response(domain, len(response.content), time.monotonic() - started, response.status_code)
+            if response.status_code not in self.retry_codes:
+                break
+        return response, time.monotonic() - started
+
+    async def process(self, client, slot, url, domain, depth):
+        if self.domain_budget.is_exhausted(domain) or not self.domain_budget.reserve(domain):
+            self.page_done(url, status=FAILED)
+            return
+
+        try:
+            response, latency = await self.fetch(client, slot, url, domain)
+        finally:
+            self.domain_budget.release(domain)
+        if response is None or not (response.is_success or response.status_code == 304):
+            self.stats['errors'] += 1
+            self.record_error(url, str(response.url) if response is not None else url)
+            return
+
+        body = response.content
+        page_url = str(response.url)
+        # The validators sent were those of `url`, even if the 304 came from a redirect target
+        cached = self.cached_page(url if response.status_code == 304 else page_url,
+                                  response.status_code, body, response.headers)
+        if cached is None and (not body or response.status_code == 304):
+            self.page_done(url)
+            return
+        self.stats['pages'] += 1
+        self.stats['bytes'] += len(body)
+
+        if cached is not None:
+            emails, links = cached
+        else:
+            with self.metrics.parsing(domain):
+                emails = extract_emails(response_body(response))
+                links = []
+                content_type = response.headers.get('content-type', 'text/html').lower()
+                # Links of every page go to the page cache, so a later crawl can replay them
+                if content_type.startswith(LINK_CONTENT_TYPES) and (self.page_cache or self.wants_links(domain, depth)):
+                    text = response.text
+                    hrefs = Selector(text=text).css('a::attr(href)').getall()
+                    links = list(self.link_filter.links(get_base_url(text[:4096], page_url), hrefs))
+            self.cache_page(page_url, body, response.headers, emails, links)
+
+        new_emails = self.record_page(page_url, domain, len(body), latency, emails)
+        if new_emails:
+            self.stats['items'] += 1
+            self.sink.process_item({'url': page_url, 'emails': list(new_emails)})
+
+        if links and self.wants_links(domain, depth):
+            for next_url in self.follow_candidates(links, domain, depth):
+                self.schedule(next_url, domain, depth + 1, self.domain_budget.priority(next_url))
+
+        self.page_done(url)
+
+    async def process_sitemap(self, client, slot, url, domain, stage):
+        response, _ = await self.fetch(client, slot, url, domain)
+        body = response.content if response is not None and response.is_success else None
+        with self.metrics.stage('sitemap'):
+            if stage == 'robots':
+                # No robots.txt falls back to /sitemap.xml; a failed sitemap just counts as read
+                sitemaps = self.sitemap_seeder.robots_done(domain, url, body)
+            else:
+                sitemaps = self.sitemap_seeder.sitemap_done(domain, body)
+        for sitemap_url in sitemaps:
+            self.schedule(sitemap_url, domain, 0, SEED_PRIORITY, kind='sitemap')
+        if self.sitemap_seeder.finished(domain):
+            for seed_url in self.sitemap_seed_links(domain):
+                self.schedule(seed_url, domain, 1, SEED_PRIORITY)
@@ -0,0 +1,141 @@
+import csv
+import gzip
+
+PARQUET_SUFFIX = '.parquet'
+# Rows buffered per Parquet row group when writing row by row
+ROW_GROUP_ROWS = 50000
+
+
+def pyarrow_modules():
+    """(pyarrow, pyarrow.parquet); pyarrow is only needed for Parquet input or output."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet files need pyarrow: pip install pyarrow") from e
+    return pyarrow, pyarrow.parquet
+
+
+def is_parquet(path):
+    return path.endswith(PARQUET_SUFFIX)
+
+
+def emails_schema():
+    """Crawl output: one row per page, its emails as a list<string> column."""
+    pa, _ = pyarrow_modules()
+    return pa.schema([('url', pa.string()), ('emails', pa.list_(pa.string()))])
+
+
+def iter_parquet_batches(path, columns, batch_size):
+    """Record batches of only `columns`, read from a memory-mapped Parquet file."""
+    _, pq = pyarrow_modules()
+    parquet_file = pq.ParquetFile(path, memory_map=True)
+    yield from parquet_file.iter_batches(batch_size=batch_size, columns=columns)
+
+
+def explode_email_batch(batch):
+    """(url, email) table with one row per email of a record batch, flattened in Arrow.
+
+    A page with an empty email list keeps one row with a null email, like
+    an empty `emails` cell exploded by pandas.
+    """
+    pa, _ = pyarrow_modules()
+    import pyarrow.compute as pc
+    emails = batch.column('emails')
+    empty = pc.equal(pc.list_value_length(emails).fill_null(0), 0)
+    if pc.any(empty).as_py():
+        emails = pc.if_else(empty, pa.scalar([None], type=emails.type), emails)
+    return pa.table({
+        'url': batch.column('url').take(pc.list_parent_indices(emails)),
+        'email': pc.list_flatten(emails),
+    })
+
+
+def read_email_rows(path):
+    """(url, emails) rows of a crawl output file: Parquet, gzip CSV part or plain CSV."""
+    if is_parquet(path):
+        for batch in iter_parquet_batches(path, ['url', 'emails'], ROW_GROUP_ROWS):
+            yield from zip(batch.column('url').to_pylist(), batch.column('emails').to_pylist())
+        return
+
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for url, emails in reader:
+            yield url, [email.strip() for email in emails.split(',')] if emails else []
+
+
+class EmailsCsvWriter:
+    """Writes crawl output rows as `url,emails` CSV (gzip-compressed for .gz paths)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        if path.endswith('.gz'):
+            self._raw = open(path, 'wb')
+            self._file = gzip.open(self._raw, 'wt', newline='', encoding='utf-8')
+        else:
+            self._raw = self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(['url', 'emails'])
+
+    def write(self, url, emails):
+        self._writer.writerow([url, ', '.join(emails)])
+        self.rows += 1
+
+    def size(self):
+        """Bytes written to the file so far (compressed for .gz)."""
+        return self._raw.tell()
+
+    def close(self):
+        self._file.close()
+        self._raw.close()
+
+
+class EmailsParquetWriter:
+    """Writes crawl output rows to Parquet (zstd), one row group per `row_group_rows` rows.
+
+    Rows are buffered until a row group is full, so `size` is an estimate:
+    the bytes written so far plus the raw text of the buffered rows.
+    """
+
+    def __init__(self, path, row_group_rows=ROW_GROUP_ROWS):
+        _, pq = pyarrow_modules()
+        self.path = path
+        self.row_group_rows = row_group_rows
+        self.rows = 0
+        self._schema = emails_schema()
+        self._sink = open(path, 'wb')
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression='zstd')
+        self._urls = []
+        self._emails = []
+        self._buffered_bytes = 0
+
+    def write(self, url, emails):
+        self._urls.append(url)
+        self._emails.append(list(emails))
+        self._buffered_bytes += len(url) + sum(len(email) for email in emails)
+        self.rows += 1
+        if len(self._urls) >= self.row_group_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._urls:
+            return
+        pa, _ = pyarrow_modules()
+        self._writer.write_table(pa.table([self._urls, self._emails], schema=self._schema))
+        self._urls, self._emails, self._buffered_bytes = [], [], 0
+
+    def size(self):
+        return self._sink.tell() + self._buffered_bytes
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        self._sink.close()
+
+
+def emails_writer(path, row_group_rows=ROW_GROUP_ROWS):
+    """Crawl output writer picked by file name: Parquet for .parquet, else CSV."""
+    return EmailsParquetWriter(path, row_group_rows) if is_parquet(path) else EmailsCsvWriter(path)
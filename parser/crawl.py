@@ -0,0 +1,61 @@
+"""Run the email crawl on either engine with the same options, input and output.
+
+    python crawl.py                                        # Scrapy (EmailSpider)
+    python crawl.py --engine async                         # asyncio/httpx (AsyncEmailCrawler)
+    python crawl.py --engine async -a input_path=input_urls.csv -s CONCURRENT_REQUESTS=64
+
+`-a NAME=VALUE` sets a spider option and `-s NAME=VALUE` a setting, as with
+`scrapy runspider`. The default engine comes from CRAWL_ENGINE. With the
+Scrapy engine, any other argument is passed through to scrapy.
+"""
+import os
+import sys
+import logging
+import argparse
+import subprocess
+
+SPIDER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'email_spider.py')
+ENGINES = ('scrapy', 'async')
+
+
+def key_value(text):
+    name, sep, value = text.partition('=')
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {text!r}")
+    return name, value
+
+
+def run_scrapy(options, settings, extra_args):
+    cmd = [sys.executable, '-m', 'scrapy', 'runspider', SPIDER_FILE]
+    for flag, pairs in (('-a', options), ('-s', settings)):
+        for name, value in pairs:
+            cmd += [flag, f'{name}={value}']
+    return subprocess.call(cmd + extra_args)
+
+
+def run_async(options, settings):
+    from async_crawler import AsyncEmailCrawler
+
+    logging.basicConfig(level=dict(settings).get('LOG_LEVEL', 'INFO'),
+                        format='%(asctime)s [%(name)s] %(levelname)s: %(message)s')
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    AsyncEmailCrawler(settings=dict(settings), **dict(options)).run()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engine', choices=ENGINES, default=os.getenv('CRAWL_ENGINE', 'scrapy'))
+    parser.add_argument('-a', dest='options', action='append', type=key_value, default=[], metavar='NAME=VALUE')
+    parser.add_argument('-s', dest='settings', action='append', type=key_value, default=[], metavar='NAME=VALUE')
+    args, extra_args = parser.parse_known_args(argv)
+
+    if args.engine == 'scrapy':
+        return run_scrapy(args.options, args.settings, extra_args)
+    if extra_args:
+        parser.error(f"unrecognized arguments for the async engine: {' '.join(extra_args)}")
+    return run_async(args.options, args.settings)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,349 @@
+import os
+import csv
+import ast
+import hashlib
+
+import boto3
+
+from crawl_state import CrawlState, DONE, FAILED
+from dedup import FingerprintSet
+from page_cache import PageCache
+from crawl_metrics import CrawlMetrics
+from link_filter import LinkFilter
+from domain_resolver import registrable_domain, url_host
+
+# Crawl settings shared by both engines (EmailSpider.custom_settings and AsyncEmailCrawler)
+CRAWL_SETTINGS = {
+    'DEPTH_LIMIT': 5,
+    'ROBOTSTXT_OBEY': False,
+    'DOWNLOAD_DELAY': 0.1,
+    'CONCURRENT_REQUESTS': 24,
+    'CONCURRENT_REQUESTS_PER_DOMAIN': 8,
+    'DOWNLOAD_TIMEOUT': 30,
+    'RETRY_TIMES': 3,
+    'RETRY_HTTP_CODES': [500, 502, 503, 504, 522, 524, 408, 429],
+    'AUTOTHROTTLE_ENABLED': True,
+    'AUTOTHROTTLE_START_DELAY': 0.25,
+    'AUTOTHROTTLE_MAX_DELAY': 5,
+    'AUTOTHROTTLE_TARGET_CONCURRENCY': 6.0,
+    'DOWNLOAD_FAIL_ON_DATALOSS': False,
+    'USER_AGENT': 'Mozilla/5.0 (compatible; EmailScraper/1.0; +http://example.com/bot)',
+}
+
+# Input columns written by url_triage.py
+STATUS_COLUMN = 'url_status_codes'
+VALID_COLUMN = 'all_urls_valid'
+FINAL_URL_COLUMN = 'final_urls'
+# Separator of several URLs in one web_pages cell of full_universities_list.csv
+URL_SEPARATOR = "', '"
+# url_status_codes errors of hosts the crawl skips (ConnectionError covers DNS failures and refused connections)
+DEAD_STATUSES = ('ERROR: ConnectionError', 'ERROR: SSLError')
+
+
+class CrawlJob:
+    """Input, sharding, dedup, budget and crawl-state bookkeeping of an email crawl.
+
+    Engine-independent half of EmailSpider, shared with the asyncio engine
+    (async_crawler.py). Options come from attributes set by the engine
+    (`-a name=value`) with env fallbacks; the engine provides `logger`,
+    `settings`, `domain_budget` and `sitemap_seeder`.
+    """
+
+    def setup_job(self):
+        self.bucket = os.getenv('AWS_BUCKET_NAME', 'email-scraper-university')
+        self.input_file = os.getenv('INPUT_CSV_FILENAME', 'input_urls.csv')
+        self.output_file = os.getenv('OUTPUT_FILENAME', 'results_emails.csv')
+        self.s3 = boto3.client('s3')
+        self.allowed_domains = set()
+        # Seen emails as 64-bit fingerprints; spills to disk past the memory cap (-a dedup_max_memory_mb=...)
+        dedup_max_memory_mb = float(getattr(self, 'dedup_max_memory_mb', None) or os.getenv('DEDUP_MAX_MEMORY_MB', 256))
+        self.found_emails = FingerprintSet(max_memory_bytes=int(dedup_max_memory_mb * 1024 * 1024),
+                                           spill_dir=os.getenv('DEDUP_SPILL_DIR'))
+        # Canonical URLs already scheduled, checked before a request is built
+        self.link_filter = LinkFilter(domain_from_url, FingerprintSet(
+            max_memory_bytes=int(dedup_max_memory_mb * 1024 * 1024), spill_dir=os.getenv('DEDUP_SPILL_DIR')
+        ))
+        self.error_counts = {}
+        self.error_threshold = 3  # Maximum 3 errors per domain
+        # Local input file instead of the S3 object (-a input_path=... or INPUT_CSV_PATH)
+        self.input_path = getattr(self, 'input_path', None) or os.getenv('INPUT_CSV_PATH')
+        # Use the url_status_codes / final_urls columns written by url_triage.py (-a url_triage=0 to ignore them)
+        self.url_triage = str(getattr(self, 'url_triage', None) or os.getenv('URL_TRIAGE', '1')).lower() \
+            not in ('0', 'false', 'no')
+
+        # Shard mode (-a shard_index=0 -a shard_count=4 or SHARD_INDEX/SHARD_COUNT): crawl only the
+        # domains hashed to this worker and keep output and state apart from the other shards
+        self.shard_index = int(getattr(self, 'shard_index', None) or os.getenv('SHARD_INDEX', 0))
+        self.shard_count = int(getattr(self, 'shard_count', None) or os.getenv('SHARD_COUNT', 1))
+        if not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(f"shard_index must be in [0, {self.shard_count}), got {self.shard_index}")
+        self.shard_suffix = ''
+        if self.shard_count > 1:
+            self.shard_suffix = shard_name(self.shard_index, self.shard_count)
+            base, ext = os.path.splitext(self.output_file)
+            self.output_file = f"{base}/{self.shard_suffix}{ext}"
+
+        # Checkpointed crawl state (-a state_db=... or CRAWL_STATE_DB); a restart with the same file resumes
+        self.state_db = getattr(self, 'state_db', None) or os.getenv('CRAWL_STATE_DB')
+        if self.state_db and self.shard_suffix:
+            base, ext = os.path.splitext(self.state_db)
+            self.state_db = f"{base}-{self.shard_suffix}{ext}"
+        self.crawl_state = None
+        if self.state_db:
+            self.crawl_state = CrawlState(self.state_db)
+            self.found_emails.update(self.crawl_state.iter_found_emails())
+            self.error_counts = self.crawl_state.error_counts()
+
+        # Validators and parse results kept across crawls (-a page_cache_db=... or PAGE_CACHE_DB); a re-crawl
+        # revalidates known pages and replays unchanged ones without parsing them
+        self.page_cache_db = getattr(self, 'page_cache_db', None) or os.getenv('PAGE_CACHE_DB')
+        if self.page_cache_db and self.shard_suffix:
+            base, ext = os.path.splitext(self.page_cache_db)
+            self.page_cache_db = f"{base}-{self.shard_suffix}{ext}"
+        self.page_cache = PageCache(self.page_cache_db) if self.page_cache_db else None
+
+        # Per-domain counters and stage timings, served on -a metrics_port=... (METRICS_PORT; shard i uses
+        # port + i) and written to -a metrics_file=... (METRICS_FILE, '' for none) when the crawl closes
+        self.metrics = CrawlMetrics()
+        self.metrics_file = getattr(self, 'metrics_file', None)
+        if self.metrics_file is None:
+            self.metrics_file = os.getenv('METRICS_FILE', 'crawl_metrics.json')
+        if self.metrics_file and self.shard_suffix:
+            base, ext = os.path.splitext(self.metrics_file)
+            self.metrics_file = f"{base}-{self.shard_suffix}{ext}"
+        metrics_port = int(getattr(self, 'metrics_port', None) or os.getenv('METRICS_PORT', 0))
+        if metrics_port:
+            port = self.metrics.serve(metrics_port + self.shard_index, os.getenv('METRICS_HOST', '127.0.0.1'))
+            self.logger.info(f"Crawl metrics on port {port}: /metrics (Prometheus) and /metrics.json")
+
+    # === Start ===
+    def start_targets(self):
+        """(url, domain, depth, resumed) of every request to schedule at start.
+
+        Seeds come from the input CSV (this shard's domains only); on resume,
+        the pending frontier of the crawl state follows with resumed=True.
+        """
+        local_file = self.input_path
+        if not local_file:
+            local_file = f"/tmp/input_urls{'-' + self.shard_suffix if self.shard_suffix else ''}.csv"
+            self.s3.download_file(self.bucket, self.input_file, local_file)
+
+        pending = []
+        if self.crawl_state and self.crawl_state.has_frontier():
+            pending = self.crawl_state.pending_requests()
+            self.logger.info(f"Resuming crawl from {self.state_db}: {len(pending)} pending requests, "
+                             f"{len(self.found_emails)} emails already found.")
+
+        with open(local_file, newline='', encoding='utf-8') as csvfile:
+            reader = csv.reader(csvfile)
+            header = next(reader)
+            url_column = input_url_column(header)
+            status_column, final_column = triage_columns(header) if self.url_triage else (None, None)
+            if self.url_triage and final_column is None and STATUS_COLUMN in header_names(header):
+                self.logger.info(f"Ignoring {STATUS_COLUMN}: {local_file} has no {FINAL_URL_COLUMN} column, "
+                                 f"so it was not written by url_triage.py.")
+            dead = 0
+            for row in reader:
+                for input_url, url, is_dead in row_targets(row, url_column, status_column, final_column):
+                    # Shards split on the input domain, so a refreshed triage never moves a university
+                    input_domain = domain_from_url(input_url)
+                    if self.shard_count > 1 and shard_for_domain(input_domain, self.shard_count) != self.shard_index:
+                        continue
+                    if is_dead:
+                        dead += 1
+                        continue
+                    domain = domain_from_url(url)
+                    self.allowed_domains.add(domain)
+                    self.link_filter.add(url)
+
+                    if self.crawl_state and not self.crawl_state.add_request(url, domain, 0):
+                        continue
+                    yield url, domain, 0, False
+            if status_column is not None:
+                self.logger.info(f"Skipped {dead} seed URLs of dead hosts (DNS, refused, TLS) in {STATUS_COLUMN}.")
+
+        for url, domain, depth in pending:
+            if self.error_counts.get(domain_from_url(url), 0) >= self.error_threshold:
+                continue
+            yield url, domain, depth, True
+
+    # === Pages ===
+    def record_page(self, url, domain, size, latency, emails):
+        """Keep the emails not seen before and charge the page to the domain budget; returns them."""
+        with self.metrics.stage('dedup'):
+            new_emails = {email for email in emails if email not in self.found_emails}
+            if new_emails:
+                self.found_emails.update(new_emails)
+                if self.crawl_state:
+                    self.crawl_state.add_emails(url, new_emails)
+        self.metrics.new_emails(domain, len(new_emails))
+
+        stop_reason = self.domain_budget.record(domain, size, latency, len(new_emails))
+        if stop_reason:
+            self.logger.info(f"Stopping domain {domain}: {stop_reason}.")
+        return new_emails
+
+    def cached_page(self, url, status, body, headers):
+        """(emails, links) of a page unchanged since the last crawl, else None."""
+        if not self.page_cache:
+            return None
+        with self.metrics.stage('page_cache'):
+            return self.page_cache.unchanged(url, status, body, headers.get('ETag'), headers.get('Last-Modified'))
+
+    def cache_page(self, url, body, headers, emails, links):
+        if self.page_cache:
+            with self.metrics.stage('page_cache'):
+                self.page_cache.store(url, body, headers.get('ETag'), headers.get('Last-Modified'), emails, links)
+
+    def wants_links(self, domain, depth):
+        """False once the domain is out of budget or the next depth is past DEPTH_LIMIT."""
+        depth_limit = self.settings.getint('DEPTH_LIMIT')
+        return not self.domain_budget.is_exhausted(domain) and not (depth_limit and depth + 1 > depth_limit)
+
+    def follow_links(self, base_url, hrefs, domain, depth):
+        """New in-scope URLs among a page's hrefs, recorded in the crawl state."""
+        return self.follow_candidates(self.link_filter.links(base_url, hrefs), domain, depth)
+
+    def follow_candidates(self, candidates, domain, depth):
+        """New in-scope URLs among (url, domain) candidates from LinkFilter.links."""
+        with self.metrics.stage('follow'):
+            discovered = 0
+            links = []
+            for next_url, next_domain in candidates:
+                discovered += 1
+                if next_domain not in self.allowed_domains:
+                    continue
+                if self.error_counts.get(next_domain, 0) >= self.error_threshold:
+                    continue
+                links.append((next_url, next_domain))
+
+            urls = []
+            for next_url, _ in self.link_filter.unseen(links):
+                if self.crawl_state and not self.crawl_state.add_request(next_url, domain, depth + 1):
+                    continue
+                urls.append(next_url)
+        self.metrics.links(domain, discovered, len(urls))
+        return urls
+
+    def sitemap_seed_links(self, domain):
+        """New in-scope URLs among the sitemap seeds of a domain whose sitemaps are all read (depth 1)."""
+        root_url = self.sitemap_seeder.domains[domain].root_url
+        return self.follow_candidates(self.link_filter.links(root_url, self.sitemap_seeder.seeds(domain)), domain, 0)
+
+    def page_done(self, request_url, status=DONE):
+        # Called last for a page, so a checkpoint never has a done page without its emails and links
+        if self.crawl_state:
+            self.crawl_state.mark_done(request_url, status=status)
+
+    def record_error(self, request_url, url):
+        domain = domain_from_url(url)
+        self.error_counts[domain] = self.error_counts.get(domain, 0) + 1
+        if self.crawl_state:
+            self.crawl_state.mark_done(request_url, status=FAILED)
+            self.crawl_state.increment_error(domain)
+
+        if self.error_counts[domain] == self.error_threshold:
+            self.logger.warning(f"Excluding domain {domain} due to repeated request failures.")
+
+    def close_job(self):
+        self.logger.info(f"Email dedup: {self.found_emails.report()}")
+        self.logger.info(f"Crawl metrics: {self.metrics.report()}\n{self.metrics.timings.report()}")
+        if self.metrics_file:
+            self.metrics.dump(self.metrics_file)
+            self.logger.info(f"Crawl metrics saved to {self.metrics_file}")
+        self.metrics.close()
+        if self.sitemap_seeder:
+            self.logger.info(f"Sitemap seeding: {self.sitemap_seeder.report()}")
+        if self.page_cache:
+            self.logger.info(f"Page cache {self.page_cache_db}: {self.page_cache.report()}")
+            self.page_cache.close()
+        if self.crawl_state:
+            self.logger.info(f"Crawl state saved to {self.state_db}: {self.crawl_state.progress()}")
+            self.crawl_state.close()
+
+
+def domain_from_url(url):
+    """Registrable domain of a URL (`ox.ac.uk`, not `ac.uk`); the bare host for IPs and `localhost`."""
+    return registrable_domain(url) or url_host(url)
+
+
+def shard_name(shard_index, shard_count):
+    return f"shard-{shard_index:03d}-of-{shard_count:03d}"
+
+
+def shard_for_domain(domain, shard_count):
+    """Stable shard number for a domain (same on every node and Python run)."""
+    digest = hashlib.md5(domain.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def header_names(header):
+    return [name.strip().lstrip('\ufeff').lower() for name in header]
+
+
+def input_url_column(header):
+    """Index of the URL column: `url` (input_urls.csv), `web_pages` (full_universities_list.csv) or the first."""
+    header = header_names(header)
+    for name in ('url', 'web_pages'):
+        if name in header:
+            return header.index(name)
+    return 0
+
+
+def triage_columns(header):
+    """Indexes of the url_status_codes and final_urls columns of a url_triage.py output, else (None, None).
+
+    Only the final_urls column marks a triaged file: the url_status_codes of
+    full_universities_list.csv come from an older check that verified TLS
+    certificates, so its errors do not mean the host is dead.
+    """
+    header = header_names(header)
+    if FINAL_URL_COLUMN not in header:
+        return None, None
+    return tuple(header.index(name) if name in header else None for name in (STATUS_COLUMN, FINAL_URL_COLUMN))
+
+
+def split_urls(value):
+    """URLs of a web_pages cell: one URL, or several joined by `', '` (a list repr without its outer quotes)."""
+    value = value.strip().strip('[]\'"')
+    return [url.strip() for url in value.split(URL_SEPARATOR) if url.strip()]
+
+
+def join_urls(urls):
+    return URL_SEPARATOR.join(urls)
+
+
+def parse_statuses(value):
+    """Statuses of a url_status_codes cell (`[200]`, `['ERROR: SSLError', 200]`); [] when unreadable."""
+    try:
+        statuses = ast.literal_eval(value.strip())
+    except (ValueError, SyntaxError):
+        return []
+    return list(statuses) if isinstance(statuses, (list, tuple)) else [statuses]
+
+
+def is_dead_status(status):
+    """True for a check that found no server: DNS failure or refused connection, or a failed TLS handshake.
+
+    Timeouts are not dead: a slow site may still answer within the crawl's DOWNLOAD_TIMEOUT.
+    """
+    return status in DEAD_STATUSES
+
+
+def row_targets(row, url_column, status_column=None, final_column=None):
+    """(input URL, URL to crawl, dead) of each web page of an input row.
+
+    With the url_triage.py columns, a page is crawled from its final
+    redirect target and marked dead when is_dead_status says its host is
+    dead. A status or final URL list that does not line up with the pages
+    is ignored.
+    """
+    urls = split_urls(row[url_column])
+    statuses = parse_statuses(row[status_column]) if status_column is not None and status_column < len(row) else []
+    final_urls = split_urls(row[final_column]) if final_column is not None and final_column < len(row) else []
+    if len(statuses) != len(urls):
+        statuses = [None] * len(urls)
+    if len(final_urls) != len(urls):
+        final_urls = urls
+    for url, status, final_url in zip(urls, statuses, final_urls):
+        yield url, final_url, is_dead_status(status)
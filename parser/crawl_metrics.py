@@ -0,0 +1,319 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scrapy.exceptions import IgnoreRequest
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_END = object()
+
+
+class StageRecord:
+    __slots__ = ('calls', 'seconds', 'rows_in', 'rows_out')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows_in = None
+        self.rows_out = None
+
+    def rows(self, rows_in, rows_out):
+        """Add the rows that went into and came out of one call (rows_in None for a source)."""
+        if rows_in is not None:
+            self.rows_in = (self.rows_in or 0) + rows_in
+        self.rows_out = (self.rows_out or 0) + rows_out
+
+
+class StageTimings:
+    """Wall time, calls and (optionally) rows in/out of named pipeline stages, summed over calls."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def record(self, name):
+        if name not in self.stages:
+            self.stages[name] = StageRecord()
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name):
+        """Times the block as one call of `name`; yields the stage record for `rows()`."""
+        record = self.record(name)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.calls += 1
+            record.seconds += time.perf_counter() - started
+
+    def iterate(self, name, iterable):
+        """Items of `iterable`, each step timed as one call of `name` (rows out: the item's length)."""
+        iterator = iter(iterable)
+        record = self.record(name)
+        while True:
+            started = time.perf_counter()
+            item = next(iterator, _END)
+            record.seconds += time.perf_counter() - started
+            if item is _END:
+                return
+            record.calls += 1
+            record.rows(None, len(item))
+            yield item
+
+    def as_dict(self):
+        return {name: {'calls': record.calls, 'seconds': round(record.seconds, 6),
+                       'rows_in': record.rows_in, 'rows_out': record.rows_out}
+                for name, record in list(self.stages.items())}
+
+    def report(self):
+        """The stages as a text table, in first-use order."""
+        lines = [f"{'stage':<20} {'calls':>8} {'seconds':>10} {'rows in':>12} {'rows out':>12}"]
+        for name, record in list(self.stages.items()):
+            rows_in = '-' if record.rows_in is None else f"{record.rows_in:,}"
+            rows_out = '-' if record.rows_out is None else f"{record.rows_out:,}"
+            lines.append(f"{name:<20} {record.calls:>8,} {record.seconds:>10.3f} {rows_in:>12} {rows_out:>12}")
+        return '\n'.join(lines)
+
+
+class DomainMetrics:
+    __slots__ = ('requests', 'bytes', 'latency_buckets', 'latency_sum', 'errors',
+                 'links_discovered', 'links_enqueued', 'new_emails', 'parse_seconds')
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # the last one is +Inf
+        self.latency_sum = 0.0
+        self.errors = Counter()
+        self.links_discovered = 0
+        self.links_enqueued = 0
+        self.new_emails = 0
+        self.parse_seconds = 0.0
+
+    @property
+    def links_filtered(self):
+        return self.links_discovered - self.links_enqueued
+
+    def as_dict(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*LATENCY_BUCKETS, '+Inf'), self.latency_buckets):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            'requests': self.requests,
+            'bytes': self.bytes,
+            'latency_seconds': {'buckets': buckets, 'sum': round(self.latency_sum, 6), 'count': cumulative},
+            'errors': dict(self.errors),
+            'links_discovered': self.links_discovered,
+            'links_filtered': self.links_filtered,
+            'links_enqueued': self.links_enqueued,
+            'new_emails': self.new_emails,
+            'parse_seconds': round(self.parse_seconds, 6),
+        }
+
+
+class CrawlMetrics:
+    """Per-domain counters and pipeline stage timings of one crawl.
+
+    Per seed domain: responses (every download attempt, retries included),
+    bytes, a latency histogram, errors by type (exception class or
+    `http_<status>`), links discovered / filtered / enqueued, new emails and
+    time spent parsing. Stage timings cover the whole pipeline (parse, page
+    cache, dedup, link following, sitemaps, result sink). Served as
+    Prometheus text (/metrics) and JSON (/metrics.json) when a port is set,
+    and written to a file when the crawl closes.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.domains = {}
+        self.timings = StageTimings()
+        self.server = None
+
+    def domain(self, domain):
+        if domain not in self.domains:
+            self.domains[domain] = DomainMetrics()
+        return self.domains[domain]
+
+    # === Recording ===
+    def response(self, domain, size, latency, status):
+        metrics = self.domain(domain)
+        metrics.requests += 1
+        metrics.bytes += size
+        if latency is not None:
+            metrics.latency_sum += latency
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    break
+            else:
+                index = len(LATENCY_BUCKETS)
+            metrics.latency_buckets[index] += 1
+        if status >= 400:
+            metrics.errors[f"http_{status}"] += 1
+
+    def error(self, domain, error_type):
+        self.domain(domain).errors[error_type] += 1
+
+    def links(self, domain, discovered, enqueued):
+        metrics = self.domain(domain)
+        metrics.links_discovered += discovered
+        metrics.links_enqueued += enqueued
+
+    def new_emails(self, domain, count):
+        self.domain(domain).new_emails += count
+
+    def stage(self, name):
+        return self.timings.stage(name)
+
+    @contextmanager
+    def parsing(self, domain):
+        """Times the block as the `parse` stage and as parse time of the domain."""
+        with self.timings.stage('parse') as record:
+            started = time.perf_counter()
+            try:
+                yield record
+            finally:
+                self.domain(domain).parse_seconds += time.perf_counter() - started
+
+    # === Output ===
+    def as_dict(self):
+        domains = {domain: metrics.as_dict() for domain, metrics in list(self.domains.items())}
+        totals = Counter()
+        for metrics in domains.values():
+            for key in ('requests', 'bytes', 'links_discovered', 'links_filtered', 'links_enqueued', 'new_emails'):
+                totals[key] += metrics[key]
+            totals['errors'] += sum(metrics['errors'].values())
+        return {
+            'uptime_seconds': round(time.time() - self.started, 3),
+            'totals': dict(totals),
+            'stages': self.timings.as_dict(),
+            'domains': domains,
+        }
+
+    def prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = [
+            '# HELP crawl_uptime_seconds Seconds since the crawl started.',
+            '# TYPE crawl_uptime_seconds gauge',
+            f'crawl_uptime_seconds {time.time() - self.started:.3f}',
+        ]
+        stages = list(self.timings.stages.items())
+        lines += _family('crawl_stage_seconds_total', 'counter', 'Wall time spent in each pipeline stage.',
+                         ((f'stage="{name}"', f'{record.seconds:.6f}') for name, record in stages))
+        lines += _family('crawl_stage_calls_total', 'counter', 'Calls of each pipeline stage.',
+                         ((f'stage="{name}"', record.calls) for name, record in stages))
+
+        domains = [(f'domain="{_escape(domain)}"', metrics) for domain, metrics in list(self.domains.items())]
+        for name, help_text, value in (
+            ('crawl_requests_total', 'Responses received, retries included.', lambda m: m.requests),
+            ('crawl_response_bytes_total', 'Response body bytes received.', lambda m: m.bytes),
+            ('crawl_links_discovered_total', 'Crawlable links found on pages and in sitemaps.',
+             lambda m: m.links_discovered),
+            ('crawl_links_filtered_total', 'Links dropped as out of scope, excluded or already seen.',
+             lambda m: m.links_filtered),
+            ('crawl_links_enqueued_total', 'Links scheduled for download.', lambda m: m.links_enqueued),
+            ('crawl_new_emails_total', 'Emails not seen before in this crawl.', lambda m: m.new_emails),
+            ('crawl_parse_seconds_total', 'Time spent extracting emails and links.',
+             lambda m: f'{m.parse_seconds:.6f}'),
+        ):
+            lines += _family(name, 'counter', help_text, ((label, value(metrics)) for label, metrics in domains))
+
+        lines += _family('crawl_errors_total', 'counter', 'Failed downloads by error type.',
+                         ((f'{label},type="{_escape(error_type)}"', count)
+                          for label, metrics in domains for error_type, count in list(metrics.errors.items())))
+
+        lines += ['# HELP crawl_request_latency_seconds Download latency of responses.',
+                  '# TYPE crawl_request_latency_seconds histogram']
+        for label, metrics in domains:
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, '+Inf'), metrics.latency_buckets):
+                cumulative += count
+                lines.append(f'crawl_request_latency_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'crawl_request_latency_seconds_sum{{{label}}} {metrics.latency_sum:.6f}')
+            lines.append(f'crawl_request_latency_seconds_count{{{label}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    def report(self):
+        totals = self.as_dict()['totals']
+        return (f"{len(self.domains)} domains, {totals.get('requests', 0)} responses, {totals.get('bytes', 0)} bytes, "
+                f"{totals.get('errors', 0)} errors, {totals.get('links_enqueued', 0)} of "
+                f"{totals.get('links_discovered', 0)} links enqueued, {totals.get('new_emails', 0)} new emails")
+
+    def dump(self, path):
+        """Write the metrics to `path`: Prometheus text for a .prom file, else JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.prom'):
+                f.write(self.prometheus())
+            else:
+                json.dump(self.as_dict(), f, indent=2)
+
+    # === HTTP endpoint ===
+    def serve(self, port, host='127.0.0.1'):
+        """Serve /metrics (Prometheus) and /metrics.json from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] == '/metrics.json':
+                    body, content_type = json.dumps(metrics.as_dict()).encode(), 'application/json'
+                elif self.path.split('?')[0] == '/metrics':
+                    body, content_type = metrics.prometheus().encode(), 'text/plain; version=0.0.4'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='crawl-metrics', daemon=True).start()
+        return self.server.server_address[1]
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _family(name, metric_type, help_text, samples):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+    lines += [f'{name}{{{labels}}} {value}' for labels, value in samples]
+    return lines
+
+
+class CrawlMetricsMiddleware:
+    """Counts every download attempt (responses and exceptions) in the spider's CrawlMetrics.
+
+    Sits next to the downloader, after RetryMiddleware, so retried
+    attempts are counted one by one. Requests dropped by another middleware
+    (IgnoreRequest) are not errors.
+    """
+
+    def process_response(self, request, response, spider):
+        metrics = getattr(spider, 'metrics', None)
+        domain = request.meta.get('original_domain')
+        if metrics is not None and domain:
+            metrics.response(domain, len(response.body), request.meta.get('download_latency'), response.status)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        metrics = getattr(spider, 'metrics', None)
+        domain = request.meta.get('original_domain')
+        if metrics is not None and domain and not isinstance(exception, IgnoreRequest):
+            metrics.error(domain, exception.__class__.__name__)
+        return None
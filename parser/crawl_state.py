@@ -0,0 +1,134 @@
+import time
+import sqlite3
+import hashlib
+
+from w3lib.url import canonicalize_url
+
+PENDING, DONE, FAILED = 0, 1, 2
+
+
+def url_fingerprint(url):
+    return hashlib.sha1(canonicalize_url(url).encode('utf-8')).digest()
+
+
+class SQLiteStore:
+    """SQLite file whose writes are committed every `commit_every` operations or `commit_interval` seconds."""
+
+    SCHEMA = ''
+
+    def __init__(self, path, commit_every=200, commit_interval=5.0):
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+        self._pending_ops = 0
+        self._last_commit = time.monotonic()
+
+    def _touch(self):
+        self._pending_ops += 1
+        if (self._pending_ops >= self.commit_every
+                or time.monotonic() - self._last_commit >= self.commit_interval):
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self._pending_ops = 0
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+class CrawlState(SQLiteStore):
+    """SQLite checkpoint of an EmailSpider crawl.
+
+    Holds the frontier (every request ever scheduled with its status), the
+    found-email set and per-domain error counters. Writes are batched and
+    committed every `commit_every` operations or `commit_interval` seconds,
+    so a killed crawl loses at most that window and re-fetches only pages
+    that were in flight or not yet committed.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS frontier (
+            fingerprint BLOB PRIMARY KEY,
+            url TEXT NOT NULL,
+            domain TEXT NOT NULL,
+            depth INTEGER NOT NULL,
+            status INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS frontier_status ON frontier (status);
+        CREATE TABLE IF NOT EXISTS emails (
+            email TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            exported INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS errors (
+            domain TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        );
+    """
+
+    # === Frontier ===
+    def add_request(self, url, domain, depth):
+        """Record a new request; False if its fingerprint was already seen."""
+        cursor = self.conn.execute(
+            'INSERT OR IGNORE INTO frontier (fingerprint, url, domain, depth) VALUES (?, ?, ?, ?)',
+            (url_fingerprint(url), url, domain, depth)
+        )
+        self._touch()
+        return cursor.rowcount == 1
+
+    def mark_done(self, url, status=DONE):
+        self.conn.execute('UPDATE frontier SET status = ? WHERE fingerprint = ?', (status, url_fingerprint(url)))
+        self._touch()
+
+    def pending_requests(self):
+        return self.conn.execute(
+            'SELECT url, domain, depth FROM frontier WHERE status = ? ORDER BY rowid', (PENDING,)
+        ).fetchall()
+
+    def has_frontier(self):
+        return self.conn.execute('SELECT 1 FROM frontier LIMIT 1').fetchone() is not None
+
+    def progress(self):
+        rows = self.conn.execute('SELECT status, COUNT(*) FROM frontier GROUP BY status').fetchall()
+        return dict(rows)
+
+    # === Emails ===
+    def add_emails(self, url, emails):
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO emails (email, url) VALUES (?, ?)', [(email, url) for email in emails]
+        )
+        self._touch()
+
+    def iter_found_emails(self):
+        for (email,) in self.conn.execute('SELECT email FROM emails'):
+            yield email
+
+    def unexported_items(self):
+        """Emails recorded before a crash but never stored in a result part."""
+        items = {}
+        for email, url in self.conn.execute('SELECT email, url FROM emails WHERE exported = 0 ORDER BY rowid'):
+            items.setdefault(url, []).append(email)
+        return [{'url': url, 'emails': emails} for url, emails in items.items()]
+
+    def mark_exported(self, urls):
+        self.conn.executemany('UPDATE emails SET exported = 1 WHERE url = ?', [(url,) for url in urls])
+        self.commit()
+
+    # === Error counters ===
+    def increment_error(self, domain):
+        self.conn.execute(
+            'INSERT INTO errors (domain, count) VALUES (?, 1) '
+            'ON CONFLICT(domain) DO UPDATE SET count = count + 1', (domain,)
+        )
+        self._touch()
+
+    def error_counts(self):
+        return dict(self.conn.execute('SELECT domain, count FROM errors'))
@@ -0,0 +1,134 @@
+import os
+import hashlib
+import tempfile
+
+import numpy as np
+
+
+def fingerprint(value):
+    """64-bit hash of one string."""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def fingerprint_column(series):
+    """64-bit hash of every value in a pandas string column (vectorized)."""
+    import pandas as pd
+    return pd.util.hash_pandas_object(series, index=False).to_numpy(dtype=np.uint64)
+
+
+class FingerprintSet:
+    """Compact, memory-capped seen-set of 64-bit fingerprints.
+
+    Values are stored as 8-byte hashes in sorted numpy runs instead of a
+    Python set of strings. Runs of similar size are merged as they grow, so
+    a lookup is a handful of binary searches. Once the in-memory runs pass
+    `max_memory_bytes`, the largest one is written to `spill_dir` and
+    memory-mapped, which keeps the set exact while RAM stays bounded.
+
+    The only false positives are 64-bit hash collisions; see
+    `false_positive_rate`.
+    """
+
+    def __init__(self, max_memory_bytes=0, spill_dir=None, buffer_size=4096):
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_dir = spill_dir
+        self.buffer_size = buffer_size
+        self._buffer = set()  # recent scalar adds, flushed into a run in bulk
+        self._runs = []
+        self._spilled = []
+        self._spill_tmp = None
+
+    # === Size / memory report ===
+    def __len__(self):
+        return len(self._buffer) + sum(len(run) for run in self._runs + self._spilled)
+
+    @property
+    def nbytes(self):
+        """Bytes of fingerprints held in RAM (runs plus an estimate for the buffer)."""
+        return sum(run.nbytes for run in self._runs) + len(self._buffer) * 8
+
+    @property
+    def disk_bytes(self):
+        return sum(run.nbytes for run in self._spilled)
+
+    @property
+    def false_positive_rate(self):
+        """Chance that a new value collides with a stored fingerprint."""
+        return len(self) / 2.0 ** 64
+
+    def report(self):
+        return (f"{len(self)} fingerprints, {self.nbytes / 1e6:.1f} MB in memory, "
+                f"{self.disk_bytes / 1e6:.1f} MB spilled, false-positive rate {self.false_positive_rate:.1e}")
+
+    # === Scalar API (spider) ===
+    def __contains__(self, value):
+        h = fingerprint(value)
+        if h in self._buffer:
+            return True
+        return bool(self.contains(np.array([h], dtype=np.uint64), flush=False)[0])
+
+    def add(self, value):
+        self._buffer.add(fingerprint(value))
+        if len(self._buffer) >= self.buffer_size:
+            self._flush_buffer()
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    # === Vectorized API (merge) ===
+    def contains(self, hashes, flush=True):
+        if flush:
+            self._flush_buffer()
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs + self._spilled:
+            pos = np.searchsorted(run, hashes)
+            pos[pos == len(run)] = 0
+            found |= run[pos] == hashes
+        return found
+
+    def add_hashes(self, hashes):
+        self._flush_buffer()
+        self._add_run(np.unique(hashes))
+
+    def first_seen_mask(self, series):
+        """Mask of rows whose value was not seen in this or earlier calls.
+
+        Keeps the first occurrence inside the chunk, like
+        `drop_duplicates(keep='first')` over the concatenated input.
+        """
+        hashes = fingerprint_column(series)
+        _, first_index = np.unique(hashes, return_index=True)
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[first_index] = True
+        mask &= ~self.contains(hashes)
+        self.add_hashes(hashes[mask])
+        return mask
+
+    # === Runs ===
+    def _flush_buffer(self):
+        if self._buffer:
+            run = np.fromiter(self._buffer, dtype=np.uint64, count=len(self._buffer))
+            self._buffer = set()
+            run.sort()
+            self._add_run(run)
+
+    def _add_run(self, run):
+        if not len(run):
+            return
+        self._runs.append(run)
+        while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+            newer, older = self._runs.pop(), self._runs.pop()
+            self._runs.append(np.union1d(older, newer))
+        if self.max_memory_bytes:
+            while self._runs and sum(run.nbytes for run in self._runs) > self.max_memory_bytes:
+                self._spill(max(range(len(self._runs)), key=lambda i: len(self._runs[i])))
+
+    def _spill(self, index):
+        if self.spill_dir is None:
+            self._spill_tmp = self._spill_tmp or tempfile.TemporaryDirectory(prefix='fingerprints_')
+            self.spill_dir = self._spill_tmp.name
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"run-{os.getpid()}-{id(self):x}-{len(self._spilled):05d}.npy")
+        np.save(path, self._runs.pop(index))
+        self._spilled.append(np.load(path, mmap_mode='r'))
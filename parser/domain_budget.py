@@ -0,0 +1,163 @@
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+from scrapy.exceptions import IgnoreRequest
+
+# URL path words of pages that usually list people and their addresses
+CONTACT_KEYWORDS = (
+    'contact', 'staff', 'people', 'faculty', 'directory', 'team', 'personnel',
+    'employees', 'members', 'department', 'kontakt', 'mitarbeiter', 'personal',
+    'equipe', 'annuaire', 'contacto', 'personale', 'docenti', 'about'
+)
+CONTACT_PRIORITY = 10
+
+
+class DomainBudgetExceeded(IgnoreRequest):
+    """Raised by DomainBudgetMiddleware for a request of a domain that is out of budget."""
+
+
+class DomainStats:
+    def __init__(self, window):
+        self.pages = 0
+        self.bytes = 0
+        self.new_emails = 0
+        self.latency = 0.0
+        self.started = time.monotonic()
+        self.recent_yield = deque(maxlen=window)
+        self.in_flight = 0  # requests between the downloader and parse
+        self.stopped = None  # reason, once the domain is out of budget
+
+
+class DomainBudget:
+    """Per-domain crawl budget with yield-based early stop.
+
+    Each seed domain gets at most DOMAIN_MAX_PAGES pages, DOMAIN_MAX_BYTES
+    bytes and DOMAIN_MAX_SECONDS of wall time (0 disables a limit; all are
+    off by default). With DOMAIN_MIN_YIELD set, a domain is also stopped
+    after DOMAIN_MIN_PAGES pages when the last DOMAIN_YIELD_WINDOW pages
+    found fewer than DOMAIN_MIN_YIELD new emails per page. Links that look like contact/staff/people pages are
+    scheduled first, so the budget is spent where the emails are.
+    """
+
+    def __init__(self, enabled=True, max_pages=0, max_bytes=0, max_seconds=0,
+                 min_pages=40, yield_window=40, min_yield=0.0):
+        self.enabled = enabled
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.min_pages = min_pages
+        self.yield_window = yield_window
+        self.min_yield = min_yield
+        self.domains = {}
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            enabled=settings.getbool('DOMAIN_BUDGET_ENABLED', True),
+            max_pages=settings.getint('DOMAIN_MAX_PAGES', 0),
+            max_bytes=settings.getint('DOMAIN_MAX_BYTES', 0),
+            max_seconds=settings.getfloat('DOMAIN_MAX_SECONDS', 0),
+            min_pages=settings.getint('DOMAIN_MIN_PAGES', 40),
+            yield_window=settings.getint('DOMAIN_YIELD_WINDOW', 40),
+            min_yield=settings.getfloat('DOMAIN_MIN_YIELD', 0.0),
+        )
+
+    def stats(self, domain):
+        if domain not in self.domains:
+            self.domains[domain] = DomainStats(self.yield_window)
+        return self.domains[domain]
+
+    def record(self, domain, size, latency, new_emails):
+        """Account one fetched page; returns the stop reason if this page used up the budget."""
+        if not self.enabled:
+            return None
+        stats = self.stats(domain)
+        stats.pages += 1
+        stats.bytes += size
+        stats.latency += latency or 0.0
+        stats.new_emails += new_emails
+        stats.recent_yield.append(new_emails)
+
+        if stats.stopped:
+            return None
+        stats.stopped = self._stop_reason(stats)
+        return stats.stopped
+
+    def _stop_reason(self, stats):
+        if self.max_pages and stats.pages >= self.max_pages:
+            return f"page budget ({self.max_pages})"
+        if self.max_bytes and stats.bytes >= self.max_bytes:
+            return f"byte budget ({self.max_bytes})"
+        if self.max_seconds and time.monotonic() - stats.started >= self.max_seconds:
+            return f"time budget ({self.max_seconds}s)"
+        if (self.min_yield and stats.pages >= self.min_pages
+                and len(stats.recent_yield) == stats.recent_yield.maxlen
+                and sum(stats.recent_yield) / len(stats.recent_yield) < self.min_yield):
+            return f"low yield (<{self.min_yield} new emails/page over {len(stats.recent_yield)} pages)"
+        return None
+
+    def is_exhausted(self, domain):
+        if not self.enabled or domain not in self.domains:
+            return False
+        stats = self.domains[domain]
+        if not stats.stopped and self.max_seconds and time.monotonic() - stats.started >= self.max_seconds:
+            stats.stopped = f"time budget ({self.max_seconds}s)"
+        return stats.stopped is not None
+
+    def reserve(self, domain):
+        """Count a request on its way to the downloader; False if the page budget has no room left for it."""
+        if not self.enabled:
+            return True
+        stats = self.stats(domain)
+        if self.max_pages and stats.pages + stats.in_flight >= self.max_pages:
+            return False
+        stats.in_flight += 1
+        return True
+
+    def release(self, domain):
+        if self.enabled and domain in self.domains:
+            self.domains[domain].in_flight = max(self.domains[domain].in_flight - 1, 0)
+
+    def priority(self, url):
+        """Scheduler priority for a link: contact-like paths go first."""
+        if not self.enabled:
+            return 0
+        path = urlparse(url).path.lower()
+        return CONTACT_PRIORITY if any(keyword in path for keyword in CONTACT_KEYWORDS) else 0
+
+
+class DomainBudgetMiddleware:
+    """Drops queued requests of domains that ran out of budget before they are downloaded.
+
+    A request that passes is counted against its domain's page budget until
+    its response or failure comes back (redirects and retries keep the same
+    count), so the downloader never queues more pages of a domain than the
+    budget has left.
+    """
+
+    def process_request(self, request, spider):
+        budget = getattr(spider, 'domain_budget', None)
+        domain = request.meta.get('original_domain')
+        if not budget or not domain:
+            return None
+        if budget.is_exhausted(domain):
+            self._release(request, spider)
+            raise DomainBudgetExceeded(f"Domain {domain} is out of budget")
+        if not request.meta.get('budget_reserved'):
+            if not budget.reserve(domain):
+                raise DomainBudgetExceeded(f"Domain {domain} has no page budget left")
+            request.meta['budget_reserved'] = True
+        return None
+
+    def process_response(self, request, response, spider):
+        self._release(request, spider)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self._release(request, spider)
+        return None
+
+    def _release(self, request, spider):
+        if request.meta.pop('budget_reserved', False):
+            spider.domain_budget.release(request.meta['original_domain'])
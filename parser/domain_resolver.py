@@ -0,0 +1,117 @@
+import os
+import ipaddress
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# Snapshot of https://publicsuffix.org/list/public_suffix_list.dat shipped with the code,
+# so resolving domains never needs the network. Refresh it by replacing the file.
+PUBLIC_SUFFIX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'public_suffix_list.dat')
+PRIVATE_SECTION_MARKER = '===BEGIN PRIVATE DOMAINS==='
+CACHE_SIZE = 2 ** 16
+
+
+def load_suffix_rules(path=PUBLIC_SUFFIX_FILE, include_private=False):
+    """(rules, wildcards, exceptions) of a public suffix list, with IDN rules in both forms."""
+    rules, wildcards, exceptions = set(), set(), set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if PRIVATE_SECTION_MARKER in line and not include_private:
+                break
+            if not line or line.startswith('//'):
+                continue
+            rule = line.split()[0].lower()
+            target = rules
+            if rule.startswith('!'):
+                rule, target = rule[1:], exceptions
+            elif rule.startswith('*.'):
+                rule, target = rule[2:], wildcards
+            target.add(rule)
+            try:
+                target.add(rule.encode('idna').decode('ascii'))
+            except UnicodeError:
+                pass
+    return rules, wildcards, exceptions
+
+
+def url_host(url):
+    """Lowercase host of a URL; scheme-less values like `www.lmu.de/phd` are accepted."""
+    url = str(url).strip()
+    if '//' not in url:
+        url = '//' + url
+    try:
+        return (urlsplit(url).hostname or '').rstrip('.')
+    except ValueError:
+        return ''
+
+
+class DomainResolver:
+    """Registrable domain (eTLD+1) of hosts and URLs against the public suffix list.
+
+    `ox.ac.uk` and `cam.ac.uk` stay apart instead of both becoming `ac.uk`.
+    Hosts are resolved through an LRU cache, and `domain_column` resolves
+    each distinct value of a pandas column once. Like tldextract's default,
+    only the ICANN section is used unless `include_private` is set, and a
+    host with no known suffix (an IP, `localhost`) has no registrable domain.
+    """
+
+    def __init__(self, path=PUBLIC_SUFFIX_FILE, include_private=False, cache_size=CACHE_SIZE):
+        self.rules, self.wildcards, self.exceptions = load_suffix_rules(path, include_private)
+        self.registrable_domain = lru_cache(maxsize=cache_size)(self._registrable_domain)
+
+    def _registrable_domain(self, host):
+        labels = host.lower().strip('.').split('.')
+        if not all(labels) or is_ip_address(host):
+            return None
+        for i in range(len(labels)):
+            candidate = '.'.join(labels[i:])
+            if candidate in self.exceptions:
+                suffix_start = i + 1
+                break
+            if candidate in self.rules or '.'.join(labels[i + 1:]) in self.wildcards:
+                suffix_start = i
+                break
+        else:
+            return None
+        if suffix_start == 0:
+            return None  # the host is itself a public suffix
+        return '.'.join(labels[suffix_start - 1:])
+
+    def from_url(self, url):
+        return self.registrable_domain(url_host(url))
+
+    def domain_column(self, series):
+        """Registrable domain of every URL in a pandas column (None where there is none)."""
+        import numpy as np
+        import pandas as pd
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        domains = np.array([self.from_url(value) for value in uniques] + [None], dtype=object)
+        return pd.Series(domains[codes], index=series.index, dtype=object)
+
+    def cache_info(self):
+        return self.registrable_domain.cache_info()
+
+
+def is_ip_address(host):
+    if not host[-1:].isdigit() and ':' not in host:
+        return False
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+_default_resolver = None
+
+
+def default_resolver():
+    """Process-wide resolver over the bundled snapshot, built on first use."""
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = DomainResolver()
+    return _default_resolver
+
+
+def registrable_domain(url):
+    return default_resolver().from_url(url)
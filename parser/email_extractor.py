@@ -0,0 +1,136 @@
+import re
+
+# === Pre-filter ===
+# Anything that can turn into an '@'. The character itself and '%40' are found
+# with plain substring search (memchr speed), HTML entities with a regex that
+# has a literal '&#' prefix...
+TRIGGER_NEEDLES = (b'@', b'%40')
+ENTITY_AT_RE = re.compile(rb'&#(?:0*64|[xX]0*40);')
+# ...and "[at]" / "(at)" obfuscations with a regex that only runs when a cheap hint is present
+BRACKET_AT_RE = re.compile(rb'[\[({]\s*at\s*[\])}]', re.IGNORECASE)
+BRACKET_AT_HINTS = (b't]', b't)', b't}', b'T]', b'T)', b'at ]', b'at )', b'at }', b'AT )')
+
+# Bytes scanned on each side of a trigger; covers a 64-byte local part and a long domain
+WINDOW = 256
+
+# === De-obfuscation inside a window ===
+DEOBFUSCATE_RULES = [
+    (re.compile(rb'\s*[\[({]\s*at\s*[\])}]\s*', re.IGNORECASE), b'@'),
+    (re.compile(rb'\s*[\[({]\s*dot\s*[\])}]\s*', re.IGNORECASE), b'.'),
+    (re.compile(rb'&#0*64;|&#x0*40;|%40', re.IGNORECASE), b'@'),
+    (re.compile(rb'&#0*46;|&#x0*2e;', re.IGNORECASE), b'.'),
+]
+
+# Same character classes as the spider's old regex. The look-behind makes a hit
+# start at the beginning of the local part; a hit after a non-ASCII byte is
+# checked against the decoded character (see letter_before)
+EMAIL_RE = re.compile(rb'(?<![a-zA-Z0-9._%+\-])[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b')
+
+# === Normalization ===
+PERCENT_RE = re.compile(r'%[0-9a-fA-F]{2}')
+UNICODE_ESCAPE_RE = re.compile(r'^(?:u00[0-9a-fA-F]{2})+')  # leftovers of JSON ">" escapes
+
+# "TLDs" that are really file extensions: image@2x.png, sprite@3x.webp, bundle@1.2.js
+ASSET_SUFFIXES = {
+    'png', 'jpg', 'jpeg', 'gif', 'svg', 'webp', 'avif', 'ico', 'bmp', 'tif', 'tiff',
+    'css', 'js', 'map', 'json', 'woff', 'woff2', 'ttf', 'eot', 'mp4', 'webm', 'mp3', 'pdf'
+}
+
+
+def normalize_email(raw):
+    """Clean one regex hit; returns None for junk that only looks like an email."""
+    email = raw.strip()
+    if email.lower().startswith('mailto:'):
+        email = email[7:]
+    email = PERCENT_RE.sub('', email).replace('%', '')
+    email = UNICODE_ESCAPE_RE.sub('', email)
+
+    username, _, domain = email.partition('@')
+    username = username.strip('.')
+    domain = domain.lower().strip('.')
+    if not username or '.' not in domain or '@' in domain:
+        return None
+    if domain.rsplit('.', 1)[-1] in ASSET_SUFFIXES:
+        return None
+    return f"{username}@{domain}"
+
+
+def letter_before(chunk, pos):
+    """True when the character ending at byte `pos` is a Unicode letter or digit.
+
+    Like the old str-based \\b: "müller@" is skipped, while an email right
+    after CJK punctuation, a no-break space or a dash is kept. The character
+    is decoded as UTF-8, else as a single cp1252 byte.
+    """
+    for size in (2, 3, 4):
+        if pos >= size:
+            try:
+                return chunk[pos - size:pos].decode('utf-8').isalnum()
+            except UnicodeDecodeError:
+                continue
+    return chunk[pos - 1:pos].decode('cp1252', 'replace').isalnum()
+
+
+def trigger_positions(body):
+    """Sorted offsets of every '@'-like trigger in body."""
+    positions = []
+    for needle in TRIGGER_NEEDLES:
+        pos = body.find(needle)
+        while pos != -1:
+            positions.append(pos)
+            pos = body.find(needle, pos + 1)
+    positions.extend(match.start() for match in ENTITY_AT_RE.finditer(body))
+    if any(hint in body for hint in BRACKET_AT_HINTS):
+        positions.extend(match.start() for match in BRACKET_AT_RE.finditer(body))
+    positions.sort()
+    return positions
+
+
+def trigger_windows(body, window=WINDOW):
+    """Merged (start, end) byte ranges around every trigger."""
+    start = end = None
+    for pos in trigger_positions(body):
+        lo, hi = max(pos - window, 0), pos + window
+        if end is not None and lo <= end:
+            end = hi
+            continue
+        if end is not None:
+            yield start, end
+        start, end = lo, hi
+    if end is not None:
+        yield start, min(end, len(body))
+
+
+def extract_emails(body):
+    """Set of normalized emails found in a raw (ASCII-compatible) page body."""
+    if isinstance(body, str):
+        body = body.encode('utf-8', 'ignore')
+
+    emails = set()
+    for start, end in trigger_windows(body):
+        chunk = body[start:end]
+        for pattern, replacement in DEOBFUSCATE_RULES:
+            chunk = pattern.sub(replacement, chunk)
+        for match in EMAIL_RE.finditer(chunk):
+            begin = match.start()
+            if begin and chunk[begin - 1] >= 0x80 and letter_before(chunk, begin):
+                continue
+            email = normalize_email(match.group().decode('ascii'))
+            if email:
+                emails.add(email)
+    return emails
+
+
+def response_body(response):
+    """Page bytes in an ASCII-compatible encoding (re-encodes UTF-16/32 pages).
+
+    Takes a Scrapy response (`.body`) or an httpx one (`.content`).
+    """
+    if is_wide_encoding(getattr(response, 'encoding', None)):
+        return response.text.encode('utf-8')
+    return response.body if hasattr(response, 'body') else response.content
+
+
+def is_wide_encoding(encoding):
+    """True for UTF-16/32, whose bytes the byte-level pre-filter cannot scan."""
+    return (encoding or '').lower().replace('-', '').replace('_', '').startswith(('utf16', 'utf32'))
@@ -1,142 +1,152 @@
 import scrapy
-import re
-import boto3
-import os
-import csv
-from urllib.parse import urlparse
-
-class EmailSpider(scrapy.Spider):
+from crawl_state import FAILED
+from crawl_job import CrawlJob, CRAWL_SETTINGS
+from result_sink import ResultSinkPipeline
+from email_extractor import extract_emails, response_body
+from domain_budget import DomainBudget, DomainBudgetExceeded, DomainBudgetMiddleware
+from parse_pool import ParsePool, ParseBackpressureMiddleware
+from page_cache import ConditionalRequestMiddleware
+from crawl_metrics import CrawlMetricsMiddleware
+from sitemap_seeder import SitemapSeeder, SEED_PRIORITY
+from scrapy.http import TextResponse
+from scrapy.utils.response import get_base_url
+
+class EmailSpider(CrawlJob, scrapy.Spider):
     name = "email_spider"
 
     custom_settings = {
-        'DEPTH_LIMIT': 5,
-        'ROBOTSTXT_OBEY': False,
-        'DOWNLOAD_DELAY': 0.1,
-        'CONCURRENT_REQUESTS': 24,
-        'CONCURRENT_REQUESTS_PER_DOMAIN': 8,
-        'DOWNLOAD_TIMEOUT': 30,
-        'RETRY_TIMES': 3,
-        'RETRY_HTTP_CODES': [500, 502, 503, 504, 522, 524, 408, 429],
-        'AUTOTHROTTLE_ENABLED': True,
-        'AUTOTHROTTLE_START_DELAY': 0.25,
-        'AUTOTHROTTLE_MAX_DELAY': 5,
-        'AUTOTHROTTLE_TARGET_CONCURRENCY': 6.0,
-        'DOWNLOAD_FAIL_ON_DATALOSS': False,
-        'USER_AGENT': 'Mozilla/5.0 (compatible; EmailScraper/1.0; +http://example.com/bot)'
+        **CRAWL_SETTINGS,
+        'ITEM_PIPELINES': {ResultSinkPipeline: 300},
+        'DOWNLOADER_MIDDLEWARES': {
+            ParseBackpressureMiddleware: 40, DomainBudgetMiddleware: 50, ConditionalRequestMiddleware: 60,
+            CrawlMetricsMiddleware: 900,
+        },
     }
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.domain_budget = DomainBudget.from_settings(crawler.settings)
+        # Email and link extraction in worker processes (-s PARSE_PROCESSES=N), off the reactor thread
+        spider.parse_pool = ParsePool.from_settings(crawler.settings)
+        # Contact-like URLs from robots.txt sitemaps as extra seeds (-s SITEMAP_SEEDS=N per domain)
+        spider.sitemap_seeder = SitemapSeeder.from_settings(crawler.settings)
+        return spider
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.bucket = os.getenv('AWS_BUCKET_NAME', 'email-scraper-university')
-        self.input_file = os.getenv('INPUT_CSV_FILENAME', 'input_urls.csv')
-        self.output_file = os.getenv('OUTPUT_FILENAME', 'results_emails.csv')
-        self.s3 = boto3.client('s3')
-        self.crawled_data = []
-        self.processed_count = 0
-        self.allowed_domains = set()
-        self.found_emails = set()
-        self.error_counts = {}
-        self.error_threshold = 3  # Maximum 3 errors per domain
+        self.setup_job()
 
     def start_requests(self):
-        local_file = '/tmp/input_urls.csv'
-        self.s3.download_file(self.bucket, self.input_file, local_file)
-
-        with open(local_file, newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader)
-            for row in reader:
-                url = row[0].strip()
-                domain = domain_from_url(url)
-                self.allowed_domains.add(domain)
-
-                yield scrapy.Request(
-                    url=url,
-                    callback=self.parse,
-                    errback=self.errback_http,
-                    meta={'original_domain': domain, 'depth': 0}
-                )
+        for url, domain, depth, resumed in self.start_targets():
+            yield self.page_request(url, domain, depth, self.domain_budget.priority(url) if resumed else 0,
+                                    dont_filter=resumed)
+            robots_url = self.sitemap_seeder and not resumed and self.sitemap_seeder.start(domain, url)
+            if robots_url:
+                yield self.sitemap_request(robots_url, domain, 'robots')
+
+    def page_request(self, url, domain, depth, priority, dont_filter=False):
+        return scrapy.Request(
+            url=url,
+            callback=self.parse,
+            errback=self.errback_http,
+            dont_filter=dont_filter,
+            priority=priority,
+            meta={'original_domain': domain, 'depth': depth}
+        )
 
     def parse(self, response):
         domain = response.meta['original_domain']
         current_depth = response.meta.get('depth', 0)
 
-        if not response.body:
-            return
-
-        content = response.text
-        emails = set(re.findall(r"\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b", content))
-        new_emails = emails - self.found_emails
+        cached = self.cached_page(response.url, response.status, response.body, response.headers)
+        if cached is not None:
+            return self.page_output(response, domain, current_depth, *cached)
+        if not response.body or response.status == 304:
+            self.page_done(request_url(response))
+            return []
+        if self.parse_pool:
+            return self.parse_in_pool(response, domain, current_depth)
+
+        with self.metrics.parsing(domain):
+            emails = extract_emails(response_body(response))
+            links = []
+            # Links of every page go to the page cache, so a later crawl can replay them
+            if isinstance(response, TextResponse) and (self.page_cache or self.wants_links(domain, current_depth)):
+                links = list(self.link_filter.links(get_base_url(response), response.css('a::attr(href)').getall()))
+        self.cache_page(response.url, response.body, response.headers, emails, links)
+        return self.page_output(response, domain, current_depth, emails, links)
+
+    async def parse_in_pool(self, response, domain, current_depth):
+        encoding = getattr(response, 'encoding', None)  # None for binary responses: no links to follow
+        follow = encoding is not None and (self.page_cache or self.wants_links(domain, current_depth))
+        # Parse time here includes the wait for a free worker
+        with self.metrics.parsing(domain):
+            emails, links = await self.parse_pool.parse(response.url, response.body, encoding, bool(follow))
+        self.cache_page(response.url, response.body, response.headers, emails, links)
+        for output in self.page_output(response, domain, current_depth, emails, links):
+            yield output
+
+    def page_output(self, response, domain, current_depth, emails, links):
+        """Item and follow-up requests of a parsed page; marks the page done last."""
+        new_emails = self.record_page(
+            response.url, domain, len(response.body), response.meta.get('download_latency'), emails
+        )
         if new_emails:
-            self.found_emails.update(new_emails)
-            self.crawled_data.append({'url': response.url, 'emails': list(new_emails)})
-
-        links = response.css('a::attr(href)').getall()
-        for link in links:
-            next_url = response.urljoin(link)
-            next_domain = domain_from_url(next_url)
-
-            if next_domain not in self.allowed_domains:
-                continue
-
-            if is_unwanted_url(next_url) or is_login_page(next_url):
-                continue
-
-            if self.error_counts.get(next_domain, 0) >= self.error_threshold:
-                continue
-
-            normalized_url = next_url
-
-            yield scrapy.Request(
-                url=normalized_url,
-                callback=self.parse,
-                errback=self.errback_http,
-                dont_filter=False,
-                meta={'original_domain': domain, 'depth': current_depth + 1}
-            )
-
-        self.processed_count += 1
-        if self.processed_count % 50 == 0:
-            self.save_results()
+            yield {'url': response.url, 'emails': list(new_emails)}
+
+        if links and self.wants_links(domain, current_depth):
+            for normalized_url in self.follow_candidates(links, domain, current_depth):
+                yield self.page_request(normalized_url, domain, current_depth + 1,
+                                        self.domain_budget.priority(normalized_url))
+
+        self.page_done(request_url(response))
+
+    # === Sitemap seeding ===
+    def sitemap_request(self, url, domain, stage):
+        return scrapy.Request(
+            url=url,
+            callback=self.parse_sitemap,
+            errback=self.errback_sitemap,
+            dont_filter=True,
+            priority=SEED_PRIORITY,
+            meta={'original_domain': domain, 'sitemap_stage': stage}
+        )
+
+    def parse_sitemap(self, response):
+        return self.sitemap_followups(response.request, response.body)
+
+    def errback_sitemap(self, failure):
+        # No robots.txt falls back to /sitemap.xml; a failed sitemap just counts as read
+        return self.sitemap_followups(failure.request, None)
+
+    def sitemap_followups(self, request, body):
+        domain = request.meta['original_domain']
+        with self.metrics.stage('sitemap'):
+            if request.meta['sitemap_stage'] == 'robots':
+                sitemaps = self.sitemap_seeder.robots_done(domain, request.url, body)
+            else:
+                sitemaps = self.sitemap_seeder.sitemap_done(domain, body)
+        for url in sitemaps:
+            yield self.sitemap_request(url, domain, 'sitemap')
+        if self.sitemap_seeder.finished(domain):
+            for url in self.sitemap_seed_links(domain):
+                yield self.page_request(url, domain, 1, SEED_PRIORITY)
 
     def errback_http(self, failure):
-        url = failure.request.url
-        domain = domain_from_url(url=url)
-        self.error_counts[domain] = self.error_counts.get(domain, 0) + 1
-
-        if self.error_counts[domain] == self.error_threshold:
-            self.logger.warning(f"Excluding domain {domain} due to repeated request failures.")
-
-    def save_results(self):
-        results_file = '/tmp/results_emails.csv'
-
-        with open(results_file, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['url', 'emails'])
-            for item in self.crawled_data:
-                writer.writerow([item['url'], ', '.join(item['emails'])])
-
-        self.s3.upload_file(results_file, self.bucket, self.output_file)
+        if failure.check(DomainBudgetExceeded):
+            # Dropped by DomainBudgetMiddleware, not a fetch error (HttpError is an IgnoreRequest too)
+            self.page_done(request_url(failure.request), status=FAILED)
+            return
+        self.record_error(request_url(failure.request), failure.request.url)
 
     def closed(self, reason):
-        self.save_results()
-
-
-def domain_from_url(url):
-    parsed_uri = urlparse(url)
-    domain = parsed_uri.netloc.lower()
-    parts = domain.split('.')
-    return '.'.join(parts[-2:])
-
-
-def is_unwanted_url(url):
-    unwanted_patterns = [
-        'mailto:', 'javascript:', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp',
-        '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.zip', '.rar', '.exe', '.tar', '.gz'
-    ]
-    return any(pattern in url.lower() for pattern in unwanted_patterns)
+        if self.parse_pool:
+            self.logger.info(f"Parse pool: {self.parse_pool.report()}")
+            self.parse_pool.close()
+        self.close_job()
 
 
-def is_login_page(url):
-    login_patterns = ['/login', '/signin', '/register', '/auth', '/account']
-    return any(pattern in url.lower() for pattern in login_patterns)
+def request_url(response_or_request):
+    """URL the request was first scheduled with (before any redirects)."""
+    return response_or_request.meta.get('redirect_urls', [response_or_request.url])[0]
@@ -0,0 +1,123 @@
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import numpy as np
+
+from dedup import FingerprintSet, fingerprint
+
+# === Link filters ===
+# Schemes that never lead to a crawlable page
+UNWANTED_SCHEMES = ('mailto:', 'javascript:', 'tel:', 'data:', 'ftp:')
+# File extensions, matched on the end of the URL path only (not the query string or host)
+UNWANTED_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.zip', '.rar', '.exe', '.tar', '.gz'
+)
+LOGIN_PATTERNS = ('/login', '/signin', '/register', '/auth', '/account')
+
+# === Canonicalization ===
+# Query parameters that only track the visitor; dropped so the same page is fetched once
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi',
+    'igshid', 'ref_src', 'spm'
+}
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url):
+    """Canonical form of an absolute http(s) URL, or None for other schemes.
+
+    Lowercases scheme and host, drops the default port, the fragment and
+    tracking parameters, and sorts the remaining query parameters. Percent
+    encoding is left as is.
+    """
+    parts = canonical_parts(url)
+    return parts and parts[0]
+
+
+def canonical_parts(url):
+    """(canonical url, host, path) of an http(s) URL, or None; one urlsplit for all three."""
+    scheme, netloc, path, query, _ = urlsplit(url)
+    scheme = scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return None
+
+    userinfo, at, hostport = netloc.rpartition('@')
+    host, colon, port = hostport.lower().partition(':')
+    if port == DEFAULT_PORTS[scheme]:
+        colon = port = ''
+    netloc = f"{userinfo}{at}{host}{colon}{port}"
+
+    if query:
+        params = [param for param in query.split('&')
+                  if param and not is_tracking_param(param.partition('=')[0])]
+        query = '&'.join(sorted(params))
+    path = path or '/'
+    return urlunsplit((scheme, netloc, path, query, '')), host, path
+
+
+def is_unwanted_path(path):
+    path = path.lower()
+    return path.endswith(UNWANTED_EXTENSIONS) or any(pattern in path for pattern in LOGIN_PATTERNS)
+
+
+class LinkFilter:
+    """Turns the raw hrefs of a page into new, canonical, crawlable URLs.
+
+    Hrefs are deduplicated per page before any URL work, then joined,
+    canonicalized and filtered on scheme, path extension and login paths.
+    Survivors are checked against a local seen-set of URL fingerprints in
+    one vectorized call, so a Request is only built for URLs no earlier
+    page has produced.
+    """
+
+    def __init__(self, domain_from_url, seen=None):
+        self.domain_from_url = domain_from_url
+        self.seen = seen if seen is not None else FingerprintSet()
+        self._domains = {}  # host -> domain
+
+    def domain(self, url, host):
+        if host not in self._domains:
+            self._domains[host] = self.domain_from_url(url)
+        return self._domains[host]
+
+    def links(self, base_url, hrefs):
+        """(url, domain) of every distinct crawlable href, in page order."""
+        seen_hrefs = set()
+        seen_urls = set()
+        for href in hrefs:
+            href = href.strip()
+            if not href or href in seen_hrefs or href.startswith('#'):
+                continue
+            seen_hrefs.add(href)
+            if href[:11].lower().startswith(UNWANTED_SCHEMES):
+                continue
+
+            parts = canonical_parts(urljoin(base_url, href))
+            if parts is None:
+                continue
+            url, host, path = parts
+            if url in seen_urls or is_unwanted_path(path):
+                continue
+            seen_urls.add(url)
+            yield url, self.domain(url, host)
+
+    def unseen(self, links):
+        """Links whose URL was not returned before; they are marked as seen."""
+        if not links:
+            return []
+        hashes = np.fromiter((fingerprint(url) for url, _ in links), dtype=np.uint64, count=len(links))
+        new = ~self.seen.contains(hashes)
+        self.seen.add_hashes(hashes[new])
+        return [link for link, is_new in zip(links, new) if is_new]
+
+    def add(self, url):
+        """Mark a URL scheduled elsewhere (e.g. a seed) as seen."""
+        url = canonicalize_url(url)
+        if url is not None:
+            self.seen.add(url)
@@ -0,0 +1,116 @@
+import time
+import hashlib
+
+from crawl_state import SQLiteStore, url_fingerprint
+
+
+def content_hash(body):
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+def header_text(value):
+    """Header value as str (Scrapy headers are bytes, httpx ones str)."""
+    if isinstance(value, bytes):
+        return value.decode('latin-1')
+    return value
+
+
+class PageCache(SQLiteStore):
+    """HTTP validators, body hash and parse results of every page, kept across crawls.
+
+    Keyed by canonical URL. A re-crawl asks for each known page with
+    `If-None-Match` / `If-Modified-Since`; on a 304, or a 200 whose body
+    hashes the same as last time, the page is not parsed and its cached
+    emails and link candidates are replayed instead, so the output matches
+    a full crawl.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            fingerprint BLOB PRIMARY KEY,
+            url TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash BLOB NOT NULL,
+            emails TEXT NOT NULL,
+            links TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        self.counts = {'not_modified': 0, 'unchanged': 0, 'changed': 0, 'new': 0}
+
+    def validators(self, url):
+        """Conditional request headers for a cached page ({} if it was never fetched)."""
+        row = self.conn.execute(
+            'SELECT etag, last_modified FROM pages WHERE fingerprint = ?', (url_fingerprint(url),)
+        ).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers['If-None-Match'] = row[0]
+        if row and row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def unchanged(self, url, status, body, etag=None, last_modified=None):
+        """(emails, links) cached for a page that did not change (304 or same body hash), else None."""
+        fingerprint = url_fingerprint(url)
+        row = self.conn.execute(
+            'SELECT content_hash, emails, links FROM pages WHERE fingerprint = ?', (fingerprint,)
+        ).fetchone()
+        if row is None:
+            self.counts['new'] += 1
+            return None
+        if status == 304:
+            self.counts['not_modified'] += 1
+        elif content_hash(body) == row[0]:
+            self.counts['unchanged'] += 1
+        else:
+            self.counts['changed'] += 1
+            return None
+
+        # A 304 may carry fresh validators; keep the old ones otherwise
+        self.conn.execute(
+            'UPDATE pages SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), fetched_at = ? '
+            'WHERE fingerprint = ?',
+            (header_text(etag), header_text(last_modified), time.time(), fingerprint)
+        )
+        self._touch()
+        emails = row[1].split('\n') if row[1] else []
+        links = [tuple(line.split('\t', 1)) for line in row[2].split('\n')] if row[2] else []
+        return emails, links
+
+    def store(self, url, body, etag, last_modified, emails, links):
+        """Record a parsed page: validators, body hash, emails and (url, domain) link candidates."""
+        self.conn.execute(
+            'INSERT OR REPLACE INTO pages (fingerprint, url, etag, last_modified, content_hash, emails, links, fetched_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (url_fingerprint(url), url, header_text(etag), header_text(last_modified), content_hash(body),
+             '\n'.join(sorted(emails)), '\n'.join(f"{link}\t{domain}" for link, domain in links), time.time())
+        )
+        self._touch()
+
+    def report(self):
+        skipped = self.counts['not_modified'] + self.counts['unchanged']
+        total = skipped + self.counts['changed'] + self.counts['new']
+        return (f"{skipped} of {total} pages not re-parsed ({self.counts['not_modified']} not modified, "
+                f"{self.counts['unchanged']} same content), {self.counts['changed']} changed, {self.counts['new']} new")
+
+
+class ConditionalRequestMiddleware:
+    """Adds the page cache's validators to requests and lets their 304 responses reach the spider."""
+
+    def process_request(self, request, spider):
+        cache = getattr(spider, 'page_cache', None)
+        if cache is None:
+            return None
+        validators = cache.validators(request.url)
+        if validators:
+            for name, value in validators.items():
+                request.headers.setdefault(name, value)
+            statuses = request.meta.get('handle_httpstatus_list', [])
+            if 304 not in statuses:
+                request.meta['handle_httpstatus_list'] = [*statuses, 304]
+        return None
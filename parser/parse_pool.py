@@ -0,0 +1,116 @@
+import signal
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from parsel import Selector
+from w3lib.html import get_base_url
+
+from crawl_job import domain_from_url
+from link_filter import LinkFilter
+from email_extractor import extract_emails, is_wide_encoding
+
+# Worker-process link filter; only its canonicalization and domain cache are used
+_link_filter = None
+
+
+def parse_page(url, body, encoding, follow):
+    """(emails, links) of one page, run in a pool worker.
+
+    `links` are the (url, domain) candidates of LinkFilter.links, already
+    canonicalized and filtered on scheme and path; scope, dedup and the
+    crawl state stay with the spider. Empty unless `follow` is set.
+    """
+    global _link_filter
+    text = None
+    if is_wide_encoding(encoding):
+        text = body.decode(encoding, 'replace')
+        body = text.encode('utf-8')
+    emails = extract_emails(body)
+
+    links = []
+    if follow:
+        if text is None:
+            text = body.decode(encoding or 'utf-8', 'replace')
+        if _link_filter is None:
+            _link_filter = LinkFilter(domain_from_url)
+        hrefs = Selector(text=text).css('a::attr(href)').getall()
+        links = list(_link_filter.links(get_base_url(text[:4096], url), hrefs))
+    return sorted(emails), links
+
+
+def _ignore_sigint():
+    # Ctrl-C goes to the crawler, which shuts the pool down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class ParsePool:
+    """Process pool for page parsing, with a cap on pages in flight.
+
+    PARSE_PROCESSES workers run parse_page, so email and link extraction
+    stop competing with the reactor for one core. At most PARSE_MAX_PENDING
+    pages are parsed or queued for parsing at once; above that,
+    ParseBackpressureMiddleware holds new downloads, the engine stops
+    pulling from the scheduler and the backlog stays in the scheduler queue
+    as requests instead of piling up as response bodies.
+    """
+
+    def __init__(self, processes, max_pending=None):
+        self.processes = processes
+        self.max_pending = max_pending or 2 * processes
+        self.pending = 0
+        self.parsed = 0
+        self.waits = 0
+        self._room = None
+        # Forked, so workers inherit the spider's modules whatever sys.path `scrapy runspider` left;
+        # started now, before the reactor runs any threads
+        self.executor = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('fork'),
+                                            initializer=_ignore_sigint)
+        self.executor.submit(int).result()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """A pool for PARSE_PROCESSES > 0, else None (parse on the reactor thread)."""
+        processes = settings.getint('PARSE_PROCESSES', 0)
+        if processes <= 0:
+            return None
+        return cls(processes, settings.getint('PARSE_MAX_PENDING', 0))
+
+    def full(self):
+        return self.pending >= self.max_pending
+
+    async def wait_for_room(self):
+        if self._room is None:
+            self._room = asyncio.Event()
+        while self.full():
+            self.waits += 1
+            self._room.clear()
+            await self._room.wait()
+
+    async def parse(self, url, body, encoding, follow):
+        self.pending += 1
+        try:
+            future = self.executor.submit(parse_page, url, body, encoding, follow)
+            return await asyncio.wrap_future(future)
+        finally:
+            self.pending -= 1
+            self.parsed += 1
+            if self._room is not None and not self.full():
+                self._room.set()
+
+    def report(self):
+        return (f"{self.parsed} pages parsed in {self.processes} processes, "
+                f"downloads held {self.waits} times at {self.max_pending} pending")
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ParseBackpressureMiddleware:
+    """Holds requests before download while the spider's parse pool is full."""
+
+    async def process_request(self, request, spider):
+        pool = getattr(spider, 'parse_pool', None)
+        if pool is not None and pool.full():
+            await pool.wait_for_room()
+        return None
@@ -0,0 +1,172 @@
+import os
+import time
+import shutil
+from contextlib import nullcontext
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from twisted.internet import task
+
+from columnar import PARQUET_SUFFIX, emails_writer, pyarrow_modules
+
+# RESULT_SINK_FORMAT -> part file suffix
+PART_SUFFIXES = {'csv': '.csv.gz', 'parquet': PARQUET_SUFFIX}
+
+
+class S3Backend:
+    """Uploads finished part files to S3 (multipart above the threshold)."""
+
+    def __init__(self, bucket, s3=None, multipart_threshold=8 * 1024 * 1024):
+        self.bucket = bucket
+        self.s3 = s3 or boto3.client('s3')
+        self.transfer_config = TransferConfig(multipart_threshold=multipart_threshold)
+
+    def store(self, local_path, key):
+        self.s3.upload_file(local_path, self.bucket, key, Config=self.transfer_config)
+        os.remove(local_path)
+
+
+class LocalDirectoryBackend:
+    """Moves finished part files into a local directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def store(self, local_path, key):
+        target = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(local_path, target)
+
+
+class ResultSinkPipeline:
+    """Appends spider items to rotating part files and stores each part once.
+
+    A part is closed and handed to the backend when it reaches
+    RESULT_SINK_MAX_ROWS rows, RESULT_SINK_MAX_BYTES compressed bytes or
+    RESULT_SINK_FLUSH_INTERVAL seconds, whichever comes first. With
+    RESULT_SINK_FORMAT=csv (the default) each part is a gzip CSV with the
+    same `url,emails` layout as the old single results file; with `parquet`
+    it is a Parquet file with `emails` as a list<string> column. Either way
+    emails_merge.py reads the parts directly.
+    """
+
+    def __init__(self, backend_name='s3', local_dir='results', prefix=None, max_rows=50000, max_bytes=64 * 1024 * 1024,
+                 flush_interval=300, tmp_dir='/tmp', part_format='csv'):
+        if part_format not in PART_SUFFIXES:
+            raise ValueError(f"Unknown RESULT_SINK_FORMAT {part_format!r}, expected one of {sorted(PART_SUFFIXES)}")
+        if part_format == 'parquet':
+            pyarrow_modules()
+        self.part_format = part_format
+        self.backend_name = backend_name
+        self.local_dir = local_dir
+        self.backend = None
+        self.prefix = prefix
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.tmp_dir = tmp_dir
+        self.run_id = time.strftime('%Y%m%d-%H%M%S')
+        self.part_number = 0
+        self.rows_written = 0
+        self._part = None
+        self._rows_in_part = 0
+        self._part_urls = []
+        self._opened_at = None
+        self._timer = None
+        # The asyncio engine has no reactor; it calls check_interval() from its own loop instead
+        self.use_reactor_timer = True
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls.from_settings(crawler.settings)
+        pipeline.crawler = crawler
+        return pipeline
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            backend_name=settings.get('RESULT_SINK_BACKEND', os.getenv('RESULT_SINK_BACKEND', 's3')),
+            local_dir=settings.get('RESULT_SINK_DIR', os.getenv('RESULT_SINK_DIR', 'results')),
+            prefix=settings.get('RESULT_SINK_PREFIX'),
+            max_rows=settings.getint('RESULT_SINK_MAX_ROWS', 50000),
+            max_bytes=settings.getint('RESULT_SINK_MAX_BYTES', 64 * 1024 * 1024),
+            flush_interval=settings.getfloat('RESULT_SINK_FLUSH_INTERVAL', 300),
+            tmp_dir=settings.get('RESULT_SINK_TMP_DIR', '/tmp'),
+            part_format=settings.get('RESULT_SINK_FORMAT', os.getenv('RESULT_SINK_FORMAT', 'csv')),
+        )
+
+    def open_spider(self, spider=None):
+        spider = self.spider = spider or self.crawler.spider
+        # Parts go under the spider's output name: results_emails.csv -> results_emails/
+        self.prefix = self.prefix or os.path.splitext(spider.output_file)[0]
+        if self.backend_name == 'local':
+            self.backend = LocalDirectoryBackend(self.local_dir)
+        else:
+            self.backend = S3Backend(spider.bucket, s3=spider.s3)
+
+        # Emails a previous, killed run recorded but never stored in a part
+        crawl_state = getattr(spider, 'crawl_state', None)
+        if crawl_state:
+            for item in crawl_state.unexported_items():
+                self.process_item(item)
+        if self.flush_interval and self.use_reactor_timer:
+            self._timer = task.LoopingCall(self.check_interval)
+            self._timer.start(min(self.flush_interval, 30), now=False)
+
+    def close_spider(self, spider=None):
+        if self._timer and self._timer.running:
+            self._timer.stop()
+        self._close_part()
+        self.spider.logger.info(f"Result sink stored {self.part_number} part(s), {self.rows_written} rows.")
+
+    def process_item(self, item, spider=None):
+        with self._stage('sink_write'):
+            if self._part is None:
+                self._open_part()
+            self._part.write(item['url'], item['emails'])
+        self._rows_in_part += 1
+        self._part_urls.append(item['url'])
+        self.rows_written += 1
+
+        if self._rows_in_part >= self.max_rows or self._part.size() >= self.max_bytes:
+            self._close_part()
+        return item
+
+    def check_interval(self):
+        if self._part is not None and time.monotonic() - self._opened_at >= self.flush_interval:
+            self._close_part()
+
+    def _stage(self, name):
+        metrics = getattr(self.spider, 'metrics', None)
+        return metrics.stage(name) if metrics is not None else nullcontext()
+
+    def _part_key(self):
+        return f"{self.prefix}/{self.run_id}-part-{self.part_number:05d}{PART_SUFFIXES[self.part_format]}"
+
+    def _open_part(self):
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._local_path = os.path.join(self.tmp_dir, self._part_key().replace('/', '_'))
+        # A whole part is one Parquet row group
+        self._part = emails_writer(self._local_path, row_group_rows=self.max_rows)
+        self._rows_in_part = 0
+        self._part_urls = []
+        self._opened_at = time.monotonic()
+
+    def _close_part(self):
+        if self._part is None:
+            return
+        with self._stage('sink_write'):
+            self._part.close()
+        key = self._part_key()
+        self._part = None
+        self.part_number += 1
+        try:
+            with self._stage('sink_store'):
+                self.backend.store(self._local_path, key)
+        except Exception as e:
+            self.spider.logger.error(f"Failed to store result part {key}: {e}")
+            return
+
+        crawl_state = getattr(self.spider, 'crawl_state', None)
+        if crawl_state:
+            crawl_state.mark_exported(self._part_urls)
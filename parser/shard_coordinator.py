@@ -0,0 +1,138 @@
+"""Run EmailSpider as N domain shards and merge their outputs for emails_merge.py.
+
+    python shard_coordinator.py run --shards 4
+    python shard_coordinator.py merge --shards 4 --output emails.csv
+    python shard_coordinator.py merge --shards 4 --output emails.parquet
+
+`run` starts one crawl.py process per shard on this machine (`--engine async`
+for the asyncio engine).
+On a cluster, start each worker with SHARD_INDEX / SHARD_COUNT instead and
+use only `merge`. `merge` reads gzip CSV and Parquet parts alike and
+writes Parquet when the output name ends in .parquet.
+"""
+import os
+import sys
+import glob
+import argparse
+import subprocess
+
+import boto3
+
+from crawl_job import shard_name
+from result_sink import PART_SUFFIXES
+from columnar import read_email_rows, emails_writer
+
+CRAWL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crawl.py')
+
+
+def run_shards(shard_count, parallel, extra_args, engine='scrapy'):
+    """Run every shard as a local subprocess, `parallel` at a time; returns failed shard numbers."""
+    pending = list(range(shard_count))
+    running = {}
+    failed = []
+
+    while pending or running:
+        while pending and len(running) < parallel:
+            shard_index = pending.pop(0)
+            cmd = [sys.executable, CRAWL_FILE, '--engine', engine,
+                   '-a', f'shard_index={shard_index}', '-a', f'shard_count={shard_count}', *extra_args]
+            log_file = open(f"{shard_name(shard_index, shard_count)}.log", 'w')
+            running[shard_index] = (subprocess.Popen(cmd, stdout=log_file, stderr=subprocess.STDOUT), log_file)
+            print(f"▶️ Started {shard_name(shard_index, shard_count)} (pid {running[shard_index][0].pid})")
+
+        for shard_index, (process, log_file) in list(running.items()):
+            if process.poll() is None:
+                continue
+            log_file.close()
+            del running[shard_index]
+            status = '✅' if process.returncode == 0 else '❌'
+            print(f"{status} {shard_name(shard_index, shard_count)} exited with code {process.returncode}")
+            if process.returncode != 0:
+                failed.append(shard_index)
+
+        if running:
+            try:
+                next(iter(running.values()))[0].wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+
+    return failed
+
+
+def shard_part_files(shard_count, prefix, source, directory, bucket):
+    """Yield (shard_index, local part path) for every stored part, shard by shard."""
+    s3 = boto3.client('s3') if source == 's3' else None
+
+    for shard_index in range(shard_count):
+        shard_prefix = f"{prefix}/{shard_name(shard_index, shard_count)}/"
+        if source == 'local':
+            parts = sorted(part for suffix in PART_SUFFIXES.values()
+                           for part in glob.glob(os.path.join(directory, shard_prefix, f'*{suffix}')))
+            for part in parts:
+                yield shard_index, part
+        else:
+            paginator = s3.get_paginator('list_objects_v2')
+            keys = [obj['Key'] for page in paginator.paginate(Bucket=bucket, Prefix=shard_prefix)
+                    for obj in page.get('Contents', []) if obj['Key'].endswith(tuple(PART_SUFFIXES.values()))]
+            for key in sorted(keys):
+                local_part = os.path.join('/tmp', key.replace('/', '_'))
+                s3.download_file(bucket, key, local_part)
+                yield shard_index, local_part
+                os.remove(local_part)
+
+
+def merge_shards(shard_count, output, prefix, source='local', directory='results', bucket=None):
+    """Concatenate all shard parts into one `url,emails` CSV or Parquet file; returns rows per shard."""
+    rows_per_shard = {shard_index: 0 for shard_index in range(shard_count)}
+
+    writer = emails_writer(output)
+    try:
+        for shard_index, part in shard_part_files(shard_count, prefix, source, directory, bucket):
+            for url, emails in read_email_rows(part):
+                writer.write(url, emails)
+                rows_per_shard[shard_index] += 1
+    finally:
+        writer.close()
+
+    return rows_per_shard
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='run all shards as local processes')
+    run_parser.add_argument('--shards', type=int, required=True)
+    run_parser.add_argument('--parallel', type=int, default=None, help='processes at a time (default: all)')
+    run_parser.add_argument('--engine', choices=['scrapy', 'async'], default=os.getenv('CRAWL_ENGINE', 'scrapy'))
+    run_parser.add_argument('crawl_args', nargs=argparse.REMAINDER, help='extra args passed to crawl.py, after --')
+
+    merge_parser = subparsers.add_parser('merge', help='merge shard outputs into one CSV')
+    merge_parser.add_argument('--shards', type=int, required=True)
+    merge_parser.add_argument('--output', default='emails.csv')
+    merge_parser.add_argument('--prefix', default=os.path.splitext(os.getenv('OUTPUT_FILENAME', 'results_emails.csv'))[0])
+    merge_parser.add_argument('--source', choices=['local', 's3'], default=os.getenv('RESULT_SINK_BACKEND', 's3'))
+    merge_parser.add_argument('--dir', default=os.getenv('RESULT_SINK_DIR', 'results'))
+    merge_parser.add_argument('--bucket', default=os.getenv('AWS_BUCKET_NAME', 'email-scraper-university'))
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        extra_args = [arg for arg in args.crawl_args if arg != '--']
+        failed = run_shards(args.shards, args.parallel or args.shards, extra_args, args.engine)
+        if failed:
+            print(f"❌ Failed shards: {failed}")
+            return 1
+        print(f"✅ All {args.shards} shards finished")
+        return 0
+
+    rows_per_shard = merge_shards(args.shards, args.output, args.prefix, args.source, args.dir, args.bucket)
+    empty = [shard_index for shard_index, rows in rows_per_shard.items() if rows == 0]
+    if empty:
+        print(f"⚠️ Shards without output: {empty}")
+    print(f"✅ Merged {sum(rows_per_shard.values())} rows from {args.shards} shards into {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
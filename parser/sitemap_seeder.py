@@ -0,0 +1,150 @@
+import zlib
+import heapq
+from urllib.parse import urljoin, urlsplit
+
+from lxml import etree
+
+from domain_budget import CONTACT_KEYWORDS
+
+# Read per sitemap file, decompressed (the sitemaps.org limit)
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+FEED_CHUNK = 64 * 1024
+# Above any link priority (DomainBudget's CONTACT_PRIORITY), so seeds are fetched right after the roots
+SEED_PRIORITY = 20
+
+
+def robots_sitemaps(robots_url, body):
+    """Sitemap URLs listed in a robots.txt body (`Sitemap:` lines)."""
+    sitemaps = []
+    for line in body.decode('utf-8', 'replace').splitlines():
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'sitemap' and value.strip():
+            sitemaps.append(urljoin(robots_url, value.strip()))
+    return sitemaps
+
+
+def iter_sitemap(body, max_bytes=SITEMAP_MAX_BYTES):
+    """(kind, loc) of every entry of a sitemap or sitemap index; kind is 'url' or 'sitemap'.
+
+    The body (gzipped or not) is fed to a pull parser in chunks and every
+    entry is dropped once read, so memory stays flat on 50k-URL files.
+    Malformed XML ends the iteration at the first error.
+    """
+    decompress = zlib.decompressobj(wbits=47) if body[:2] == b'\x1f\x8b' else None
+    parser = etree.XMLPullParser(events=('end',), resolve_entities=False, no_network=True, huge_tree=False)
+    read = 0
+    try:
+        for start in range(0, len(body), FEED_CHUNK):
+            chunk = body[start:start + FEED_CHUNK]
+            if decompress is not None:
+                chunk = decompress.decompress(chunk, max_bytes - read)
+            read += len(chunk)
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                tag = etree.QName(element).localname if isinstance(element.tag, str) else ''
+                if tag in ('url', 'sitemap'):
+                    for child in element:
+                        if isinstance(child.tag, str) and etree.QName(child).localname == 'loc' and child.text:
+                            yield tag, child.text.strip()
+                            break
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+            if read >= max_bytes:
+                return
+    except etree.XMLSyntaxError:
+        return
+
+
+def contact_score(url):
+    """Contact keywords in the URL path; ties go to shallower paths."""
+    path = urlsplit(url).path.lower()
+    return sum(keyword in path for keyword in CONTACT_KEYWORDS), -path.rstrip('/').count('/')
+
+
+class DomainSitemaps:
+    def __init__(self, root_url):
+        self.root_url = root_url
+        self.pending = 0
+        self.files = 0
+        self.urls = 0
+        self.best = []  # min-heap of (score, url)
+
+
+class SitemapSeeder:
+    """Seeds each domain with its most contact-like sitemap URLs.
+
+    For every seed domain the engine fetches robots.txt, then the sitemaps
+    it lists (or /sitemap.xml), following sitemap indexes up to `max_files`
+    files. Page URLs are ranked by `contact_score` while streaming; once a
+    domain's last sitemap is read, its best `max_seeds` contact-like URLs
+    are returned for scheduling at SEED_PRIORITY.
+    """
+
+    def __init__(self, max_seeds=20, max_files=10):
+        self.max_seeds = max_seeds
+        self.max_files = max_files
+        self.domains = {}
+        self.requests = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        """A seeder for SITEMAP_SEEDS > 0 (seeds per domain), else None."""
+        max_seeds = settings.getint('SITEMAP_SEEDS', 0)
+        if max_seeds <= 0:
+            return None
+        return cls(max_seeds, settings.getint('SITEMAP_MAX_FILES', 10))
+
+    def start(self, domain, root_url):
+        """robots.txt URL to fetch for a seed domain, or None if the domain is already seeding."""
+        if domain in self.domains:
+            return None
+        self.domains[domain] = DomainSitemaps(root_url)
+        self.domains[domain].pending = 1
+        self.requests += 1
+        return urljoin(root_url, '/robots.txt')
+
+    def robots_done(self, domain, robots_url, body=None):
+        """Sitemap URLs to fetch after robots.txt (None body: robots.txt failed)."""
+        sitemaps = robots_sitemaps(robots_url, body) if body else []
+        return self._fetching(domain, sitemaps or [urljoin(robots_url, '/sitemap.xml')])
+
+    def sitemap_done(self, domain, body=None):
+        """Child sitemaps to fetch after one sitemap file (None body: the fetch failed)."""
+        state = self.domains[domain]
+        children = []
+        for kind, loc in iter_sitemap(body) if body else ():
+            if kind == 'sitemap':
+                children.append(loc)
+                continue
+            state.urls += 1
+            score = contact_score(loc)
+            if score[0] == 0:
+                continue
+            if len(state.best) < self.max_seeds:
+                heapq.heappush(state.best, (score, loc))
+            elif (score, loc) > state.best[0]:
+                heapq.heapreplace(state.best, (score, loc))
+        return self._fetching(domain, children)
+
+    def _fetching(self, domain, urls):
+        state = self.domains[domain]
+        urls = urls[:max(self.max_files - state.files, 0)]
+        state.files += len(urls)
+        state.pending += len(urls) - 1
+        self.requests += len(urls)
+        return urls
+
+    def finished(self, domain):
+        return self.domains[domain].pending == 0
+
+    def seeds(self, domain):
+        """Best contact-like sitemap URLs of a finished domain, best first."""
+        state = self.domains[domain]
+        return [url for _, url in sorted(state.best, reverse=True)]
+
+    def report(self):
+        urls = sum(state.urls for state in self.domains.values())
+        seeds = sum(len(state.best) for state in self.domains.values())
+        return (f"{len(self.domains)} domains, {self.requests} robots/sitemap requests, "
+                f"{urls} sitemap URLs read, {seeds} seeds")
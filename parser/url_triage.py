@@ -0,0 +1,205 @@
+"""Check every university URL before a crawl and refresh the input's status columns.
+
+    python url_triage.py ../full_universities_list.csv     # writes ../full_universities_list-triaged.csv
+    python url_triage.py input_urls.csv --output triaged.csv --concurrency 300 --timeout 20
+
+Each URL of the `url` / `web_pages` column gets a HEAD request (a GET when
+HEAD is answered with an error status), following redirects, with short
+timeouts. Connections come from one pool that caches DNS answers, so a
+host is resolved once however many URLs and redirects lead to it. A URL
+listed twice is checked once. Certificates are not verified, as in the
+crawl, so `ERROR: SSLError` means the TLS handshake itself failed.
+
+The input is copied with these columns refreshed (added when missing) to
+`--output`, by default `<input>-triaged.csv` next to the input:
+- url_status_codes: one status per URL, `[200]` or `['ERROR: ConnectTimeout', 200]`;
+- all_urls_valid: TRUE when every URL ends in a 2xx/3xx response;
+- final_urls: where each URL's redirects end, `', '`-separated like web_pages.
+
+Both engines then skip URLs whose host is dead (DNS failure, refused
+connection or failed TLS handshake, see crawl_job.is_dead_status) and
+start from their final URL (`-a url_triage=0` to ignore the columns). A
+timeout is recorded but not treated as dead, since a slow site may still
+answer within the crawl's DOWNLOAD_TIMEOUT. The report compares the time
+of this check with the time the crawl would have spent retrying the dead
+URLs: (RETRY_TIMES + 1) attempts of the measured failure time, spread
+over CONCURRENT_REQUESTS slots.
+"""
+import os
+import sys
+import csv
+import time
+import asyncio
+import argparse
+from collections import Counter
+
+from crawl_job import (CRAWL_SETTINGS, STATUS_COLUMN, VALID_COLUMN, FINAL_URL_COLUMN, header_names,
+                       input_url_column, split_urls, join_urls, is_dead_status)
+
+TIMEOUT_ERRORS = ('ERROR: ConnectTimeout', 'ERROR: ReadTimeout')
+OUTPUT_SUFFIX = '-triaged'
+
+
+def aiohttp_module():
+    """aiohttp is only needed for the triage itself."""
+    try:
+        import aiohttp
+    except ImportError as e:
+        raise ImportError("URL triage needs aiohttp: pip install aiohttp") from e
+    return aiohttp
+
+
+class UrlCheck:
+    __slots__ = ('status', 'final_url', 'seconds')
+
+    def __init__(self, status, final_url, seconds):
+        self.status = status
+        self.final_url = final_url
+        self.seconds = seconds
+
+
+def error_name(aiohttp, error):
+    """Name of a failed check, in the vocabulary of the existing url_status_codes column."""
+    if isinstance(error, aiohttp.TooManyRedirects):
+        return 'TooManyRedirects'
+    if isinstance(error, aiohttp.ConnectionTimeoutError):
+        return 'ConnectTimeout'
+    if isinstance(error, (aiohttp.ServerTimeoutError, asyncio.TimeoutError)):
+        return 'ReadTimeout'
+    if isinstance(error, aiohttp.ClientSSLError) or error.__class__.__name__ == 'SSLError':
+        return 'SSLError'
+    if isinstance(error, (aiohttp.InvalidURL, ValueError)):
+        return 'InvalidURL'
+    if isinstance(error, aiohttp.ClientConnectorError) or not isinstance(error, aiohttp.ClientError):
+        return 'ConnectionError'
+    # Connected, then failed (server disconnected, broken payload, ...): the host is alive
+    return error.__class__.__name__
+
+
+async def fetch(session, method, url, max_redirects):
+    async with session.request(method, url, allow_redirects=True, max_redirects=max_redirects) as response:
+        return response.status, str(response.url)
+
+
+async def check_url(aiohttp, session, semaphore, url, max_redirects):
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            status, final_url = await fetch(session, 'HEAD', url, max_redirects)
+            if status >= 400:
+                # Many servers answer HEAD with 403/405/501 but serve GET
+                status, final_url = await fetch(session, 'GET', url, max_redirects)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as e:
+            return UrlCheck(f"ERROR: {error_name(aiohttp, e)}", url, time.perf_counter() - started)
+        return UrlCheck(status, final_url, time.perf_counter() - started)
+
+
+async def check_urls(urls, concurrency, per_host, timeout, connect_timeout, max_redirects, dns_ttl):
+    """url -> UrlCheck for every distinct URL."""
+    aiohttp = aiohttp_module()
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host, use_dns_cache=True,
+                                     ttl_dns_cache=dns_ttl, ssl=False)
+    client_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout,
+                                     headers={'User-Agent': CRAWL_SETTINGS['USER_AGENT']}) as session:
+        checks = await asyncio.gather(*(check_url(aiohttp, session, semaphore, url, max_redirects) for url in urls))
+    return dict(zip(urls, checks))
+
+
+def status_cell(statuses):
+    return repr(statuses)
+
+
+def is_valid(statuses):
+    return bool(statuses) and all(isinstance(status, int) and status < 400 for status in statuses)
+
+
+def crawl_seconds_saved(checks, settings=CRAWL_SETTINGS):
+    """(slot seconds, wall seconds) the crawl would spend on the dead URLs, retries included."""
+    attempts = settings['RETRY_TIMES'] + 1
+    slot_seconds = sum(attempts * check.seconds for check in checks if is_dead_status(check.status))
+    return slot_seconds, slot_seconds / settings['CONCURRENT_REQUESTS']
+
+
+def triage_file(input_path, output_path, **options):
+    """Check the URLs of `input_path` and write it with refreshed status columns to `output_path`."""
+    with open(input_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+
+    url_column = input_url_column(header)
+    names = header_names(header)
+    for name in (STATUS_COLUMN, VALID_COLUMN, FINAL_URL_COLUMN):
+        if name not in names:
+            header.append(name)
+            names.append(name)
+    status_column, valid_column, final_column = (names.index(name)
+                                                 for name in (STATUS_COLUMN, VALID_COLUMN, FINAL_URL_COLUMN))
+
+    row_urls = [split_urls(row[url_column]) for row in rows]
+    urls = list(dict.fromkeys(url for urls_of_row in row_urls for url in urls_of_row))
+    started = time.perf_counter()
+    checks = asyncio.run(check_urls(urls, **options))
+    elapsed = time.perf_counter() - started
+
+    for row, urls_of_row in zip(rows, row_urls):
+        row.extend([''] * (len(header) - len(row)))
+        statuses = [checks[url].status for url in urls_of_row]
+        row[status_column] = status_cell(statuses)
+        row[valid_column] = 'TRUE' if is_valid(statuses) else 'FALSE'
+        row[final_column] = join_urls(checks[url].final_url for url in urls_of_row)
+
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(temp_path, output_path)
+    return checks, elapsed, len(rows)
+
+
+def print_report(checks, elapsed, row_count, output_path):
+    statuses = Counter(str(check.status) for check in checks.values())
+    dead = [check for check in checks.values() if is_dead_status(check.status)]
+    redirected = sum(check.final_url != url for url, check in checks.items() if not is_dead_status(check.status))
+    print(f"✅ Checked {len(checks)} URLs of {row_count} rows in {elapsed:.1f} s "
+          f"({len(checks) / max(elapsed, 1e-9):.0f} URLs/s), saved to {output_path}")
+    print('   ' + '  '.join(f"{status}: {count}" for status, count in statuses.most_common()))
+    timed_out = sum(check.status in TIMEOUT_ERRORS for check in checks.values())
+    print(f"   Redirected: {redirected}   Dead (DNS, refused, TLS): {len(dead)}   Timed out (still crawled): {timed_out}")
+    slot_seconds, wall_seconds = crawl_seconds_saved(dead)
+    print(f"⏱️ Pre-check {elapsed:.1f} s vs. about {wall_seconds:.0f} s the crawl would spend on dead URLs "
+          f"({slot_seconds:.0f} request-seconds over {CRAWL_SETTINGS['CONCURRENT_REQUESTS']} slots)")
+
+
+def default_output(input_path):
+    """Output next to the input, so the curated list is never rewritten by default."""
+    base, ext = os.path.splitext(input_path)
+    return f"{base}{OUTPUT_SUFFIX}{ext or '.csv'}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='CSV with a url or web_pages column (e.g. full_universities_list.csv)')
+    parser.add_argument('--output', help=f'output CSV (default: the input name with {OUTPUT_SUFFIX}, e.g. '
+                                         f'full_universities_list{OUTPUT_SUFFIX}.csv)')
+    parser.add_argument('--concurrency', type=int, default=200, help='URLs checked at once')
+    parser.add_argument('--per-host', type=int, default=2, help='connections per host')
+    parser.add_argument('--timeout', type=float, default=10.0, help='seconds per URL, redirects included')
+    parser.add_argument('--connect-timeout', type=float, default=5.0, help='seconds per connection attempt')
+    parser.add_argument('--max-redirects', type=int, default=10)
+    parser.add_argument('--dns-ttl', type=int, default=600, help='seconds a DNS answer is cached')
+    args = parser.parse_args(argv)
+
+    output_path = args.output or default_output(args.input)
+    checks, elapsed, row_count = triage_file(
+        args.input, output_path, concurrency=args.concurrency, per_host=args.per_host, timeout=args.timeout,
+        connect_timeout=args.connect_timeout, max_redirects=args.max_redirects, dns_ttl=args.dns_ttl)
+    print_report(checks, elapsed, row_count, output_path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
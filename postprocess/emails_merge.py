@@ -1,378 +1,409 @@
+import os
+import sys
+import json
+import glob
+import tempfile
+from collections import Counter
+
+import numpy as np
 import pandas as pd
-import tldextract
-import re
-from tqdm import tqdm
+from filter_rules import RuleSet
+from pattern_matcher import PatternMatcher
 
-# === File name settings ===
-UNIS_FILE = 'universities.csv'
-EMAILS_FILE = 'emails.csv'
-OUTPUT_FILE = 'final_emails.csv'
-INVALID_FILE = 'invalid_data.csv'
+# Modules shared with the spider live in parser/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'parser'))
+from dedup import FingerprintSet
+from domain_resolver import default_resolver
+from columnar import is_parquet, iter_parquet_batches, explode_email_batch, pyarrow_modules
+from crawl_metrics import StageTimings
 
-# === Load input files ===
-unis_df = pd.read_csv(UNIS_FILE)
-emails_df = pd.read_csv(EMAILS_FILE)
+# === File name settings ===
+# A .parquet name reads or writes Parquet instead of CSV/TSV
+UNIS_FILE = os.getenv('MERGE_UNIS_FILE', 'universities.csv')
+# or a glob over spider parts, e.g. 'results_emails/*.csv.gz' or 'results_emails/*.parquet'
+EMAILS_FILE = os.getenv('MERGE_EMAILS_FILE', 'emails.csv')
+OUTPUT_FILE = os.getenv('MERGE_OUTPUT_FILE', 'final_emails.csv')
+INVALID_FILE = os.getenv('MERGE_INVALID_FILE', 'invalid_data.csv')
+# Stage timings, row counts and removals of the run as JSON (none if unset)
+REPORT_FILE = os.getenv('MERGE_REPORT_FILE')
+
+# === Streaming settings ===
+# Rows of EMAILS_FILE read per chunk; memory use is bounded by this, not by the input size
+CHUNK_SIZE = int(os.getenv('MERGE_CHUNK_SIZE', 50000))
+# RAM for the cross-chunk email dedup set; beyond it fingerprints spill to disk
+DEDUP_MAX_MEMORY_MB = float(os.getenv('DEDUP_MAX_MEMORY_MB', 256))
+
+BASE_COLUMNS = ['country_code', 'university_name', 'university_url', 'source_url', 'email']
+FINAL_COLUMNS = BASE_COLUMNS + ['needs_manual_check', 'match_reason', 'is_whitelisted']
+INVALID_COLUMNS = BASE_COLUMNS + ['removal_reason', 'removal_mask', 'has_academic_url']
+UNIS_COLUMNS = ['url', 'country_code', 'university_name']
+# Per-university flags, computed once on the university table and carried to each row by the join
+UNIVERSITY_FLAG_COLUMNS = ['university_academic', 'college_candidate', 'university_tags']
 
 # === Extract base domain ===
 def extract_base_domain(url):
-    try:
-        ext = tldextract.extract(str(url))
-        return f"{ext.domain}.{ext.suffix}" if ext.domain and ext.suffix else None
-    except Exception:
-        return None
-
-unis_df['domain'] = unis_df['url'].apply(extract_base_domain)
-emails_df['domain'] = emails_df['url'].apply(extract_base_domain)
-
-# === Split emails into separate rows ===
-emails_expanded = emails_df.assign(email=emails_df['emails'].str.split(',')).explode('email')
-emails_expanded['email'] = emails_expanded['email'].str.strip()
-
-emails_clean = emails_expanded[['domain', 'url', 'email']].rename(columns={'url': 'source_url'})
-merged_df = unis_df.merge(emails_clean, on='domain', how='left')
-
-full_df = merged_df[['country_code', 'university_name', 'url', 'source_url', 'email']]
-full_df.columns = ['country_code', 'university_name', 'university_url', 'source_url', 'email']
-
-final_df = full_df.copy()
-
-# === Remove by file extensions ===
-before_ext = len(final_df)
-invalid_ext_mask = final_df['email'].str.lower().str.endswith((
-    '.jpg', '.png', '.webp', '.gif', '.jpeg', '.php', '.twig', '.svg', '.pdf',
-    '.docx', '.zip', '.asp', '.aspx', '.htm', '.html', '.google.com', '.evil.com',
-    '.jsp', '.xml', 'qq.com', '163.com', 'google.com', 'facebookmail.com',
-    'amazon.com', 'linkedin.com', 'formsubmit.co', 'sendgrid.net', 'company.com',
-    'mailgun.org', 'mandrillapp.com', '.css', 'example.com', 'example.org', '.gmail.com', 'yahoo', 'icloud'
-    'domain.com', 'fake-domain.com', 'email.com', 'yourdomain.com', 'yoursite', 'onmicrosoft.com', '.avif'
-
-), na=False)
-print(f"🧹 Removed emails with invalid extensions: {invalid_ext_mask.sum()}")
-
-# === Service/system emails ===
-service_names = {
-    'webmaster', 'web', 'private', 'root', 'hostmaster', 'postmaster', 'phishing',
-    'noreply', 'no-reply', 'bounce', 'mailer-daemon', 'support', 'helpdesk', 'help',
-    'service', 'security', 'abuse', 'privacy', 'hr', 'do-not-reply', 'donotreply',
-    'notifications', 'alerts', 'police', 'username', 'ude.wons', "loans", "loan", 
-    "financialaid", "security", 'student', 'students', 'courses', 'course', 'enrollment', 'library',
-    'registrar', 'billing', 'enrollments', 'summercamp', 'scholarships', 'scholarship', 'financialaid',
-    'career', 'accounts', 'foundation', 'alumni', 'invoice', 'billing', 'studentcareerscentre', 'studentcareers',
-    'studentservices', 'studentservicescentre', 'studentservicesdesk', 'studentservicesoffice', 'awards',
-    'shop', 'payroll', 'payments', 'payment', 'library', 'grants', 'verification', 'careers', 'safety', 'studentlife', 
-    'applications', 'policy', 'copiright', 'copyright', 'enrollment', 'enrollments', 'enrollmentservices', 
-    'scholarship', 'scholarships', 'accommodation', 'accommodations', 'housing', 'housingservices', 'student-accommodation',
-    'copyright-statement', 'annual-report', 'wellness-centre', 'restaurants-catering-canteens', 'hire-facilities',
-    'sponsorships', 'sponsorship', 'fees', 'policy', 'feedback', 'feedbacks', 'feedback-form', 'feedbacks-form',
-    'polisci', 'ethics', 'ethics-committee', 'ethics-committee-services', 'ethics-committee-service', 'ethics-committee-management',
-    'firstname', 'lastname', 'firstname.lastname', 'firstname_lastname', 'firstname-lastname', 'recruitment', 'campusrecfacilities', 
-    'campusstore', 'accreditation', 'campusvisit', 'campus', 'parking', 'sponsored', 'wordpress', 'patents', 'patent', 'patents-office',
-    'sysadmin', 'fondation', 'user', 'whoever', 'someone', 'nobody', 'anyone', 'everybody', 'covid', 'covid-19', 'covid19', 'covid19info',
-    'netname', 'roombookings', 'is-spam', 'spam', 'spamreport', 'spam-reports', 'spam-reporter', 'spam-reporters', 'print',
-    'userid', 'recruitment', 'tours', 'recruitment', 'question', 'questions', 'questionnaire', 'questionnaires', 'questioning', 'questioning-services',
-    'sequrite', 'sos', 'recruit', 'gestion-finances', 'pension', 'benefits', 'compensation',  'thesis', 'you', 'example', 'youremail', 'yourname',
-    'procurement', 'recruitt', 'events', 'studyabroad', 'sustainability', 'titleix', 'auxiliary-services', 'applicant', 'travel', 'trademarks', 'parent-resources', 'navigators', 'helpdesk', 'conference-services', 'bookcenter', 'campus-ministries', 
-    'studentconduct', 'student-conduct', 'student-conduct-services', 'student-conduct-service', 'student-conduct-management', 'ethics-and-compliance',
-    'regulatory-compliance', 'support-resources', 'ethical-research-conduct', 'roomscheduling', 'vaccinations', 'compliance', 'studentaccess',
-    'bibliotheque', 'bibliotheques', 'biblio', 'restauration-et-alimentation', 'carriere', 'carriere-services', 'securite', 'aide-financiere', 
-    'etudiant', 'etudiante', 'etudiants', 'etudiantes', 'employes', 'logistique-et-salles-evenementielles', 'equite-diversite-inclusion', 'services-et-commodites',
-    'nos-campus', 'la-boutique', 'boutique', 'evenements', 'aliments-nutrition', 'visite-nous', 'dons', 'donner', 'sante-mentale', 'mental-sante', 
-    'bien-etre, bienetre', 'wellness-centre', 'logement', 'logement-etudiants', 'musee', 'museums', 'certificat', 'certificats', 'admission', 'admissions-office', 
-    'archives', 'archives-services', 'residences', 'clubs-etudiants', 'soutien', 'support-services', 'inclusion-multiculturelle', 'visite-nous',
-    'alimentation', 'etudiantes', 'tudiante', 'donar', 'estudiante', 'estudiantes', 'empleado', 'empleados', 'emplees', 'admisión',  'comida', 'alimentos', 'visitar', 'visita', 
-    'familia', 'familias', 'internado', 'internship', 'club', 'clubes', 'voluntario', 'voluntariado', 'documento', 'documentación', 'inscripción', 'enrolamiento', 
-    'servicio', 'servicios', 'biblioteca', 'bibliothek', 'sicherheit', 'sicherheitdienste', 'hilfe', 'hilfeleistung', 'veranstaltungen', 'spende', 'spender', 'besuch','besuchen', 
-    'arbeiter', 'arbeitgeber', 'verein', 'vereine', 'vereinigen', 'familien', 'praktikum', 'vertraulichkeit', 'studenti', 'studentessa', 'carriera', 'donare', 'famiglia', 'famiglie',
-    'visita', 'visitare', 'volontario', 'volontariato', 'donazione', 'donazioni', 'donatore', 'donatori', 'donatrice', 'donatrici', 'donare', 'donare-ora', 'donazione-ora', 
-    'impiegati', 'impiegato', 'nutrizione', 'alimentazione', 'doacao', 'estudante', 'estudantes', 'estudante', 'aluno', 'aluna ', 'aluns', 'alums', 'alumnas', 'visite-nos', 'visita',
-    'nutricao', 'alimentacao', 'confidencialidade', 'confidencialidade-servicos', 'confidencialidade-servico', 'confidencialidade-gestao', 'confidencialidade-gestao-servicos',
-    'seguranca', 'seguridade', 'carreira', 'carreiras', 'evento', 'eventos',
-
-}
-
-def is_service_email(email):
-    if pd.isna(email): return False
-    username = email.split('@')[0].strip().lower()
-    return any(service in username for service in service_names)
-
-service_mask = final_df['email'].apply(is_service_email)
-print(f"🚫 Removed service/system emails: {service_mask.sum()}")
-
-# === Likely fake usernames ===
-def is_likely_fake_username(email):
-    if pd.isna(email): return False
-    username = email.split('@')[0].strip()
-    return (len(username) >= 25 and username.isalnum()) or username.isdigit()
-
-fake_mask = final_df['email'].apply(is_likely_fake_username)
-print(f"🧩 Removed fake usernames (≥25 characters): {fake_mask.sum()}")
+    return default_resolver().from_url(url)
+
+def extract_base_domain_column(urls):
+    return default_resolver().domain_column(urls)
+
+# === Row filters and college tagging rules (filter_rules.yaml) ===
+rules = RuleSet.from_file()
+row_filters = rules['row_filters']
+post_dedup_filters = rules['post_dedup_filters']
+college_tags = rules['college_tags']
 
 # === Clean 'mailto:' and percent-encoding ===
-def clean_email(email):
-    if pd.isna(email): return email
-    email = re.sub(r'%[0-9a-fA-F]{2}', '', email)
-    email = email.replace('%', '')
-    email = re.sub(r'^u003e', '', email) # ⬅️ delite 'u003e'
-    return email.strip()
-
-final_df['email'] = final_df['email'].str.replace(r'^mailto:', '', regex=True)
-final_df['email'] = final_df['email'].apply(clean_email)
-
-# === Basic email format validation ===
-def is_valid_email_basic(email):
-    if pd.isna(email): return False
-    parts = email.strip().split('@')
-    return len(parts) == 2 and '.' in parts[1]
-
-invalid_email_mask = ~final_df['email'].apply(is_valid_email_basic)
-print(f"❓ Removed invalid emails (missing @ or dot): {invalid_email_mask.sum()}")
-
-# === Remove by blacklisted source_url ===
-source_url_blacklist_words = {
-    "facebook", "linkedin", "sport", "sports", "art", "arts", "sexual", "crime", "phishing", 
-    "violence", "football", "police", "human-resources", "financialaid", "loans", 
-    "dance", "music", "cosmetology", "security", "privacy", "early-college", "veteran", "veterans", 
-    "incident", "incident-report", "incident-reporting", "incident-response", "incident-management",
-    "athletics", "housing", "terms-conditions", "terms-and-conditions", "wellnesscenter", "wellness-center", 
-    "alumni", "safety", "complaint", "complaints", "store", "shop", "donations", "donation", "GDPR", "GDPR-compliance",
-    "support-services", "library", "student-life", "covid", "covid-19", "hire", "hiring", "athlet", "athletic",
-    'disability', "disabilities", "disability-services", "disability-support", "disability-accommodations", 'applications', 
-    'policy', 'copiright', 'copyright', 'enrollment', 'enrollments', 'enrollmentservices', 
-    'scholarship', 'scholarships', 'accommodation', 'accommodations', 'housing', 'housingservices', 'student-accommodation',
-    'copyright-statement', 'annual-report', 'wellness-centre', 'restaurants-catering-canteens', 'hire-facilities',
-    'sponsorships', 'sponsorship', 'fees', 'payroll', 'payments', 'payment', 'library', 'grants', 'verification', 
-    'careers', 'safety', 'studentlife', 'recruitment-process', 'recruitment', 'recruiting', 'recruitment-services',
-    'employment', 'graduation', 'annual-reports', 'annual-reporting', 'annual-reporting-services', 'campus-accessibility',
-    'volunteer', 'volunteering', 'volunteer-services', 'volunteer-opportunities', 'volunteer-opportunity',
-    'volunteer-opportunities', 'volunteer-work', 'volunteer-program', 'volunteer-programs', 'volunteer-programme',
-    'volunteer-programmes', 'volunteer-organisation', 'volunteer-organisations', 'volunteer-organization', 'food-services',
-    'food-service', 'food-service-management', 'food-service-industry', 'food-service-operations', 'food-service-systems',
-    'careers-advisors', 'student-policies-and-guidelines', 'student-policies', 'student-guidelines', 'student-support', 'museum',
-    'vacancies', 'vacancy', 'job', 'jobs', 'job-offers', 'job-offer', 'job-vacancies', 'job-vacancy', 'bookstore', 'facilities', 
-    'room-bookings', 'room-booking', 'sustainability', 'sustainability', 'sustainable-development', 'enrolment-services', 
-    'requirements', 'requirements-services', 'future-students', 'physical-health', 'mental-health', 'subscribe', 'news',
-    'funding', 'cunews', 'hospitality', 'hospitality-services', 'alcohol', 'hr', 'telephone-service-basic', 'donner',
-    'telephone-service', 'telephone-services', 'telephone-service-providers', 'telephone-service-provider', 'facilities-services',
-    'archives', 'archives-services', 'archives-service', 'archives-management', 'archives-management-services', 'career', 'careers',
-    'career-services', 'career-service', 'career-management', 'career-management-services', 'career-development',
-    'book-stop', 'book-stops', 'book-stop-services', 'book-stop-service', 'book-stop-management', 'student-services', 
-    'blogs', 'blog', 'blogs1', 'printing-services', 'events', 'partnerships', 'partnership', 'how-to-make-a-gift', 'gift', 
-    'campus-life', 'online-forms', 'online-form', 'online-forms-services', 'online-form-services', 'forms', 'form', 'form-services',
-    'pride-fanshawe', 'after-applying', 'part-time-studies', 'part-time-study', 'part-time-study-services', 'part-time-study-service',
-    'military-connected-college', 'students-administrative-council', 'archive', 'accessibility', 'accessibility-services', 'accessibility-service',
-    'plan-a-visit', 'admission', 'admissions-services', 'admission-services', 'admissions-office', 'admissions-offices',
-    'logistics-and-mail', 'logistics-and-mail-services', 'logistics-and-mail-service', 'logistics-and-mail-management',
-    'graduate-council', 'health-and-wellness', 'health-and-wellness-services', 'health-and-wellness-service', 'contractors-vendors-and-suppliers',
-    'campus-support-services', 'diversity-and-inclusion', 'reports-and-accountability', 'brand', 'foip', 'foip-services', 'foip-service',
-    'sustainability-at-the-mount', 'webinar', 'webinars', 'webinar-services', 'registration', 'registration-services', 'registration-service',
-    'registrars-office', 'fitness-centre', 'fitness-centres', 'fitness-centre-services', 'fitness-centre-service', 'campus-services', 
-    'campus-service', 'student-financial-services', 'student-development-and-services', 'print-plus', 'petitions', 'petitions-services', 'petitions-service',
-    'on-campus', 'restaurants-cafes-bakeries-breweries-edmonton-area', 'application-checklist-apprenticeship', 'employer-services', 
-    'employer-service', 'employers', 'employer', 'for-journalists', 'health-and-wellbeing', 'media-releases', 'donors', 'contact-hr',
-    'foodoptions', 'purchasing', 'marcom', 'wellness', 'new-students', 'roombookings', 'room-bookings', 'room-booking', 'room-booking-services',
-    'mycommunity', 'goose-international-youth-camp', 'currentstudents', 'foodservices', 'parking', 'parking-services', 'parking-service', 'parking-management',
-    'make-gift', 'nos-campus', 'bibliotheque', 'bibliotheques', 'bibliotheque-services', 'bibliotheque-service', 'bibliotheque-management',
-    'biblio', 'employes', 'etudiants', 'etudiante', 'etudiantes', 'etudiant', 'etudiants', 'etudiants-services', 'maps',
-    'restauration-et-alimentation', 'restauration-et-alimentation-services', 'restauration-et-alimentation-service', 'disclaimer',
-    'services-et-commodites', 'logistique-et-salles-evenementielles', 'carriere', 'carriere-services', 'carriere-service',
-    'equite-diversite-inclusion', 'museums', 'calendar', 'locations-and-facilities', 'applying-to-unb', 'welcome-libraries', 
-    'academic-support-computing-representatives-group', 'honours-awards', 'about-procurement', 'procurement', 'procurement-services', 'procurement-service',
-    'video-conferencing', 'accessibility-statement', 'magazine', 'pride', 'grad-house-restaurant', 'ceremonies', 'gender_equality',
-    'dailynews', 'virtual-tours', 'campus-status', 'services-and-spaces', 'news-releases', 'news-release', 'news-releases-services', 'news-release-services',
-    'futurestudents', 'agents-list', 'registrar', 'enrol', 'students-council', 'fresh-applicant', 'request-for-trenders', 'campus-facilities',
-    'anti-ragging-measures', 'report', 'students-association', 'internship', 'alumbizdirectory', 'enrolment', 'student-experience', 
-    'harassment', 'students_union', 'phone-book-student', 'tender', 'student-council', 'studentservices', 'student-services', 'student-service',
-    'student-resources', 'student-organizations', 'student-activities', 'testing', 'student-center', 'student-centre', 'student-centers', 'student-centres', 'student-center-services',
-    'current-students', 'student-leadership-activities', 'for-students', 'student-concerns', 'student-engagement', 'student-success',
-    'civil-rights-compliance', 'student-affairs', 'studentaffairs', 'student-conduct-code', 'student-media', 'resources-students', 
-    'financial-aid', 'tuition-and-aid', 'student-right-to-know', 'residence-life', 'residence-life-services', 'residence-life-service', 'residence-life-management',
-    'campuslife', 'student-government', 'student-clubs-organizations', 'get-know-campus', 'study-abroad', 'residencelife', 'student_life',
-    'religious-life', 'residential-life', 'studentsuccess', 'dining', 'dining-services', 'dining-service', 'dining-management', 'r-kids',
-    'student-senate', 'student-involvement', 'money-matters', 'spiritual-life', 'sorority-and-fraternity-life', 'campus-recreation',
-    'resident-life', 'securite', 'aide-financiere', 'donate', 'student-affairs-staff', 'student-leadership-opportunities','student-affairs-and-outreach',
-    'indigenous-student-affairs', 'weddings', 'collegiate-licensing', 'military', 'student-happiness-center', 'student-wellbeing-center-officers',
-    'student-broadcast', 'student_account_office', 'health-center', 'clubs-and-organizations', 'Google-Developer-Student-Club', 'Legislation',
-    'student-parliament', 'studentske-sluzbe', 'student-and-cash-section', 'studentcouncil', 'international-students', 'bachelor', 'financial-support',
-    'applicants', 'foundation', 'inclusive-communities', 'health-and-well-being', 'ombudsman', 'evenements', 'bookclub', 'certificates',
-    'student-parents-centre', 'dean-of-students', 'certificate', 'exam', 'exams', 'antiracism', 'foundations', 'gender-diversity', 'human-rights-advising',
-    'web-servers-storage', 'ombudsoffice', 'employee-resources', 'endowment', 'endowment-services', 'endowment-service', 'endowment-management',
-    'confidentialite', 'confidentiality', 'confidentiality-services', 'confidentiality-service', 'confidentiality-management', 'who-do-i-call',
-    'la-boutique', 'boutique', 'foods-and-nutrition', 'apply', 'grant-support', 'religion-culture', 'residence', 'residences', 'residence-services',
-    'conditions-appointment', 'funds', 'cafeteria', 'mail_services', 'campus_life', 'patientcare', 'windowscatering', 'black-history-month', 'multicultural', 'diversity',
-    'honors-program', 'honors-programs', 'honors-programme', 'honors-programmes', 'admitted-students', 'PhotoGallery', 'StudentAssistance', 'accreditation', 
-    'commercial-drivers-license', 'visit-us', 'visiting-services', 'visiting-service', 'university-transfer', 'parent-promise', 'food-support', 'child-care-center',
-    'studentparents', 'legal-affairs', 'press-releases', 'press-release', 'multicultural-identity', 'parents-families', 'children', 'gallery', 'massage-therapy', 
-    'transfer', 'transfer-students', 'internprogram', 'campus-engagement', 'clubs-and-activities', 'clubs', 'student-clubs', 'clubs-and-orgs', 
-    'studentactivities', 'clubs_and_organizations', 'student-nurse-club', 'conservation-club', 'clubs-organizations', 'student_services_clubs',
-    'clubs-orgs', 'parents', 'orthoclub', 'hispanicclub', 'diabetesclub', 'surgclub', 'practiceclub', 'radiologyclub', 'mail-services', 'insurance-billing',
-    'student-clubs', 'philosophy-club', 'clubs-honor-societies-ensembles', 'dmc-student-clubs', 'clubs-activities', 'alums', 'food-permit', 'student-groups', 
-    'clubs-recreation', 'student_clubs_organizations', 'recruitt', 'vendors', 'vendor', 'vendors-services', 'vendors-service', 'vendors-management',
-    'support_services', 'restaurants', 'student-counselling', 'benefits', 'retirees', 'community-and-support', 'work-life-support', 'press-room',
-    'ethics-and-compliance-risk-committee', 'chancellor', 'service-support', 'sign-up', 'announcements', 'honors', 'luskinconferencecenter', 'lecturerresources',
-    'conflict-interest', 'mailman', 'video', 'funded-projects', 'conferences', 'coronavirus', 'campus-and-community-resources', 'legislation'
-    'next-steps', 'families', 'terms-of-use', 'giving', 'services-and-support', 'cutler-center', 'commencement-ceremony', 'marketing-communication',
-    'purch', 'public-records', 'engage', 'libraries', 'conference-center', 'neighborhood-relations', 'business-financial-services', '404', 'health-and-counseling-services',
-    'advising', 'advising-services', 'advising-service', 'titleix', 'title-ix', 'title-ix-services', 'title-ix-service', 'title-ix-management',
-    'ticket-services', 'ticket-service', 'navigate-staff', 'supporting-survivors', 'visitors', 'visitors-services', 'visitors-service', 'visitors-management',
-    'auxiliary-services', 'applicant', 'travel', 'trademarks', 'parent-resources', 'navigators', 'helpdesk', 'conference-services', 'bookcenter', 'campus-ministries', 
-    'studentconduct', 'student-conduct', 'student-conduct-services', 'student-conduct-service', 'student-conduct-management', 'ethics-and-compliance',
-    'regulatory-compliance', 'support-resources', 'ethical-research-conduct', 'roomscheduling', 'vaccinations', 'compliance', 'studentaccess',
-    'bibliotheque', 'bibliotheques', 'biblio', 'restauration-et-alimentation', 'carriere', 'carriere-services', 'securite', 'aide-financiere', 
-    'etudiant', 'etudiante', 'etudiants', 'etudiantes', 'employes', 'logistique-et-salles-evenementielles', 'equite-diversite-inclusion', 'services-et-commodites',
-    'nos-campus', 'la-boutique', 'boutique', 'evenements', 'aliments-nutrition', 'visite-nous', 'dons', 'donner', 'sante-mentale', 'mental-sante', 
-    'bien-etre, bienetre', 'wellness-centre', 'logement', 'logement-etudiants', 'musee', 'museums', 'certificat', 'certificats', 'admission', 'admissions-office', 
-    'archives', 'archives-services', 'residences', 'clubs-etudiants', 'soutien', 'support-services', 'inclusion-multiculturelle', 'visite-nous',
-    'alimentation', 'etudiantes', 'tudiante', 'donar', 'estudiante', 'estudiantes', 'empleado', 'empleados', 'emplees', 'admisión',  'comida', 'alimentos', 'visitar', 'visita', 
-    'familia', 'familias', 'internado', 'internship', 'club', 'clubes', 'voluntario', 'voluntariado', 'documento', 'documentación', 'inscripción', 'enrolamiento', 
-    'servicio', 'servicios', 'biblioteca', 'bibliothek', 'sicherheit', 'sicherheitdienste', 'hilfe', 'hilfeleistung', 'veranstaltungen', 'spende', 'spender', 'besuch','besuchen', 
-    'arbeiter', 'arbeitgeber', 'verein', 'vereine', 'vereinigen', 'familien', 'praktikum', 'vertraulichkeit', 'studenti', 'studentessa', 'carriera', 'donare', 'famiglia', 'famiglie',
-    'visita', 'visitare', 'volontario', 'volontariato', 'donazione', 'donazioni', 'donatore', 'donatori', 'donatrice', 'donatrici', 'donare', 'donare-ora', 'donazione-ora', 
-    'impiegati', 'impiegato', 'nutrizione', 'alimentazione', 'doacao', 'estudante', 'estudantes', 'estudante', 'aluno', 'aluna ', 'aluns', 'alums', 'alumnas', 'visite-nos', 'visita',
-    'nutricao', 'alimentacao', 'confidencialidade', 'confidencialidade-servicos', 'confidencialidade-servico', 'confidencialidade-gestao', 'confidencialidade-gestao-servicos',
-    'seguranca', 'seguridade', 'carreira', 'carreiras', 'evento', 'eventos',
-
-}
-
-def is_blacklisted_source_url(url):
-    if pd.isna(url):
-        return False
-    url = url.lower()
-    return any(word in url for word in source_url_blacklist_words)
-
-url_blacklist_mask = final_df['source_url'].apply(is_blacklisted_source_url)
-print(f"🔗 Removed rows by source_url blacklist: {url_blacklist_mask.sum()}")
-
-# === Combine masks and create invalid_df ===
-combined_invalid_mask = invalid_ext_mask | service_mask | fake_mask | invalid_email_mask | url_blacklist_mask
-invalid_df = final_df[combined_invalid_mask].copy()
-final_df = final_df[~combined_invalid_mask].copy()
-
-# === Convert emails to lowercase ===
-final_df['email'] = final_df['email'].str.lower()
-final_df['email'] = final_df['email'].str.replace(r'^20', '', regex=True)
-
-# === Calculate removal reasons with progress bar ===
-removal_reasons_invalid = []
-print("🧠 Generating removal reasons...")
-for i in tqdm(invalid_df.index, desc="Removal reasons"):
-    reasons = []
-    if invalid_ext_mask.loc[i]: reasons.append("extension")
-    if service_mask.loc[i]: reasons.append("service_name")
-    if fake_mask.loc[i]: reasons.append("fake_username")
-    if invalid_email_mask.loc[i]: reasons.append("invalid_format")
-    if url_blacklist_mask.loc[i]: reasons.append("source_url")
-    removal_reasons_invalid.append(", ".join(reasons))
-
-invalid_df["removal_reason"] = removal_reasons_invalid
-
-# === Remove duplicate emails ===
-before_dedup = len(final_df)
-final_df = final_df.drop_duplicates(subset='email', keep='first')
-after_dedup = len(final_df)
-print(f"📈 Before duplicate removal: {before_dedup} строк")
-print(f"📉 After duplicate removal: {after_dedup} строк")
-print(f"❌ Duplicate emails removed: {before_dedup - after_dedup}")
-
-# === Remove by country codes ===
-excluded_country_codes = ['DZ', 'BO', 'GH', 'GT', 'HN', 'DO', 'CU']
-before_country = len(final_df)
-final_df = final_df[~final_df['country_code'].isin(excluded_country_codes)]
-after_country = len(final_df)
-print(f"🌍 Before country-based filtering: {before_country}")
-print(f"📉 After country-based filtering: {after_country}")
-print(f"❌ Rows removed by country filter: {before_country - after_country}")
+def clean_email_column(emails):
+    emails = emails.str.replace(r'^mailto:', '', regex=True)
+    emails = emails.str.replace(r'%[0-9a-fA-F]{2}', '', regex=True).str.replace('%', '', regex=False)
+    emails = emails.str.replace(r'^u003e', '', regex=True) # ⬅️ delite 'u003e'
+    return emails.str.strip()
 
 # === Extra rule: Remove colleges without academic indicators ===
 academic_keywords = [
     "faculty", "research", "academics", "department", "program", "school-of", "stem"
 ]
 
-# === Check for academic indicators in URLs ===
-def has_academic_indicator(row):
-    urls_to_check = [str(row['source_url']).lower(), str(row['university_url']).lower()]
-    return any(keyword in url for url in urls_to_check for keyword in academic_keywords)
-
-final_df['has_academic_url'] = final_df.apply(has_academic_indicator, axis=1)
-
-# Grouping by universities to detect academic indicators
-uni_academic_presence = final_df.groupby('university_name')['has_academic_url'].any()
+academic_matcher = PatternMatcher(academic_keywords, name='academic-keywords')
+# US colleges the academic rule applies to
+college_name_pattern = 'community college|technical college'
 
-# === List of colleges lacking academic indicators ===
-colleges_to_remove = uni_academic_presence[~uni_academic_presence].index
-
-# === Mask for removal by academic rule ===
-college_removal_mask = (
-    (final_df['country_code'] == 'US') &
-    (final_df['university_name'].str.lower().str.contains('community college|technical college')) &
-    (final_df['university_name'].isin(colleges_to_remove))
-)
-
-# === Remove rows and move to invalid_df ===
-removed_college_rows = final_df[college_removal_mask].copy()
-removed_college_rows['removal_reason'] = 'community/technical college without academic URLs'
-
-# === Update invalid_df ===
-invalid_df = pd.concat([invalid_df, removed_college_rows], ignore_index=True)
-
-# === Remove rows from final_df ===
-final_df = final_df[~college_removal_mask].drop(columns=['has_academic_url'])
-
-print(f"🎓 Removed college rows without academic indicators: {college_removal_mask.sum()}")
+# === Check for academic indicators in URLs ===
+def academic_url_mask(urls):
+    """True where the lowercased URL contains an academic keyword; each distinct URL is scanned once."""
+    return np.asarray(academic_matcher.contains_column(urls.str.lower()), dtype=bool)
+
+# === Per-university flags ===
+def add_university_flags(unis_df):
+    """University table with UNIVERSITY_FLAG_COLUMNS: the academic keyword test of its URL,
+    whether the college rule applies to it and its college tag bits (university_name rules)."""
+    unis_df = unis_df.copy()
+    unis_df['university_academic'] = academic_url_mask(unis_df['university_url'])
+    unis_df['college_candidate'] = np.asarray(
+        (unis_df['country_code'] == 'US') &
+        unis_df['university_name'].str.lower().str.contains(college_name_pattern, na=False), dtype=bool)
+    unis_df['university_tags'] = college_tags.evaluate({'university_name': unis_df['university_name']}, partial=True)
+    return unis_df
 
 # === Markup college и white-list ===
-white_domains = {
-    "pomona.edu", "wellesley.edu", "amherst.edu", "swarthmore.edu",
-    "barnard.edu", "harvey.mudd.edu", "colby.edu", "brynmawr.edu",
-    "middlebury.edu", "carleton.edu", "davidson.edu", "grinnell.edu",
-    "haverford.edu", "macalester.edu", "vassar.edu", "bates.edu",
-    "oberlin.edu", "reed.edu", "union.edu", "connecticutcollege.edu",
-    "lafayette.edu", "scrippscollege.edu", "rhodes.edu", "whitman.edu",
-    "beloit.edu", "trinity.edu", "hamilton.edu", "kenyon.edu", "skidmore.edu"
-}
-
-white_names = {
-    "Pomona College", "Wellesley College", "Amherst College", "Swarthmore College",
-    "Barnard College", "Harvey Mudd College", "Colby College", "Bryn Mawr College",
-    "Middlebury College", "Carleton College", "Davidson College", "Grinnell College",
-    "Haverford College", "Macalester College", "Vassar College", "Bates College",
-    "Oberlin College", "Reed College", "Union College", "Connecticut College",
-    "Lafayette College", "Scripps College", "Rhodes College", "Whitman College",
-    "Beloit College", "Trinity College", "Hamilton College", "Kenyon College", "Skidmore College"
-}
-
-def extract_domain(email):
-    try: return email.split("@")[1].lower()
-    except: return ""
-
-def check_college_flags(email, university_name):
-    domain = extract_domain(email)
-    username_flag = "college" in domain
-    name_flag = isinstance(university_name, str) and "college" in university_name.lower()
-    whitelisted = domain in white_domains or university_name in white_names
-    match_reason = "both" if username_flag and name_flag else (
-        "email_domain" if username_flag else "university_name" if name_flag else ""
+def college_flag_columns(final_df):
+    """needs_manual_check / match_reason / is_whitelisted for every row at once.
+
+    Only the email rules run per row; the university_name rules come from
+    the `university_tags` column of the join.
+    """
+    tags = (college_tags.evaluate({'email': final_df['email']}, partial=True)
+            | final_df['university_tags'].to_numpy(dtype=np.uint64))
+    domain_flag = college_tags.has(tags, 'email_domain')
+    name_flag = college_tags.has(tags, 'university_name')
+    whitelisted = college_tags.has(tags, 'whitelisted')
+    match_reason = np.select(
+        [domain_flag & name_flag, domain_flag, name_flag], ['both', 'email_domain', 'university_name'], ''
     )
-    needs_manual = "yes" if (username_flag or name_flag) and not whitelisted else "no"
-    return pd.Series([needs_manual, match_reason, "yes" if whitelisted else "no"])
-
-final_df[["needs_manual_check", "match_reason", "is_whitelisted"]] = final_df.apply(
-    lambda row: check_college_flags(row["email"], row["university_name"]), axis=1
-)
-print(f"🧩 Rows with college tagging (needs_manual_check=yes): {(final_df['needs_manual_check'] == 'yes').sum()}")
-
-# === Save results ===
-final_df.to_csv(OUTPUT_FILE, index=False, sep='\t', encoding='utf-8')
-invalid_df.to_csv(INVALID_FILE, index=False, sep='\t', encoding='utf-8')
-print(f"✅ Done. Saved to file: {OUTPUT_FILE}")
-print(f"✅ Invalid rows saved to: {INVALID_FILE}")
-print(f"✅ Total emails: {len(final_df)}")
-print(f"✅ Total invalid rows: {len(invalid_df)}")
-print(f"✅ Total removed rows: {len(combined_invalid_mask)}")
-print(f"✅ Total duplicates removed: {before_dedup - after_dedup}")
-print(f"✅ Total removed by country: {before_country - after_country}")
-print(f"✅ Total removed by extensions: {invalid_ext_mask.sum()}")
-print(f"✅ Total service emails removed: {service_mask.sum()}")
-print(f"✅ Total fake usernames removed: {fake_mask.sum()}")
-print(f"✅ Total invalid emails removed: {invalid_email_mask.sum()}")
-print(f"✅ Total removed by source_url blacklist: {url_blacklist_mask.sum()}")
-print(f"✅ Total rows removed due to source_url: {url_blacklist_mask.sum()}")
+    return pd.DataFrame({
+        'needs_manual_check': np.where((domain_flag | name_flag) & ~whitelisted, 'yes', 'no'),
+        'match_reason': match_reason,
+        'is_whitelisted': np.where(whitelisted, 'yes', 'no'),
+    }, index=final_df.index)
+
+
+# === Incremental TSV writer ===
+class ChunkWriter:
+    """Appends DataFrame chunks to one file, writing the header only once."""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.rows = 0
+        pd.DataFrame(columns=columns).to_csv(path, index=False, sep='\t', encoding='utf-8')
+
+    def write(self, df):
+        if df.empty:
+            return
+        df.reindex(columns=self.columns).to_csv(
+            self.path, mode='a', header=False, index=False, sep='\t', encoding='utf-8'
+        )
+        self.rows += len(df)
+
+    def close(self):
+        pass
+
+
+# === Incremental Parquet writer ===
+def parquet_schema(columns):
+    """Output columns as strings, except the typed removal columns of invalid_data."""
+    pa, _ = pyarrow_modules()
+    types = {
+        'removal_reason': pa.dictionary(pa.int32(), pa.string()),
+        'removal_mask': pa.uint64(),
+        'has_academic_url': pa.bool_(),
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+
+class ParquetChunkWriter:
+    """Appends DataFrame chunks to one Parquet file, one row group per chunk."""
+
+    def __init__(self, path, columns):
+        _, pq = pyarrow_modules()
+        self.path = path
+        self.columns = columns
+        self.rows = 0
+        self.schema = parquet_schema(columns)
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, df):
+        if df.empty:
+            return
+        pa, _ = pyarrow_modules()
+        arrays = [pa.array(df[field.name], type=field.type, from_pandas=True) if field.name in df
+                  else pa.nulls(len(df), field.type) for field in self.schema]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        self.rows += len(df)
+
+    def close(self):
+        self.writer.close()
+
+
+def chunk_writer(path, columns):
+    return ParquetChunkWriter(path, columns) if is_parquet(path) else ChunkWriter(path, columns)
+
+
+# === Pipeline stages ===
+def load_universities(path=UNIS_FILE):
+    """University table indexed by base domain for the per-chunk join."""
+    if is_parquet(path):
+        unis_df = pd.read_parquet(path, columns=UNIS_COLUMNS, memory_map=True)
+    else:
+        unis_df = pd.read_csv(path, usecols=UNIS_COLUMNS)
+    unis_df['domain'] = extract_base_domain_column(unis_df['url'])
+    unis_df = unis_df[['domain', 'country_code', 'university_name', 'url']]
+    return unis_df.rename(columns={'url': 'university_url'}).set_index('domain')
+
+
+def read_email_chunks(path=EMAILS_FILE, chunk_size=CHUNK_SIZE):
+    """Chunks of the crawl output; `path` may be a glob over spider part files.
+
+    Parquet parts are memory-mapped, only their url and emails columns are
+    read, and their email lists are exploded in Arrow: those chunks already
+    have one `email` row per email instead of an `emails` cell.
+    """
+    for part in sorted(glob.glob(path)) or [path]:
+        if is_parquet(part):
+            chunks = (explode_email_batch(batch).to_pandas()
+                      for batch in iter_parquet_batches(part, ['url', 'emails'], chunk_size))
+        else:
+            chunks = pd.read_csv(part, chunksize=chunk_size, dtype=str)
+        for emails_df in chunks:
+            emails_df['domain'] = extract_base_domain_column(emails_df['url'])
+            yield emails_df
+
+
+def explode_emails(emails_df):
+    """Split the comma-separated `emails` cell into one row per email (Parquet chunks come split)."""
+    if 'email' in emails_df:
+        emails_expanded = emails_df.copy()
+    else:
+        emails_expanded = emails_df.assign(email=emails_df['emails'].str.split(',')).explode('email')
+    emails_expanded['email'] = emails_expanded['email'].str.strip()
+    return emails_expanded[['domain', 'url', 'email']].rename(columns={'url': 'source_url'})
+
+
+def join_universities(emails_clean, unis_df):
+    # Joined from the email side so rows keep emails.csv order, whatever the chunk size
+    merged_df = emails_clean.join(unis_df, on='domain', how='inner')
+    return merged_df.reset_index(drop=True)[BASE_COLUMNS + UNIVERSITY_FLAG_COLUMNS]
+
+
+def filter_chunk(final_df, stats):
+    """Apply the row filters; returns (kept rows, invalid rows with reasons)."""
+    raw_email = final_df['email']
+    final_df['email'] = clean_email_column(raw_email)
+
+    # === One pass over every row filter: extension, service name, fake username, format, source_url ===
+    reasons = row_filters.evaluate({
+        'raw_email': raw_email,
+        'email': final_df['email'],
+        'source_url': final_df['source_url'],
+    })
+    combined_invalid_mask = reasons != 0
+    invalid_df = final_df[combined_invalid_mask].copy()
+    invalid_df['removal_reason'] = row_filters.describe(reasons[combined_invalid_mask])
+    invalid_df['removal_mask'] = reasons[combined_invalid_mask]
+    final_df = final_df[~combined_invalid_mask].copy()
+
+    # === Convert emails to lowercase ===
+    final_df['email'] = final_df['email'].str.lower()
+    final_df['email'] = final_df['email'].str.replace(r'^20', '', regex=True)
+
+    stats.update(row_filters.count(reasons))
+    stats['rows'] += len(combined_invalid_mask)
+    return final_df, invalid_df
+
+
+# === Run report ===
+def merge_report(timings, stats, seen_emails, final_rows, invalid_rows):
+    """Row counts, removed rows by reason and stage timings of one run."""
+    reasons = [reason for reason in row_filters.bits if reason != 'college'] + ['duplicates', 'country', 'college']
+    return {
+        'output_file': OUTPUT_FILE,
+        'invalid_file': INVALID_FILE,
+        'rows': {
+            'final': final_rows,
+            'invalid': invalid_rows,
+            'checked': stats['rows'],
+            'needs_manual_check': stats['needs_manual_check'],
+        },
+        'removed': {reason: stats[reason] for reason in reasons},
+        'email_dedup': seen_emails.report(),
+        'stages': timings.as_dict(),
+    }
+
+
+def print_report(report, timings):
+    print(f"📊 Stages:\n{timings.report()}")
+    print("🧹 Removed rows: " + ', '.join(f"{reason} {count}" for reason, count in report['removed'].items()))
+    print(f"🧮 Email dedup: {report['email_dedup']}")
+    print(f"🧩 Rows with college tagging (needs_manual_check=yes): {report['rows']['needs_manual_check']}")
+    print(f"✅ Done. {report['rows']['final']} emails saved to {report['output_file']}, "
+          f"{report['rows']['invalid']} invalid rows to {report['invalid_file']} "
+          f"({report['rows']['checked']} rows checked by the row filters)")
+
+
+def main(chunk_size=CHUNK_SIZE):
+    """Merge EMAILS_FILE with UNIS_FILE into OUTPUT_FILE and INVALID_FILE in two streaming passes.
+
+    INVALID_FILE rows come in three blocks: rows removed by the row filters,
+    chunk by chunk in EMAILS_FILE order; then universities without any
+    crawled email, in UNIS_FILE order; then rows removed by the college rule.
+    """
+    stats = Counter()
+    timings = StageTimings()
+    with timings.stage('load_universities') as stage:
+        unis_df = load_universities()
+        stage.rows(None, len(unis_df))
+    with timings.stage('university_flags') as stage:
+        unis_df = add_university_flags(unis_df)
+        stage.rows(len(unis_df), len(unis_df))
+    matched_domains = set()
+    seen_emails = FingerprintSet(max_memory_bytes=int(DEDUP_MAX_MEMORY_MB * 1024 * 1024))
+    # Names with an academic URL on any kept row, and names of kept rows the college rule applies to
+    academic_names = set()
+    college_names = set()
+
+    invalid_writer = chunk_writer(INVALID_FILE, INVALID_COLUMNS)
+    output_dir = os.path.dirname(os.path.abspath(OUTPUT_FILE))
+
+    with tempfile.TemporaryDirectory(prefix='emails_merge_', dir=output_dir) as spool_dir:
+        spool_files = []
+
+        def process(full_df):
+            with timings.stage('filter') as stage:
+                final_df, invalid_df = filter_chunk(full_df, stats)
+                stage.rows(len(full_df), len(final_df))
+            with timings.stage('write_invalid') as stage:
+                invalid_writer.write(invalid_df)
+                stage.rows(len(invalid_df), len(invalid_df))
+
+            # === Remove duplicate emails (global, keep first) ===
+            with timings.stage('dedup') as stage:
+                before_dedup = len(final_df)
+                final_df = final_df[seen_emails.first_seen_mask(final_df['email'])]
+                stats['duplicates'] += before_dedup - len(final_df)
+                stage.rows(before_dedup, len(final_df))
+
+            # === Remove by country codes ===
+            with timings.stage('country') as stage:
+                before_country = len(final_df)
+                final_df = final_df[post_dedup_filters.evaluate({'country_code': final_df['country_code']}) == 0].copy()
+                stats['country'] += before_country - len(final_df)
+                stage.rows(before_country, len(final_df))
+            if final_df.empty:
+                return
+
+            with timings.stage('academic_flags') as stage:
+                has_academic_url = academic_url_mask(final_df['source_url']) | final_df['university_academic'].to_numpy()
+                final_df['has_academic_url'] = has_academic_url
+                academic_names.update(final_df['university_name'][has_academic_url].dropna().unique())
+                college_names.update(final_df['university_name'][final_df['college_candidate'].to_numpy()].unique())
+                stage.rows(len(final_df), len(final_df))
+
+            with timings.stage('spool') as stage:
+                spool_file = os.path.join(spool_dir, f"part-{len(spool_files):06d}.pkl")
+                final_df.to_pickle(spool_file)
+                spool_files.append(spool_file)
+                stage.rows(len(final_df), len(final_df))
+
+        # === Pass 1: stream emails, filter, dedup and spool kept rows ===
+        chunks = timings.iterate('read', read_email_chunks(chunk_size=chunk_size))
+        for i, emails_df in enumerate(chunks, start=1):
+            with timings.stage('explode') as stage:
+                emails_clean = explode_emails(emails_df)
+                stage.rows(len(emails_df), len(emails_clean))
+            with timings.stage('join') as stage:
+                matched_domains.update(emails_clean['domain'].unique())
+                full_df = join_universities(emails_clean, unis_df)
+                stage.rows(len(emails_clean), len(full_df))
+            process(full_df)
+            print(f"📦 Processed chunk {i}: {stats['rows']} rows so far")
+
+        # Universities without any crawled email keep their left-join row,
+        # which always fails format validation (no email)
+        with timings.stage('unmatched') as stage:
+            unmatched = unis_df[~unis_df.index.isin(list(matched_domains))]
+            unmatched = unmatched.reset_index(drop=True).reindex(columns=BASE_COLUMNS)
+            unmatched['removal_reason'] = row_filters.labels['invalid_format']
+            unmatched['removal_mask'] = row_filters.bits['invalid_format']
+            invalid_writer.write(unmatched)
+            stats['invalid_format'] += len(unmatched)
+            stats['rows'] += len(unmatched)
+            stage.rows(len(unis_df), len(unmatched))
+
+        # === List of colleges lacking academic indicators ===
+        colleges_to_remove = college_names - academic_names
+
+        # === Pass 2: college rule and tagging over the spooled rows ===
+        final_writer = chunk_writer(OUTPUT_FILE, FINAL_COLUMNS)
+        for spool_file in spool_files:
+            with timings.stage('unspool') as stage:
+                final_df = pd.read_pickle(spool_file)
+                stage.rows(None, len(final_df))
+
+            # === Mask for removal by academic rule ===
+            with timings.stage('college') as stage:
+                college_removal_mask = final_df['college_candidate'] & final_df['university_name'].isin(colleges_to_remove)
+                removed = final_df[college_removal_mask].copy()
+                removed['removal_reason'] = row_filters.labels['college']
+                removed['removal_mask'] = row_filters.bits['college']
+                stats['college'] += len(removed)
+
+                kept = final_df[~college_removal_mask].drop(columns=['has_academic_url'])
+                stage.rows(len(final_df), len(kept))
+                final_df = kept
+            with timings.stage('write_invalid') as stage:
+                invalid_writer.write(removed)
+                stage.rows(len(removed), len(removed))
+            if final_df.empty:
+                continue
+            with timings.stage('college_tags') as stage:
+                final_df = final_df.join(college_flag_columns(final_df))
+                stats['needs_manual_check'] += int((final_df['needs_manual_check'] == 'yes').sum())
+                stage.rows(len(final_df), len(final_df))
+            with timings.stage('write_final') as stage:
+                final_writer.write(final_df)
+                stage.rows(len(final_df), len(final_df))
+
+        final_writer.close()
+        invalid_writer.close()
+
+    report = merge_report(timings, stats, seen_emails, final_writer.rows, invalid_writer.rows)
+    print_report(report, timings)
+    if REPORT_FILE:
+        with open(REPORT_FILE, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report saved to: {REPORT_FILE}")
+
+
+if __name__ == '__main__':
+    main()
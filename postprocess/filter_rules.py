@@ -0,0 +1,165 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from pattern_matcher import PatternMatcher
+
+# === Rules file ===
+RULES_FILE = os.getenv('MERGE_RULES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'filter_rules.yaml'))
+
+RULE_TYPES = ('suffix', 'substring', 'regex', 'length', 'country', 'whitelist', 'flag')
+
+
+def load_rules_file(path=RULES_FILE):
+    """Parsed YAML (.yaml/.yml) or TOML (.toml) rules file."""
+    if path.endswith('.toml'):
+        import tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    import yaml
+    with open(path, encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+# === Column transforms ===
+def _username(series):
+    return series.str.split('@').str[0]
+
+
+def _domain(series):
+    return series.str.split('@').str[1].fillna('')
+
+
+TRANSFORMS = {
+    'lower': lambda series: series.str.lower(),
+    'strip': lambda series: series.str.strip(),
+    'username': _username,
+    'domain': _domain,
+}
+
+
+class Rule:
+    """One compiled rule: a vectorized mask over a (transformed) column."""
+
+    def __init__(self, spec, group):
+        self.reason = spec['reason']
+        self.type = spec.get('type')
+        if self.type not in RULE_TYPES:
+            raise ValueError(f"{group}: rule for '{self.reason}' has unknown type {self.type!r}")
+        self.column = spec.get('column')
+        self.transform = tuple(spec.get('transform', ()))
+        for name in self.transform:
+            if name not in TRANSFORMS:
+                raise ValueError(f"{group}: unknown transform {name!r} in rule for '{self.reason}'")
+
+        values = spec.get('values', [])
+        if any(not isinstance(value, str) for value in values):
+            # YAML reads NO / yes / 404 as bool or int unless quoted
+            raise ValueError(f"{group}: non-string value in rule for '{self.reason}'; quote it in the rules file")
+        if self.type == 'suffix':
+            self.values = tuple(values)
+        elif self.type == 'substring':
+            self.matcher = PatternMatcher(values, name=f"{group}-{self.reason}")
+        elif self.type == 'regex':
+            self.pattern = re.compile(spec['pattern'])
+            self.negate = spec.get('negate', False)
+        elif self.type == 'length':
+            self.min = spec.get('min')
+            self.max = spec.get('max')
+            self.where = spec.get('where')
+        elif self.type in ('country', 'whitelist'):
+            self.values = set(values)
+
+    def mask(self, column):
+        """Boolean numpy mask; missing values never match (a negated regex flags them)."""
+        if self.type == 'suffix':
+            mask = column.str.endswith(self.values, na=False)
+        elif self.type == 'substring':
+            mask = self.matcher.contains_column(column)
+        elif self.type == 'regex':
+            mask = column.str.contains(self.pattern, regex=True, na=False)
+            if self.negate:
+                mask = ~mask
+        elif self.type == 'length':
+            lengths = column.str.len()
+            mask = column.notna()
+            if self.min is not None:
+                mask &= lengths >= self.min
+            if self.max is not None:
+                mask &= lengths <= self.max
+            if self.where:
+                mask &= getattr(column.str, self.where)().fillna(False).astype(bool)
+        else:  # country / whitelist
+            mask = column.isin(self.values)
+        return np.asarray(mask, dtype=bool)
+
+
+class RuleGroup:
+    """Rules of one group compiled to a single bitmask evaluation.
+
+    Every reason gets a bit in the order the group lists them. `evaluate`
+    derives each (column, transform) pair once, runs every rule over it
+    and ORs the rule bits into one integer per row.
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.labels = dict(spec['reasons'])
+        self.bits = {reason: 1 << i for i, reason in enumerate(self.labels)}
+        self.rules = [Rule(rule, name) for rule in spec.get('rules', [])]
+        for rule in self.rules:
+            if rule.reason not in self.bits:
+                raise ValueError(f"{name}: rule reason '{rule.reason}' is not listed under reasons")
+
+    def evaluate(self, columns, partial=False):
+        """uint64 reason bitmask per row of `columns` (a dict of equally long Series).
+
+        With partial=True, rules over columns not in `columns` are skipped, so
+        rules over a table's own columns can be evaluated once on that table
+        and ORed into the per-row result.
+        """
+        derived = {}
+        result = np.zeros(len(next(iter(columns.values()))), dtype=np.uint64)
+        for rule in self.rules:
+            if rule.type == 'flag' or (partial and rule.column not in columns):
+                continue
+            key = (rule.column, rule.transform)
+            if key not in derived:
+                column = columns[rule.column]
+                for name in rule.transform:
+                    column = TRANSFORMS[name](column)
+                derived[key] = column
+            result[rule.mask(derived[key])] |= np.uint64(self.bits[rule.reason])
+        return result
+
+    def has(self, bitmask, reason):
+        return (bitmask & np.uint64(self.bits[reason])) != 0
+
+    def count(self, bitmask):
+        """Rows flagged per reason."""
+        return {reason: int(self.has(bitmask, reason).sum()) for reason in self.bits}
+
+    def describe(self, bitmask, sep=', '):
+        """Reason labels per row joined by `sep` ('' where no bit is set)."""
+        codes, uniques = pd.factorize(bitmask)
+        labels = np.array([
+            sep.join(label for reason, label in self.labels.items() if int(value) & self.bits[reason])
+            for value in uniques
+        ], dtype=object)
+        return labels[codes]
+
+
+class RuleSet:
+    """All rule groups of a rules file, by group name."""
+
+    def __init__(self, spec):
+        self.groups = {name: RuleGroup(name, group) for name, group in spec.items()}
+
+    @classmethod
+    def from_file(cls, path=RULES_FILE):
+        return cls(load_rules_file(path))
+
+    def __getitem__(self, name):
+        return self.groups[name]
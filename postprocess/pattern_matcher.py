@@ -0,0 +1,129 @@
+import os
+import pickle
+import hashlib
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+try:
+    import ahocorasick
+except ImportError:  # pure-Python automaton is used instead
+    ahocorasick = None
+
+# === Cache settings ===
+CACHE_DIR = os.getenv('PATTERN_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.pattern_cache'))
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton over a fixed set of substrings.
+
+    One pass over a string finds every pattern it contains, instead of one
+    `in` check per pattern. The compiled automaton is pickled to CACHE_DIR
+    keyed by the pattern set, so later runs skip the build step.
+    """
+
+    def __init__(self, patterns, name='patterns', cache_dir=CACHE_DIR):
+        self.patterns = sorted({p for p in patterns if p})
+        self.name = name
+        self.cache_dir = cache_dir
+        self._automaton = self._load_or_build()
+
+    # === Build / cache ===
+    def _cache_path(self):
+        backend = 'pyahocorasick' if ahocorasick else 'python'
+        digest = hashlib.sha1('\n'.join(self.patterns).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{self.name}-{backend}-{digest}.pkl")
+
+    def _load_or_build(self):
+        path = self._cache_path() if self.cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+            except Exception:
+                pass
+
+        automaton = self._build()
+
+        if path:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(automaton, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except OSError:
+                pass
+        return automaton
+
+    def _build(self):
+        if ahocorasick:
+            automaton = ahocorasick.Automaton()
+            for pattern in self.patterns:
+                automaton.add_word(pattern, pattern)
+            automaton.make_automaton()
+            return automaton
+
+        # Trie as a list of transition dicts, then BFS for failure links
+        goto, fail, output = [{}], [0], [None]
+        for pattern in self.patterns:
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    output.append(None)
+                state = nxt
+            output[state] = pattern
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if output[nxt] is None:
+                    output[nxt] = output[fail[nxt]]
+        return goto, fail, output
+
+    # === Matching ===
+    def first_match(self, text):
+        """Return the first pattern found in text (leftmost end), or None."""
+        if not isinstance(text, str) or not text:
+            return None
+        if ahocorasick:
+            for _, pattern in self._automaton.iter(text):
+                return pattern
+            return None
+
+        goto, fail, output = self._automaton
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+    def match_column(self, series):
+        """Return the matched pattern per row (None where nothing matched).
+
+        Each distinct value is scanned once, so repeated source URLs or
+        usernames cost a single automaton pass.
+        """
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        # Trailing None is picked up by the -1 code pandas gives to NaN
+        matched = np.array([self.first_match(value) for value in uniques] + [None], dtype=object)
+        return pd.Series(matched[codes], index=series.index, dtype=object)
+
+    def contains_column(self, series):
+        """Boolean mask: True where any pattern occurs in the row."""
+        return self.match_column(series).notna()
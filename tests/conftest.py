@@ -0,0 +1,47 @@
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# parser/ and postprocess/ are script directories, not packages
+for directory in ('parser', 'postprocess', 'benchmarks'):
+    sys.path.insert(0, os.path.join(ROOT, directory))
+
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+MERGE_SCRIPT = os.path.join(ROOT, 'postprocess', 'emails_merge.py')
+SPIDER_FILE = os.path.join(ROOT, 'parser', 'email_spider.py')
+CONCURRENT_REQUESTS = 16
+SPIDER_SETTINGS = [f'CONCURRENT_REQUESTS={CONCURRENT_REQUESTS}', 'DOWNLOAD_DELAY=0', 'AUTOTHROTTLE_ENABLED=0',
+                   'LOG_LEVEL=INFO']
+
+
+def start_spider(input_path, work_dir, options=(), settings=SPIDER_SETTINGS):
+    """Start EmailSpider with a local result sink in work_dir/results; its log goes to work_dir/crawl.log."""
+    cmd = [sys.executable, '-m', 'scrapy', 'runspider', SPIDER_FILE, '-a', f'input_path={input_path}']
+    for flag, pairs in (('-a', options), ('-s', settings)):
+        for pair in pairs:
+            cmd += [flag, pair]
+    env = {**os.environ, 'RESULT_SINK_BACKEND': 'local', 'RESULT_SINK_DIR': str(work_dir / 'results'),
+           'RESULT_SINK_TMP_DIR': str(work_dir / 'tmp'), 'AWS_DEFAULT_REGION': 'us-east-1'}
+    with open(work_dir / 'crawl.log', 'a') as log:
+        return subprocess.Popen(cmd, cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+@pytest.fixture
+def run_merge(tmp_path):
+    """Run emails_merge.py on the fixture universities.csv / emails.csv (or given tables); returns the run directory."""
+    def run(name='run', emails=None, universities=None, script=MERGE_SCRIPT, **env):
+        run_dir = tmp_path / name
+        run_dir.mkdir()
+        for file_name, table in (('universities.csv', universities), ('emails.csv', emails)):
+            if table is None:
+                shutil.copy(os.path.join(FIXTURES, file_name), run_dir)
+            else:
+                table.to_csv(run_dir / file_name, index=False)
+        subprocess.run([sys.executable, script], cwd=run_dir, env={**os.environ, **env},
+                       check=True, capture_output=True)
+        return run_dir
+    return run
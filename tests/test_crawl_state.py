@@ -0,0 +1,83 @@
+import csv
+import json
+import time
+import multiprocessing
+import urllib.request
+
+import pytest
+
+from conftest import CONCURRENT_REQUESTS, start_spider
+from bench_crawl_engines import stored_emails
+from fixture_server import FIXTURE_DEFAULTS, build_corpus, serve
+
+COMMIT_EVERY = 200  # CrawlState commits at least every 200 writes
+PORT = 8871
+FIXTURE = {**FIXTURE_DEFAULTS, 'sites': 40, 'pages': 25, 'latency': 0.01}
+
+
+@pytest.fixture(scope='module')
+def fixture_sites(tmp_path_factory):
+    """Input CSV of the fixture sites, served for the whole module."""
+    server = multiprocessing.Process(target=serve, args=(FIXTURE, PORT), daemon=True)
+    server.start()
+    input_path = tmp_path_factory.mktemp('input') / 'input_urls.csv'
+    with open(input_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['url'])
+        writer.writerows([url] for url in build_corpus(FIXTURE, PORT).root_urls(PORT))
+    for _ in range(50):
+        try:
+            fixture_stats('reset')
+            break
+        except OSError:
+            time.sleep(0.1)
+    yield input_path
+    server.terminate()
+
+
+def fixture_stats(action='stats'):
+    with urllib.request.urlopen(f'http://127.0.0.1:{PORT}/__fixture/{action}', timeout=5) as response:
+        return json.load(response)
+
+
+def served_pages():
+    return fixture_stats().get('pages', 0)
+
+
+def start_crawl(input_path, work_dir, state_db=None):
+    options = [f'state_db={state_db}'] if state_db else []
+    return start_spider(input_path, work_dir, options)
+
+
+def crawl(input_path, work_dir, state_db=None):
+    """Pages served for one complete crawl."""
+    fixture_stats('reset')
+    assert start_crawl(input_path, work_dir, state_db).wait(timeout=300) == 0
+    return served_pages()
+
+
+def test_resume_after_kill(fixture_sites, tmp_path):
+    full_dir = tmp_path / 'full'
+    full_dir.mkdir()
+    full_pages = crawl(fixture_sites, full_dir)
+    full_emails = stored_emails(str(full_dir / 'results'))
+    assert full_pages >= 800 and full_emails
+
+    # Kill the crawl (no clean shutdown) once about half of the pages were served
+    resumed_dir = tmp_path / 'resumed'
+    resumed_dir.mkdir()
+    state_db = resumed_dir / 'crawl.db'
+    fixture_stats('reset')
+    process = start_crawl(fixture_sites, resumed_dir, state_db)
+    while served_pages() < full_pages // 2:
+        assert process.poll() is None, "crawl finished before it could be interrupted"
+        time.sleep(0.02)
+    process.kill()
+    process.wait()
+    first_pages = served_pages()
+
+    second_pages = crawl(fixture_sites, resumed_dir, state_db)
+    refetched = first_pages + second_pages - full_pages
+    # Only pages in flight at the kill or written after the last commit are fetched again
+    assert 0 <= refetched <= CONCURRENT_REQUESTS + COMMIT_EVERY
+    assert stored_emails(str(resumed_dir / 'results')) == full_emails
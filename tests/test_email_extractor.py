@@ -0,0 +1,40 @@
+import re
+
+import pytest
+
+from email_extractor import extract_emails
+
+# The spider's regex before the byte-level extractor, on decoded text
+BASELINE_RE = re.compile(r"\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b")
+
+# (page text, emails found) where the text puts non-ASCII characters right before an email
+SEPARATOR_CORPUS = [
+    ('E-mail：tanaka@u-tokyo.ac.jp', {'tanaka@u-tokyo.ac.jp'}),                 # fullwidth colon
+    ('电子邮件：wang@pku.edu.cn', {'wang@pku.edu.cn'}),                          # CJK text + fullwidth colon
+    ('連絡先、sato@kyoto-u.ac.jp。', {'sato@kyoto-u.ac.jp'}),                   # ideographic comma and full stop
+    ('「kim@snu.ac.kr」', {'kim@snu.ac.kr'}),                                   # corner brackets
+    ('Email:\xa0john@uni.edu', {'john@uni.edu'}),                               # no-break space
+    ('Kontakt —info@uni.de', {'info@uni.de'}),                                  # em dash
+    ('Sekretariat –office@tu-berlin.de', {'office@tu-berlin.de'}),              # en dash
+    ('müller@uni.de', set()),                                                   # letter before: not an email start
+    ('电子邮件wang@pku.edu.cn', set()),                                          # CJK letter before
+]
+
+
+@pytest.mark.parametrize('text, expected', SEPARATOR_CORPUS)
+def test_non_ascii_separators_utf8(text, expected):
+    assert extract_emails(f'<p>{text}</p>'.encode('utf-8')) == expected
+
+
+@pytest.mark.parametrize('text, expected', SEPARATOR_CORPUS)
+def test_matches_baseline_regex(text, expected):
+    assert {email.lower() for email in BASELINE_RE.findall(text)} == extract_emails(text)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Email:\xa0john@uni.edu', {'john@uni.edu'}),
+    ('Kontakt \u2014info@uni.de', {'info@uni.de'}),  # 0x97 in cp1252
+    ('M\xfcller@uni.de', set()),
+])
+def test_non_ascii_separators_single_byte_pages(text, expected):
+    assert extract_emails(text.encode('cp1252')) == expected
@@ -0,0 +1,80 @@
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import FIXTURES
+from domain_resolver import default_resolver
+
+OUTPUTS = ('final_emails.csv', 'invalid_data.csv')
+COLLEGE_REASON = 'community/technical college without academic URLs'
+
+
+def outputs(run_dir):
+    return {name: (run_dir / name).read_bytes() for name in OUTPUTS}
+
+
+@pytest.mark.parametrize('chunk_size', ['1', '3', '7'])
+def test_output_does_not_depend_on_chunk_size(run_merge, chunk_size):
+    # The fixture lists pages of different universities interleaved, so a
+    # chunk-local reordering would change which duplicate is kept
+    whole = outputs(run_merge('whole', MERGE_CHUNK_SIZE='50000'))
+    chunked = outputs(run_merge('chunked', MERGE_CHUNK_SIZE=chunk_size))
+    assert chunked == whole
+
+
+def grouped_by_university(emails, unis):
+    """Email rows in university order, the row order the baseline's university-side join yields.
+
+    The baseline keeps the first duplicate in that order and the merge in
+    emails.csv order; grouping the input makes the two agree.
+    """
+    resolver = default_resolver()
+    position = {domain: k for k, domain in enumerate(unis['url'].map(resolver.from_url))}
+    return emails.iloc[emails['url'].map(resolver.from_url).map(position).argsort(kind='stable')]
+
+
+def invalid_blocks(invalid):
+    """Filter, unmatched and college rows of invalid_data, in file order."""
+    unmatched = invalid['email'].isna()
+    college = invalid['removal_reason'] == COLLEGE_REASON
+    return invalid[~unmatched & ~college], invalid[unmatched], invalid[college]
+
+
+def test_matches_row_wise_baseline(run_merge):
+    # Adds a technical college with an academic source URL, which is kept; Foo Community College has none
+    unis = pd.read_csv(os.path.join(FIXTURES, 'universities.csv'))
+    unis = pd.concat([unis.iloc[:-1], pd.DataFrame({
+        'country_code': ['US'], 'university_name': ['Qux Technical College'], 'url': ['https://www.quxtc.edu/'],
+    }), unis.iloc[-1:]], ignore_index=True)
+    emails = pd.concat([pd.read_csv(os.path.join(FIXTURES, 'emails.csv')), pd.DataFrame({
+        'url': ['https://www.quxtc.edu/', 'https://www.quxtc.edu/research/lab'],
+        'emails': ['office@quxtc.edu', 'j.smith@quxtc.edu, lab@college.edu'],
+    })], ignore_index=True)
+    emails = grouped_by_university(emails, unis)
+
+    baseline = run_merge('baseline', emails=emails, universities=unis,
+                         script=os.path.join(FIXTURES, 'emails_merge_baseline.py'))
+    current = run_merge('current', emails=emails, universities=unis)
+
+    assert (current / 'final_emails.csv').read_bytes() == (baseline / 'final_emails.csv').read_bytes()
+    final = pd.read_csv(current / 'final_emails.csv', sep='\t')
+    assert 'Qux Technical College' in set(final['university_name'])
+
+    baseline_invalid = pd.read_csv(baseline / 'invalid_data.csv', sep='\t', dtype=str)
+    current_invalid = pd.read_csv(current / 'invalid_data.csv', sep='\t', dtype=str)
+    # removal_mask is the only column the rule engine added
+    current_invalid = current_invalid.drop(columns=['removal_mask'])
+
+    # invalid_data is filter rows, then unmatched universities, then college rows (emails_merge.main)
+    filtered, unmatched, college = invalid_blocks(current_invalid)
+    assert len(filtered) and len(college)
+    assert list(current_invalid.index) == [*filtered.index, *unmatched.index, *college.index]
+    # Elsewhere University sits in the middle of universities.csv, so the baseline lists it among the filter rows
+    assert list(unmatched['university_name']) == ['Elsewhere University', 'Nowhere U']
+    baseline_unmatched = baseline_invalid.index[baseline_invalid['email'].isna()]
+    assert baseline_unmatched[0] < invalid_blocks(baseline_invalid)[0].index[-1]
+
+    # Each block holds the baseline's rows in the baseline's order
+    for block, baseline_block in zip(invalid_blocks(current_invalid), invalid_blocks(baseline_invalid)):
+        pd.testing.assert_frame_equal(block.reset_index(drop=True), baseline_block.reset_index(drop=True))
@@ -0,0 +1,115 @@
+import re
+import glob
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import start_spider
+from columnar import read_email_rows
+
+PORT = 8872
+
+
+class Site:
+    """One site whose /changing page gets a new email and a new link in version 2.
+
+    / and /etag-child carry an ETag and answer 304 to a matching
+    If-None-Match; /static and /static-child have no validators and the
+    same body in every version. /etag-child and /static-child are only
+    linked from those pages, so they are reached through cached links.
+    """
+
+    def __init__(self):
+        self.version = 1
+        self.statuses = Counter()
+
+    def page(self, path):
+        """(links, emails, etag) of a page, None if it does not exist."""
+        pages = {
+            '/': (['/etag-child', '/static', '/changing'], ['home@site.edu'], '"home"'),
+            '/etag-child': ([], ['child@site.edu'], '"child"'),
+            '/static': (['/static-child'], ['static@site.edu'], None),
+            '/static-child': ([], ['static.child@site.edu'], None),
+        }
+        if self.version == 1:
+            pages['/changing'] = ([], ['old@site.edu'], None)
+        else:
+            pages['/changing'] = (['/added'], ['new@site.edu'], None)
+            pages['/added'] = ([], ['added@site.edu'], None)
+        return pages.get(path)
+
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                page = site.page(self.path)
+                if page is None:
+                    return self.respond(404)
+                links, emails, etag = page
+                if etag and self.headers.get('If-None-Match') == etag:
+                    return self.respond(304, etag=etag)
+                body = (f"<html><body>{''.join(f'<a href={link!r}>{link}</a>' for link in links)}"
+                        f"<p>{', '.join(emails)}</p></body></html>").encode()
+                self.respond(200, body, etag)
+
+            def respond(self, status, body=b'', etag=None):
+                site.statuses[status] += 1
+                self.send_response(status)
+                if etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def site(tmp_path):
+    site = Site()
+    server = ThreadingHTTPServer(('0.0.0.0', PORT), site.handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    site.input_path = tmp_path / 'input_urls.csv'
+    site.input_path.write_text(f'url\nhttp://127.0.0.9:{PORT}/\n')
+    yield site
+    server.shutdown()
+    server.server_close()
+
+
+def crawl(site, work_dir, page_cache_db=None):
+    """url -> emails stored by one crawl."""
+    work_dir.mkdir()
+    options = [f'page_cache_db={page_cache_db}'] if page_cache_db else []
+    assert start_spider(site.input_path, work_dir, options).wait(timeout=120) == 0
+    stored = {}
+    for part in glob.glob(str(work_dir / 'results' / '**' / '*.csv.gz'), recursive=True):
+        for url, emails in read_email_rows(part):
+            stored.setdefault(url, set()).update(emails)
+    return stored
+
+
+def test_cached_crawl_matches_uncached(site, tmp_path):
+    page_cache_db = tmp_path / 'pages.db'
+    crawl(site, tmp_path / 'first', page_cache_db)
+
+    site.version = 2
+    site.statuses.clear()
+    cached = crawl(site, tmp_path / 'cached', page_cache_db)
+    assert site.statuses[304] == 2
+
+    log = (tmp_path / 'cached' / 'crawl.log').read_text()
+    report = re.search(r'Page cache .*: (\d+) of (\d+) pages not re-parsed \((\d+) not modified, '
+                       r'(\d+) same content\), (\d+) changed, (\d+) new', log)
+    assert report and [int(count) for count in report.groups()] == [4, 6, 2, 2, 1, 1]
+
+    uncached = crawl(site, tmp_path / 'uncached')
+    assert cached == uncached
+    assert uncached[f'http://127.0.0.9:{PORT}/changing'] == {'new@site.edu'}
@@ -0,0 +1,99 @@
+import os
+import csv
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import url_triage
+from conftest import ROOT
+from crawl_job import (STATUS_COLUMN, FINAL_URL_COLUMN, is_dead_status, parse_statuses, row_targets,
+                       header_names, triage_columns)
+
+PORT = 8873
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        if self.path == '/old':
+            self.send_response(301)
+            self.send_header('Location', f'http://127.0.0.1:{PORT}/')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_HEAD
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def hosts():
+    """(live port, hanging port, refused port) on the loopback interface."""
+    live = ThreadingHTTPServer(('127.0.0.1', PORT), Handler)
+    live.daemon_threads = True
+    threading.Thread(target=live.serve_forever, daemon=True).start()
+    # Accepts connections and never answers
+    hanging = socket.create_server(('127.0.0.1', 0))
+    refused = socket.create_server(('127.0.0.1', 0))
+    refused_port = refused.getsockname()[1]
+    refused.close()
+    yield PORT, hanging.getsockname()[1], refused_port
+    hanging.close()
+    live.shutdown()
+    live.server_close()
+
+
+def test_triage_writes_a_separate_file_and_keeps_slow_sites(hosts, tmp_path):
+    live, hanging, refused = hosts
+    input_path = tmp_path / 'universities.csv'
+    input_path.write_text('country_code,name,web_pages\n'
+                          f'XX,Live,http://127.0.0.1:{live}/old\n'
+                          f'XX,Slow,http://127.0.0.1:{hanging}/\n'
+                          f'XX,Gone,http://127.0.0.1:{refused}/\n')
+    original = input_path.read_text()
+
+    assert url_triage.main([str(input_path), '--timeout', '1', '--connect-timeout', '1']) == 0
+    assert input_path.read_text() == original
+
+    with open(tmp_path / 'universities-triaged.csv', newline='') as f:
+        reader = csv.reader(f)
+        names = header_names(next(reader))
+        rows = {row[1]: row for row in reader}
+    statuses = {name: parse_statuses(row[names.index(STATUS_COLUMN)]) for name, row in rows.items()}
+    assert statuses == {'Live': [200], 'Slow': ['ERROR: ReadTimeout'], 'Gone': ['ERROR: ConnectionError']}
+    assert rows['Live'][names.index(FINAL_URL_COLUMN)] == f'http://127.0.0.1:{live}/'
+
+    # The crawl skips only the refused host, and starts the redirected one from its target
+    url_column = names.index('web_pages')
+    targets = {name: list(row_targets(row, url_column, names.index(STATUS_COLUMN), names.index(FINAL_URL_COLUMN)))
+               for name, row in rows.items()}
+    assert [dead for _, _, dead in targets['Slow']] == [False]
+    assert [dead for _, _, dead in targets['Gone']] == [True]
+    assert targets['Live'][0][1] == f'http://127.0.0.1:{live}/'
+
+
+@pytest.mark.parametrize('status, dead', [
+    (200, False), (404, False), ('ERROR: ConnectTimeout', False), ('ERROR: ReadTimeout', False),
+    ('ERROR: ConnectionError', True), ('ERROR: SSLError', True),
+])
+def test_is_dead_status(status, dead):
+    assert is_dead_status(status) == dead
+
+
+def test_untriaged_statuses_skip_nothing():
+    # full_universities_list.csv has url_status_codes from the old certificate-verifying check, but no final_urls
+    with open(os.path.join(ROOT, 'full_universities_list.csv'), newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        assert STATUS_COLUMN in header and triage_columns(header) == (None, None)
+        url_column = header_names(header).index('web_pages')
+        rows = list(reader)
+    assert any('SSLError' in row[header.index(STATUS_COLUMN)] for row in rows)
+    assert not any(dead for row in rows for _, _, dead in row_targets(row, url_column, *triage_columns(header)))
+
+    triaged = header + [FINAL_URL_COLUMN]
+    assert triage_columns(triaged) == (header.index(STATUS_COLUMN), len(header))